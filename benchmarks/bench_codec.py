@@ -0,0 +1,53 @@
+"""
+Compares the Redis cache codecs with the old pickle-of-ORM path.
+
+Usage:
+    python -m benchmarks.bench_codec [count]
+"""
+import pickle
+import sys
+import timeit
+from datetime import date
+
+from src.database.models import Contact
+from src.schemas.contact import ContactResponse
+from src.services.codec import CODECS
+
+
+def make_contacts(count: int) -> list[Contact]:
+    return [Contact(
+        id=num,
+        first_name=f"first{num}",
+        last_name=f"last{num}",
+        email=f"user{num}@example.com",
+        phone=f"+38099{num:07}",
+        birthday=date(2000, 1, 1 + num % 28),
+        data=f"data {num}",
+        user_id=1) for num in range(count)]
+
+
+def measure(name: str, encode, decode, number: int = 200):
+    payload = encode()
+    encode_us = timeit.timeit(encode, number=number) / number * 1e6
+    decode_us = timeit.timeit(lambda: decode(payload), number=number) / number * 1e6
+    print(f"{name:<10} {len(payload):>10} {encode_us:>12.1f} {decode_us:>12.1f}")
+
+
+def main(count: int = 100):
+    contacts = make_contacts(count)
+    schemas = [ContactResponse.model_validate(contact) for contact in contacts]
+    print(f"{count} contacts")
+    print(f"{'codec':<10} {'bytes':>10} {'encode, us':>12} {'decode, us':>12}")
+    measure("pickle", lambda: pickle.dumps(contacts), pickle.loads)
+    for name, codec_class in CODECS.items():
+        try:
+            codec = codec_class()
+        except RuntimeError as err:
+            print(f"{name:<10} skipped: {err}")
+            continue
+        measure(name, lambda: codec.encode(schemas),
+                lambda payload: codec.decode(payload, ContactResponse, many=True))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,64 @@
+"""
+Measures the cost of a rate limited request: the key function and one limiter hit
+per strategy on the in-memory storage and, if it answers, on Redis.
+
+Usage:
+    python -m benchmarks.bench_limiter [redis://localhost:6379/15]
+"""
+import asyncio
+import sys
+import timeit
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from starlette.requests import Request
+
+from src.services.auth import auth_service
+from src.services.limiter import rate_limit_key
+from src.services.token_cache import token_cache
+
+
+def make_request(authorization: str | None = None) -> Request:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": ("10.0.0.1", 1234)})
+
+
+def bench_key(number: int):
+    token = asyncio.run(auth_service.create_access_token(data={"sub": "bench@example.com"}))
+    requests = {"ip": make_request(), "jwt": make_request(f"Bearer {token}")}
+    print(f"{'key':<24} {'us':>10}")
+    for name, request in requests.items():
+        us = timeit.timeit(lambda: rate_limit_key(request), number=number) / number * 1e6
+        print(f"{name:<24} {us:>10.2f}")
+    token_cache.set(token, "bench@example.com", type("User", (), {"email": "bench@example.com"})(), float("inf"))
+    us = timeit.timeit(lambda: rate_limit_key(requests["jwt"]), number=number) / number * 1e6
+    print(f"{'jwt (token cache)':<24} {us:>10.2f}")
+    token_cache.clear()
+
+
+def bench_hits(uri: str, number: int):
+    storage = storage_from_string(uri, socket_timeout=0.5, socket_connect_timeout=0.5) \
+        if uri.startswith("redis") else storage_from_string(uri)
+    if not storage.check():
+        print(f"{uri} is unreachable, skipped")
+        return
+    limit = parse(f"{number * 10}/minute")
+    for name in ("fixed-window", "moving-window", "sliding-window-counter"):
+        limiter = STRATEGIES[name](storage)
+        storage.reset()
+        seconds = timeit.timeit(lambda: limiter.hit(limit, "rate-limit", "user:bench@example.com", "/api/contacts"),
+                                number=number)
+        print(f"{uri:<28} {name:<24} {number / seconds:>10.0f} hits/s {seconds / number * 1e6:>8.1f} us")
+    storage.reset()
+
+
+def main(redis_uri: str = "redis://localhost:6379/15", number: int = 5000):
+    bench_key(number)
+    print()
+    for uri in ("memory://", redis_uri):
+        bench_hits(uri, number)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
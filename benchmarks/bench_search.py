@@ -0,0 +1,40 @@
+"""
+Compares substring search through the contacts_fts trigram table with a plain
+LIKE scan of contacts on SQLite.
+
+Usage:
+    python -m benchmarks.bench_search [count]
+"""
+import sys
+import timeit
+
+from sqlalchemy import create_engine, func, insert, select
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import search_filters
+
+
+def main(count: int = 200_000, number: int = 20):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "-"}])
+        conn.execute(insert(Contact), [{
+            "first_name": f"first{num}",
+            "last_name": f"last{num}",
+            "email": f"user{num}@example.com",
+            "phone": f"+38099{num:07}",
+            "user_id": 1} for num in range(count)])
+    print(f"{count} contacts, term 'st12345'")
+    print(f"{'query':<10} {'rows':>6} {'ms':>10}")
+    for name, condition in (("like", Contact.first_name.ilike("%st12345%")),
+                            ("fts", search_filters("st12345", None, None, None, None, "sqlite")[0])):
+        stmt = select(func.count()).select_from(Contact).where(Contact.user_id == 1, condition)
+        with engine.connect() as conn:
+            rows = conn.execute(stmt).scalar()
+            ms = timeit.timeit(lambda: conn.execute(stmt).scalar(), number=number) / number * 1e3
+        print(f"{name:<10} {rows:>6} {ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
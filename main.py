@@ -1,28 +1,127 @@
 import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 
 from src.routes import contacts
 from src.routes import auth 
 from src.routes import users
+from src.routes import internal
+from src.conf.config import Settings, get_settings
+from src.database import db
+from src.repository import contacts as repository_contact
+from src.services.auth import auth_service
+from src.services.client_redis import client_redis
+from src.services.email import mail_client
+from src.services.hashing import password_hasher
+from src.services.limiter import limiter
+from src.services.token_cache import token_cache
+from src.services.birthdays import birthday_digest_job
 
 
-server = FastAPI()
+@asynccontextmanager
+async def lifespan(server: FastAPI):
+    """
+    Owns the shared resources of the application.
 
-origins = ["https://localhost:8000"]
+    The database pool, Redis pool, mail client and hashing pool are warmed up before the
+    first request is accepted, and drained in reverse order on shutdown. Heavy integrations
+    (aiosmtplib, jinja2, passlib) are imported here rather than when the app is imported.
 
-server.include_router(auth.router, prefix='/api')
-server.include_router(contacts.router, prefix='/api')
-server.include_router(users.router, prefix='/api')
+    Args:
+        server (FastAPI): The application, its ``state.settings`` come from ``create_app``.
+    """
+    settings: Settings = server.state.settings
+    await db.warm_up(settings.db_pool_warm)
+    await client_redis.warm_up()
+    mail_client.warm_up()
+    await password_hasher.warm_up()
+    tasks = []
+    if settings.birthdays_digest_job:
+        tasks.append(asyncio.create_task(birthday_digest_job()))
+    if len(db.replicas):
+        await db.replicas.check()
+        tasks.append(asyncio.create_task(db.replicas.run_checks()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await mail_client.close()
+        await asyncio.to_thread(password_hasher.shutdown)
+        await client_redis.close()
+        await db.dispose()
 
-server.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+def configure(settings: Settings):
+    """
+    Builds the shared resources of the application from the settings.
+
+    The database engines, Redis client, token cache, password hasher, mail client, rate
+    limiter, token keys and contact repository are module level singletons, the last
+    configured settings apply to all of them. Nothing is connected here.
+
+    Args:
+        settings (Settings): The settings of the application.
+    """
+    db.configure(settings)
+    client_redis.configure(settings)
+    token_cache.configure(settings)
+    password_hasher.configure(settings)
+    mail_client.configure(settings)
+    limiter.configure(settings)
+    auth_service.configure(settings)
+    repository_contact.configure(settings)
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """
+    Builds the application with its routes, middleware, rate limiter and lifespan.
+
+    The shared resources are configured from the settings, see ``configure``. Nothing is
+    connected here, run ``uvicorn --factory main:create_app`` or serve ``main:server``.
+
+    Args:
+        settings (Settings, optional): The settings of the application. Defaults to ``get_settings()``.
+
+    Returns:
+        FastAPI: The application.
+    """
+    settings = settings or get_settings()
+    configure(settings)
+    server = FastAPI(lifespan=lifespan)
+    server.state.settings = settings
+    server.state.limiter = limiter
+    server.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    server.include_router(auth.router, prefix='/api')
+    server.include_router(contacts.router, prefix='/api')
+    server.include_router(users.router, prefix='/api')
+    server.include_router(internal.router)
+
+    server.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return server
+
+
+def __getattr__(name: str):
+    """
+    Creates ``main.server`` with ``create_app()`` on first access, so importing main reads no settings.
+    """
+    if name == "server":
+        globals()["server"] = create_app()
+        return globals()["server"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # if __name__ == "__main__":
-#     uvicorn.run(server, host="0.0.0.0", port=8000)
\ No newline at end of file
+#     uvicorn.run(server, host="0.0.0.0", port=8000)
@@ -4,13 +4,18 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
+from src.conf.config import get_settings
+from src.database.db import sync_url
 from src.database.models import Base
-from decouple import config as my_config
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", my_config("SQLALCHEMY_DATABASE_URL_F"))
+settings = get_settings()
+# engine_from_config below is sync, so an async SQLALCHEMY_DATABASE_URL gets its sync driver
+url = sync_url(settings.sqlalchemy_database_url_f or settings.sqlalchemy_database_url)
+# the ini parser interpolates "%", which may appear in an escaped password
+config.set_main_option("sqlalchemy.url", url.render_as_string(hide_password=False).replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
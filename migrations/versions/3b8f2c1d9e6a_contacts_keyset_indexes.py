@@ -0,0 +1,28 @@
+"""contacts keyset indexes
+
+Revision ID: 3b8f2c1d9e6a
+Revises: 7d646c29b4a4
+Create Date: 2026-10-18 10:12:31.402113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8f2c1d9e6a'
+down_revision: Union[str, None] = '7d646c29b4a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_last_name_id', 'contacts', ['user_id', 'last_name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_last_name_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
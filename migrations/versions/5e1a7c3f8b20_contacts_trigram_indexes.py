@@ -0,0 +1,37 @@
+"""contacts trigram indexes
+
+Revision ID: 5e1a7c3f8b20
+Revises: 3b8f2c1d9e6a
+Create Date: 2026-10-18 11:02:47.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1a7c3f8b20'
+down_revision: Union[str, None] = '3b8f2c1d9e6a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FIELDS = ('first_name', 'last_name', 'email', 'phone')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # built concurrently so searches and writes keep working on large tables
+    with op.get_context().autocommit_block():
+        for name in FIELDS:
+            op.create_index(f'ix_contacts_{name}_trgm', 'contacts', [name], unique=False,
+                            postgresql_using='gin', postgresql_ops={name: 'gin_trgm_ops'},
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in FIELDS:
+            op.drop_index(f'ix_contacts_{name}_trgm', table_name='contacts',
+                          postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,32 @@
+"""contacts birthday_mmdd
+
+Revision ID: 9c4d2e7a1f35
+Revises: 5e1a7c3f8b20
+Create Date: 2026-10-18 11:40:09.127442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d2e7a1f35'
+down_revision: Union[str, None] = '5e1a7c3f8b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('birthday_mmdd', sa.Integer(), nullable=True))
+    op.execute("UPDATE contacts SET birthday_mmdd = EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday) "
+               "WHERE birthday IS NOT NULL")
+    with op.get_context().autocommit_block():
+        op.create_index('ix_contacts_user_id_birthday_mmdd', 'contacts', ['user_id', 'birthday_mmdd'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_mmdd', table_name='contacts')
+    op.drop_column('contacts', 'birthday_mmdd')
@@ -0,0 +1,53 @@
+"""contacts and users lookup indexes
+
+Revision ID: b7e3f1a9c2d4
+Revises: 9c4d2e7a1f35
+Create Date: 2026-10-18 13:21:54.630918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f1a9c2d4'
+down_revision: Union[str, None] = '9c4d2e7a1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (user_id, id) is created by 3b8f2c1d9e6a, exact username lookups use the unique index
+INDEXES = (
+    ('ix_contacts_user_id_last_name_first_name', 'contacts', ['user_id', 'last_name', 'first_name'], False),
+    ('ix_contacts_user_id_email', 'contacts', ['user_id', 'email'], False),
+    # users are looked up by email ignoring case, so two emails may not differ in case only
+    ('ix_users_email_lower', 'users', [sa.text('lower(email)')], True),
+)
+
+
+def check_email_duplicates() -> None:
+    """
+    Stops the upgrade if the email addresses of two users differ in case only.
+
+    Such accounts must be merged or renamed by hand before the unique index can be built.
+    """
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT lower(email), array_agg(id ORDER BY id) FROM users GROUP BY lower(email) HAVING count(*) > 1'
+    )).all()
+    if duplicates:
+        listed = '; '.join(f'{email}: users {ids}' for email, ids in duplicates)
+        raise RuntimeError(f'Emails of users differ in case only, resolve them before upgrading: {listed}')
+
+
+def upgrade() -> None:
+    check_email_duplicates()
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
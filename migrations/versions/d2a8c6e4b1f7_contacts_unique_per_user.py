@@ -0,0 +1,42 @@
+"""contacts unique email and phone per user
+
+Revision ID: d2a8c6e4b1f7
+Revises: b7e3f1a9c2d4
+Create Date: 2026-10-18 13:58:12.284519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8c6e4b1f7'
+down_revision: Union[str, None] = 'b7e3f1a9c2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FIELDS = ('email', 'phone')
+
+
+def upgrade() -> None:
+    # build the unique indexes without locking writes, then turn them into constraints
+    with op.get_context().autocommit_block():
+        for name in FIELDS:
+            op.create_index(f'uq_contacts_user_id_{name}', 'contacts', ['user_id', name], unique=True,
+                            postgresql_concurrently=True, if_not_exists=True)
+    for name in FIELDS:
+        op.execute(f'ALTER TABLE contacts ADD CONSTRAINT uq_contacts_user_id_{name} '
+                   f'UNIQUE USING INDEX uq_contacts_user_id_{name}')
+        op.drop_constraint(f'contacts_{name}_key', 'contacts', type_='unique')
+    # covered by uq_contacts_user_id_email
+    op.drop_index('ix_contacts_user_id_email', table_name='contacts')
+
+
+def downgrade() -> None:
+    # fails if two users now keep the same email or phone
+    op.create_index('ix_contacts_user_id_email', 'contacts', ['user_id', 'email'], unique=False)
+    for name in FIELDS:
+        op.create_unique_constraint(f'contacts_{name}_key', 'contacts', [name])
+        op.drop_constraint(f'uq_contacts_user_id_{name}', 'contacts', type_='unique')
@@ -0,0 +1,33 @@
+"""contacts hash partitioned shadow table
+
+Revision ID: e3b9d7f1a2c5
+Revises: d2a8c6e4b1f7
+Create Date: 2026-10-18 14:41:07.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.partition import SHADOW, shadow_statements
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9d7f1a2c5'
+down_revision: Union[str, None] = 'd2a8c6e4b1f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the new table starts empty, from here on every write on contacts is mirrored into it;
+    # existing rows are copied online by ``python -m src.database.partition copy``
+    for statement in shadow_statements():
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS contacts_mirror ON contacts')
+    op.execute('DROP FUNCTION IF EXISTS contacts_mirror()')
+    op.execute(f'DROP TABLE IF EXISTS {SHADOW} CASCADE')
@@ -0,0 +1,38 @@
+"""contacts swap in the hash partitioned table
+
+Revision ID: f4c1a8e6d3b9
+Revises: e3b9d7f1a2c5
+Create Date: 2026-10-18 14:43:52.103674
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.partition import RETIRED, check_copied, swap_statements, unswap_statements
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c1a8e6d3b9'
+down_revision: Union[str, None] = 'e3b9d7f1a2c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # writes wait only for the row count check and the renames
+    op.execute('LOCK TABLE contacts IN SHARE ROW EXCLUSIVE MODE')
+    check_copied(op.get_bind())
+    for statement in swap_statements():
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    # needs contacts_unpartitioned, which is kept until it is dropped by hand; it missed every
+    # write since the swap, so it is refilled while writes wait (offline, unlike the upgrade)
+    op.execute('LOCK TABLE contacts IN SHARE ROW EXCLUSIVE MODE')
+    op.execute(f'TRUNCATE {RETIRED}')
+    op.execute(f'INSERT INTO {RETIRED} SELECT * FROM contacts')
+    for statement in unswap_statements():
+        op.execute(statement)
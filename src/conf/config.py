@@ -0,0 +1,189 @@
+from functools import lru_cache
+
+from fastapi import Request
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Settings of the application, read once from the environment and the ``.env`` file.
+
+    Every variable of the ``env`` template maps to the field of the same name in lower case,
+    so ``DB_POOL_SIZE=20`` sets ``db_pool_size``. Nothing is read when a module is imported:
+    ``create_app`` hands its settings (``get_settings()`` by default) to the shared resources,
+    request handlers never look the environment up.
+
+    Attributes:
+        sqlalchemy_database_url (str): URL of the primary database, converted to its async driver.
+        sqlalchemy_database_url_f (str | None): Sync URL used by alembic and the partition copy.
+        sqlalchemy_replica_urls (str): Comma separated URLs of read replicas.
+        db_pool_size (int): Connections kept open per worker.
+        db_pool_warm (int): Connections opened before serving.
+        db_max_overflow (int): Extra connections allowed above the pool size.
+        db_pool_timeout (float): Seconds to wait for a free connection.
+        db_pool_recycle (int): Seconds after which a connection is replaced.
+        db_pool_pre_ping (bool): Whether connections are pinged when checked out.
+        db_statement_timeout (int): Postgres statement timeout in milliseconds, 0 disables it.
+        replica_check_interval (float): Seconds between replica health checks.
+        read_your_writes_window (float): Seconds a writer keeps reading from the primary.
+        partition_chunk_size (int): Rows per chunk of the partition copy.
+        partition_chunk_pause (float): Seconds to sleep between chunks of the partition copy.
+        secret_key (str): Key that signs the JWT tokens.
+        algorithm (str): Algorithm of the JWT tokens.
+        mail_username (str): SMTP login.
+        mail_password (str): SMTP password.
+        mail_from (str): Sender address.
+        mail_port (int): SMTP port.
+        mail_server (str): SMTP host.
+        mail_from_name (str): Sender name.
+        mail_ssl_tls (bool): Whether to connect over implicit TLS.
+        mail_starttls (bool): Whether to upgrade the connection with STARTTLS.
+        mail_validate_certs (bool): Whether to validate the certificate of the server.
+        mail_timeout (float): Seconds to wait for the SMTP server.
+        mail_pool_size (int): SMTP connections kept open per worker.
+        mail_idle_timeout (float): Seconds after which an idle SMTP connection is replaced.
+        mail_batch_size (int): Messages sent over one connection by a batch send.
+        cloudinary_name (str): Cloudinary cloud name.
+        cloudinary_api_key (str): Cloudinary API key.
+        cloudinary_api_secret (str): Cloudinary API secret.
+        redis_host (str): Redis host.
+        redis_port (int): Redis port.
+        redis_db (int): Redis database number.
+        redis_pool_size (int): Maximum connections of the shared Redis pool.
+        redis_socket_timeout (float): Seconds to wait for a Redis reply.
+        redis_connect_timeout (float): Seconds to wait for a Redis connection.
+        redis_codec (str): Codec of cached values.
+        redis_cache_ttl (int): Default expiration of cached values in seconds.
+        token_cache_size (int): Verified access tokens kept in memory.
+        token_cache_ttl (float): Seconds a verified access token stays cached.
+        contacts_cache_enabled (bool): Whether contact reads are cached in Redis.
+        birthdays_window_days (int): Days ahead included in upcoming birthdays.
+        birthdays_digest_job (bool): Whether the worker runs the daily birthday digest job.
+        bulk_batch_size (int): Rows per INSERT of a bulk create.
+        export_batch_size (int): Rows fetched at a time by an export.
+        bcrypt_rounds (int): Cost of new password hashes.
+        hash_pool_kind (str): ``thread`` or ``process`` pool for hashing.
+        hash_pool_workers (int): Workers of the hashing pool, 0 picks one per CPU up to 4.
+        hash_pool_max_pending (int): Hashing calls queued or running before a 503.
+        rate_limit_storage_uri (str): Storage of the rate limit counters.
+        rate_limit_strategy (str): Rate limit strategy.
+        rate_limit_timeout (float): Seconds to wait for the rate limit storage.
+        rate_limit_login (str): Limit of signup and login.
+        rate_limit_auth (str): Limit of the other auth routes.
+        rate_limit_users (str): Limit of the user routes.
+        rate_limit_contacts (str): Limit of the contact routes.
+        rate_limit_contacts_create (str): Limit of creating a contact.
+        rate_limit_contacts_heavy (str): Limit of bulk creating and exporting contacts.
+        cors_origins (list[str]): Origins allowed by CORS, as a JSON list.
+        internal_api_key (str): Key of the ``/internal`` routes, empty disables them.
+    """
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    sqlalchemy_database_url: str
+    sqlalchemy_database_url_f: str | None = None
+    sqlalchemy_replica_urls: str = ""
+    db_pool_size: int = 5
+    db_pool_warm: int = 1
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout: int = 0
+    replica_check_interval: float = 5.0
+    read_your_writes_window: float = 5.0
+    partition_chunk_size: int = 5000
+    partition_chunk_pause: float = 0.05
+
+    secret_key: str
+    algorithm: str
+
+    mail_username: str = ""
+    mail_password: str = ""
+    mail_from: str = "noreply@example.com"
+    mail_port: int = 465
+    mail_server: str = "localhost"
+    mail_from_name: str = "Contacts"
+    mail_ssl_tls: bool = True
+    mail_starttls: bool = False
+    mail_validate_certs: bool = True
+    mail_timeout: float = 10.0
+    mail_pool_size: int = 4
+    mail_idle_timeout: float = 30.0
+    mail_batch_size: int = 50
+
+    cloudinary_name: str = ""
+    cloudinary_api_key: str = ""
+    cloudinary_api_secret: str = ""
+
+    redis_host: str = "localhost"
+    redis_port: int = 6379
+    redis_db: int = 0
+    redis_pool_size: int = 50
+    redis_socket_timeout: float = 1.0
+    redis_connect_timeout: float = 1.0
+    redis_codec: str = "json"
+    redis_cache_ttl: int = 3600
+    token_cache_size: int = 1024
+    token_cache_ttl: float = 300
+
+    contacts_cache_enabled: bool = True
+    birthdays_window_days: int = 7
+    birthdays_digest_job: bool = True
+    bulk_batch_size: int = 1000
+    export_batch_size: int = 1000
+
+    bcrypt_rounds: int = 12
+    hash_pool_kind: str = "thread"
+    hash_pool_workers: int = 0
+    hash_pool_max_pending: int = 32
+
+    rate_limit_storage_uri: str = "memory://"
+    rate_limit_strategy: str = "sliding-window-counter"
+    rate_limit_timeout: float = 0.1
+    rate_limit_login: str = "100/minute"
+    rate_limit_auth: str = "10/minute"
+    rate_limit_users: str = "1/minute"
+    rate_limit_contacts: str = "10/minute"
+    rate_limit_contacts_create: str = "30/minute"
+    rate_limit_contacts_heavy: str = "5/minute"
+
+    cors_origins: list[str] = ["https://localhost:8000"]
+    internal_api_key: str = ""
+
+    @property
+    def replica_urls(self) -> list[str]:
+        """
+        URLs of the read replicas.
+
+        Returns:
+            list[str]: The URLs from ``sqlalchemy_replica_urls``, empty if there are none.
+        """
+        return [url.strip() for url in self.sqlalchemy_replica_urls.split(",") if url.strip()]
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Reads the settings once per process.
+
+    ``create_app()`` and code running outside of an application call it, so after changing
+    the environment ``get_settings.cache_clear()`` takes effect on the next ``create_app()``.
+    Routes depend on ``app_settings`` instead, which tests override with ``dependency_overrides``.
+
+    Returns:
+        Settings: The settings of the application.
+    """
+    return Settings()
+
+
+def app_settings(request: Request) -> Settings:
+    """
+    FastAPI dependency returning the settings the serving application was created with.
+
+    Args:
+        request (Request): The request.
+
+    Returns:
+        Settings: The ``state.settings`` of the application, see ``create_app``.
+    """
+    return request.app.state.settings
@@ -1,21 +1,280 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from decouple import config
+import asyncio
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
 
-engine = create_engine(config('SQLALCHEMY_DATABASE_URL'))
+from src.conf.config import Settings, get_settings
+from src.database.models import User
+from src.database.pool import InstrumentedQueuePool, PoolMetrics
+from src.database.replicas import ReplicaSet, RecentWrites
+
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+SYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg2",
+    "sqlite": "sqlite",
+}
+
+
+def async_url(url: str) -> URL:
+    """
+    Converts a database URL to the async driver of its dialect.
+
+    Sync URLs such as ``postgresql+psycopg2://`` or ``sqlite://`` (used by alembic)
+    are mapped to ``postgresql+asyncpg://`` and ``sqlite+aiosqlite://``.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        URL: The URL with an async driver.
+    """
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver and url.drivername != driver:
+        url = url.set(drivername=driver)
+    return url
+
+
+def sync_url(url: str) -> URL:
+    """
+    Converts a database URL to the sync driver of its dialect, the counterpart of ``async_url``.
+
+    alembic and the partition copy run on a sync engine, so ``postgresql+asyncpg://`` and
+    ``sqlite+aiosqlite://`` are mapped to ``postgresql+psycopg2://`` and ``sqlite://``.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        URL: The URL with a sync driver.
+    """
+    url = make_url(url)
+    driver = SYNC_DRIVERS.get(url.get_backend_name())
+    if driver and url.drivername != driver:
+        url = url.set(drivername=driver)
+    return url
+
+
+def engine_options(url: URL, settings: Settings) -> dict:
+    """
+    Builds the engine keyword arguments from the settings.
+
+    Pool sizing, overflow, timeout, recycle and pre-ping come from the ``db_pool_*``
+    settings, ``db_statement_timeout`` (milliseconds, 0 disables it) is applied
+    as a server setting on Postgres. In-memory SQLite keeps its static pool.
+
+    Args:
+        url (URL): The async database URL.
+        settings (Settings): The settings of the application.
+
+    Returns:
+        dict: Keyword arguments for ``create_async_engine``.
+    """
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    statement_timeout = settings.db_statement_timeout
+    if statement_timeout and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout)}}
+    return options
+
+
+def engine_metrics(engine) -> PoolMetrics:
+    """
+    Returns the metrics of the pool of an engine, attaching new ones to a pool without them.
+
+    Args:
+        engine (AsyncEngine): The engine.
+
+    Returns:
+        PoolMetrics: The counters of the pool of the engine.
+    """
+    pool = engine.sync_engine.pool
+    if getattr(pool, "metrics", None) is None:
+        pool.metrics = PoolMetrics()
+        pool.metrics.attach(pool)
+    return pool.metrics
+
+
+def replica_engine(url: str, settings: Settings):
+    """
+    Creates the engine of a read replica, its pool keeps its own metrics.
+
+    Args:
+        url (str): The database URL of the replica.
+        settings (Settings): The settings of the application.
+
+    Returns:
+        AsyncEngine: The engine.
+    """
+    url = async_url(url)
+    return create_async_engine(url, **engine_options(url, settings))
+
+
+# created by configure, from create_app or on first use
+engine: AsyncEngine | None = None
+SessionLocal: async_sessionmaker[AsyncSession] | None = None
+pool_metrics: PoolMetrics | None = None
+replicas = ReplicaSet([])
+recent_writes = RecentWrites()
+
+
+def configure(settings: Settings):
+    """
+    Creates the primary engine, its session factory and the read replicas from the settings.
+
+    Nothing is connected until the first query. Engines of a previous call are left to
+    ``dispose``, which closes the current ones.
+
+    Args:
+        settings (Settings): The settings of the application.
+    """
+    global engine, SessionLocal, pool_metrics, replicas, recent_writes
+    url = async_url(settings.sqlalchemy_database_url)
+    engine = create_async_engine(url, **engine_options(url, settings))
+    SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    pool_metrics = engine_metrics(engine)
+    replicas = ReplicaSet([replica_engine(replica, settings) for replica in settings.replica_urls],
+                          check_interval=settings.replica_check_interval)
+    recent_writes = RecentWrites(window=settings.read_your_writes_window)
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Returns the primary engine, configured from ``get_settings()`` if ``configure`` was not called.
+
+    Returns:
+        AsyncEngine: The engine.
+    """
+    if engine is None:
+        configure(get_settings())
+    return engine
+
+
+def session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Returns the session factory of the primary, see ``get_engine``.
+
+    Returns:
+        async_sessionmaker[AsyncSession]: The factory.
+    """
+    get_engine()
+    return SessionLocal
+
+
+# every session of the application records who wrote, see get_current_user for info["subject"]
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush_writes(session, flush_context):
+    session.info["wrote"] = True
+    session.info.setdefault("subjects", set()).update(
+        obj.email for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, User))
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_recent_writes(session):
+    subjects = session.info.pop("subjects", set())
+    if session.info.pop("wrote", False) and session.info.get("subject"):
+        subjects.add(session.info["subject"])
+    for subject in subjects:
+        recent_writes.mark(subject)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_writes(session):
+    session.info.pop("wrote", None)
+    session.info.pop("subjects", None)
+
+
+async def read_session(subject: str | None = None) -> AsyncSession | None:
+    """
+    Opens a session on the next healthy read replica.
+
+    Args:
+        subject (str | None): The email address of the user the read is for.
+
+    Returns:
+        AsyncSession | None: A replica session, or None if the read must go to the primary
+        because no replica is configured and healthy or the user wrote within the
+        read-your-writes window.
+    """
+    if not len(replicas) or (subject and await recent_writes.recent(subject)):
+        return None
+    factory = replicas.pick()
+    return factory() if factory is not None else None
+
+
+async def warm_up(connections: int = 1):
+    """
+    Opens connections of the primary pool ahead of the first requests.
+
+    The count is clamped to the pool size and 0 skips the warm-up. If a connection fails,
+    the other pings are cancelled and its error is raised, so startup fails instead of hanging.
+
+    Args:
+        connections (int): The number of connections to open, at most the pool size.
+    """
+    engine = get_engine()
+    pool = engine.sync_engine.pool
+    connections = min(connections, pool.size() if isinstance(pool, QueuePool) else 1)
+    if connections <= 0:
+        return
+
+    async def ping():
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                # hold the connection until all are open, so each ping opens a new one
+                await barrier.wait()
+        except BaseException:
+            await barrier.abort()
+            raise
+
+    barrier = asyncio.Barrier(connections)
+    try:
+        async with asyncio.TaskGroup() as group:
+            for _ in range(connections):
+                group.create_task(ping())
+    except BaseExceptionGroup as err:
+        # the first failure, the other pings only saw the aborted barrier or their cancellation
+        errors = [error for error in err.exceptions if not isinstance(error, asyncio.BrokenBarrierError)]
+        raise (errors or err.exceptions)[0]
+
+
+async def dispose():
+    """
+    Closes every pooled connection of the primary and of the read replicas.
+    """
+    await replicas.dispose()
+    if engine is not None:
+        await engine.dispose()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Dependency
-def get_db():
+async def get_db():
     """
-    Generates a database session.
+    Generates an async database session.
 
     Yields:
-        Session: A database session.
+        AsyncSession: A database session.
     """
-    db = SessionLocal()
-    try:
+    async with session_factory()() as db:
         yield db
-    finally:
-        db.close()
@@ -1,22 +1,113 @@
 from sqlalchemy.sql.sqltypes import Date
-from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Boolean
+from datetime import date
+from sqlalchemy.orm import declarative_base, relationship, query_expression, validates
+from sqlalchemy import (Column, Integer, String, DateTime, func, ForeignKey, Boolean, Index, UniqueConstraint, DDL, event,
+                        table, column, PrimaryKeyConstraint)
+from sqlalchemy.ext.compiler import compiles
 
 Base = declarative_base()
 
+
+# number of hash partitions of ``contacts`` on Postgres, changing it needs a new migration
+CONTACTS_PARTITIONS = 16
+
+
+def birthday_mmdd(birthday: date | None) -> int | None:
+    """Month and day of a birthday as an integer, e.g. 1231 for December 31."""
+    return birthday.month * 100 + birthday.day if birthday else None
+
+
 class Contact(Base):
     __tablename__ = "contacts"
     id = Column(Integer, primary_key=True)
     first_name = Column(String(40), nullable=False)
     last_name = Column(String(40), nullable=False)
-    email = Column(String(50), nullable=False, unique=True)
-    phone = Column(String(20), nullable=False, unique=True)
+    email = Column(String(50), nullable=False)
+    phone = Column(String(20), nullable=False)
     birthday = Column(Date)
+    # kept in sync with birthday, lets upcoming birthdays be found by an index range scan
+    birthday_mmdd = Column(Integer)
     data =  Column(String(250))
     created_at = Column('created_at', DateTime, default=func.now(), nullable=True)
     updated_at = Column('updated_at', DateTime, default=func.now(), onupdate=func.now(), nullable=True)
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref="contacts")
+    # number of search criteria the contact matched, loaded only by search_contacts
+    rank = query_expression()
+
+    # every query is scoped by user_id, (user_id, id) also serves ON DELETE CASCADE from users;
+    # keyset pagination: WHERE user_id = ? AND (sort key) > (cursor) ORDER BY sort key
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_last_name_id', 'user_id', 'last_name', 'id'),
+        Index('ix_contacts_user_id_birthday_mmdd', 'user_id', 'birthday_mmdd'),
+        Index('ix_contacts_user_id_last_name_first_name', 'user_id', 'last_name', 'first_name'),
+        # emails and phones are unique per user, so two users can keep the same friend
+        UniqueConstraint('user_id', 'email', name='uq_contacts_user_id_email'),
+        UniqueConstraint('user_id', 'phone', name='uq_contacts_user_id_phone'),
+        # substring search: ILIKE '%term%' is served by trigram indexes on Postgres
+        *(Index(f'ix_contacts_{name}_trgm', name, postgresql_using='gin',
+                postgresql_ops={name: 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+          for name in ('first_name', 'last_name', 'email', 'phone')),
+        # on Postgres the table is hash partitioned by user_id, every user-scoped query is pruned
+        # to one partition; the primary key of a partitioned table must include the partition key
+        {'postgresql_partition_by': 'HASH (user_id)', 'info': {'partition_key': 'user_id'}},
+    )
+
+    @validates('birthday')
+    def _sync_birthday_mmdd(self, key, value):
+        self.birthday_mmdd = birthday_mmdd(value)
+        return value
+
+
+# fields searched by substring, see src.repository.contacts.search_filters
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'phone')
+
+# SQLite has no trigram indexes, an external content FTS5 table with the trigram
+# tokenizer serves LIKE '%term%' instead. It is created and kept in sync with
+# ``contacts`` by triggers whenever the metadata is created on SQLite.
+contacts_fts = table('contacts_fts', column('rowid'), *(column(name) for name in SEARCH_FIELDS))
+
+_fields = ', '.join(SEARCH_FIELDS)
+_new = ', '.join(f'new.{name}' for name in SEARCH_FIELDS)
+_old = ', '.join(f'old.{name}' for name in SEARCH_FIELDS)
+
+for _ddl in (
+    f"CREATE VIRTUAL TABLE contacts_fts USING fts5({_fields}, content='contacts', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(rowid, {_fields}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_fields}) VALUES ('delete', old.id, {_old}); END",
+    f"CREATE TRIGGER contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_fields}) VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO contacts_fts(rowid, {_fields}) VALUES (new.id, {_new}); END",
+):
+    event.listen(Contact.__table__, 'after_create', DDL(_ddl).execute_if(dialect='sqlite'))
+event.listen(Contact.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS contacts_fts').execute_if(dialect='sqlite'))
+
+for _remainder in range(CONTACTS_PARTITIONS):
+    event.listen(Contact.__table__, 'after_create', DDL(
+        f"CREATE TABLE contacts_p{_remainder:02} PARTITION OF contacts "
+        f"FOR VALUES WITH (MODULUS {CONTACTS_PARTITIONS}, REMAINDER {_remainder})"
+    ).execute_if(dialect='postgresql'))
+
+
+@compiles(PrimaryKeyConstraint, 'postgresql')
+def _partitioned_primary_key(constraint, compiler, **kw):
+    """
+    Appends the partition key to the primary key of a partitioned table.
+
+    The ORM keeps identifying contacts by ``id`` alone, which stays unique through its sequence.
+    """
+    key = constraint.table.info.get('partition_key')
+    if key is None or key in constraint.columns:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = [*constraint.columns, constraint.table.c[key]]
+    text = f"CONSTRAINT {compiler.preparer.format_constraint(constraint)} " if constraint.name else ""
+    return text + f"PRIMARY KEY ({', '.join(compiler.preparer.quote(col.name) for col in columns)})"
+
+
+event.listen(Base.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
 
 
 class User(Base):
@@ -29,4 +120,10 @@ class User(Base):
     updated_at = Column('updated_at', DateTime, default=func.now(), onupdate=func.now(), nullable=True)
     refresh_token = Column(String(255), nullable=True)
     avatar = Column(String, nullable=True)
-    confirmed = Column(Boolean, default=False)
\ No newline at end of file
+    confirmed = Column(Boolean, default=False)
+
+    # case-insensitive lookups by email, see src.repository.users.get_user_by_email,
+    # so two emails may not differ in case only
+    __table_args__ = (
+        Index('ix_users_email_lower', func.lower(email), unique=True),
+    )
\ No newline at end of file
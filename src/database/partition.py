@@ -0,0 +1,256 @@
+"""
+Online migration of ``contacts`` to a table hash partitioned by ``user_id`` on Postgres.
+
+1. ``alembic upgrade e3b9d7f1a2c5`` creates ``contacts_partitioned`` with the partitions,
+   constraints and indexes of the model, and a trigger that mirrors every write on
+   ``contacts`` into it.
+2. ``python -m src.database.partition copy`` copies the existing rows in short chunks,
+   each in its own transaction, while the application keeps running.
+3. ``python -m src.database.partition verify`` compares both tables in one snapshot.
+4. ``alembic upgrade head`` swaps the tables in one short transaction and keeps the old
+   table as ``contacts_unpartitioned`` until it is dropped by hand.
+"""
+import argparse
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from src.conf.config import get_settings
+from src.database.db import sync_url
+from src.database.models import Contact, CONTACTS_PARTITIONS
+from src.services.logger import logger
+
+
+SOURCE = "contacts"
+SHADOW = "contacts_partitioned"
+# the old table after the swap, its index and constraint names get the same suffix
+RETIRED = "contacts_unpartitioned"
+RETIRED_SUFFIX = "_unpartitioned"
+# suffix of the index and constraint names of the shadow table until the swap
+SUFFIX = "_part"
+
+# defaults of copy_rows, the command line takes PARTITION_CHUNK_SIZE and PARTITION_CHUNK_PAUSE
+CHUNK_SIZE = 5000
+CHUNK_PAUSE = 0.05
+
+# primary key, unique and foreign key constraints, renamed together with the tables
+CONSTRAINTS = {
+    "contacts_pkey": "PRIMARY KEY (id, user_id)",
+    "uq_contacts_user_id_email": "UNIQUE (user_id, email)",
+    "uq_contacts_user_id_phone": "UNIQUE (user_id, phone)",
+    "contacts_user_id_fkey": "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE",
+}
+
+# rows are deleted and re-inserted so an update that moves a row to another user
+# also moves it to the right partition
+MIRROR_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION contacts_mirror() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM {SHADOW} WHERE id = OLD.id AND user_id IS NOT DISTINCT FROM OLD.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {SHADOW} VALUES (NEW.*) ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+MIRROR_TRIGGER = (f"CREATE TRIGGER contacts_mirror AFTER INSERT OR UPDATE OR DELETE ON {SOURCE} "
+                  f"FOR EACH ROW EXECUTE FUNCTION contacts_mirror()")
+
+# FOR SHARE makes a concurrent update wait for the chunk, so its mirrored row always wins
+COPY_CHUNK = (f"INSERT INTO {SHADOW} SELECT * FROM {SOURCE} WHERE id > :low AND id <= :high FOR SHARE "
+              f"ON CONFLICT DO NOTHING")
+
+
+def index_sql(index, table: str, name: str) -> str:
+    """
+    Renders ``CREATE INDEX`` for an index of the model on another table.
+
+    Args:
+        index (Index): The index of ``Contact.__table__``.
+        table (str): The table to create the index on.
+        name (str): The name of the new index.
+
+    Returns:
+        str: The DDL statement.
+    """
+    options = index.dialect_options["postgresql"]
+    ops = options["ops"] or {}
+    columns = ", ".join(f"{col.name} {ops[col.name]}" if col.name in ops else col.name for col in index.columns)
+    using = f" USING {options['using']}" if options["using"] else ""
+    return f"CREATE INDEX {name} ON {table}{using} ({columns})"
+
+
+def shadow_statements(partitions: int = CONTACTS_PARTITIONS) -> list[str]:
+    """
+    Builds the DDL of the partitioned shadow table and of the mirroring trigger.
+
+    Args:
+        partitions (int): The number of hash partitions.
+
+    Returns:
+        list[str]: The statements, in order.
+    """
+    constraints = ", ".join(f"CONSTRAINT {name}{SUFFIX} {body}" for name, body in CONSTRAINTS.items())
+    statements = [
+        f"CREATE TABLE {SHADOW} (LIKE {SOURCE} INCLUDING DEFAULTS INCLUDING STORAGE, {constraints}) "
+        f"PARTITION BY HASH (user_id)",
+        *(f"CREATE TABLE contacts_p{remainder:02} PARTITION OF {SHADOW} "
+          f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})" for remainder in range(partitions)),
+        *(index_sql(index, SHADOW, f"{index.name}{SUFFIX}") for index in sorted(Contact.__table__.indexes,
+                                                                              key=lambda index: index.name)),
+        MIRROR_FUNCTION,
+        MIRROR_TRIGGER,
+    ]
+    return statements
+
+
+def rename_statements(source: str, target: str, old_suffix: str, new_suffix: str) -> list[str]:
+    """
+    Builds the statements that rename a table together with its indexes and constraints.
+
+    Args:
+        source (str): The current name of the table.
+        target (str): The new name of the table.
+        old_suffix (str): The current suffix of the index and constraint names.
+        new_suffix (str): The new suffix of the index and constraint names.
+
+    Returns:
+        list[str]: The statements, in order.
+    """
+    return [
+        f"ALTER TABLE {source} RENAME TO {target}",
+        *(f"ALTER TABLE {target} RENAME CONSTRAINT {name}{old_suffix} TO {name}{new_suffix}" for name in CONSTRAINTS),
+        *(f"ALTER INDEX {index.name}{old_suffix} RENAME TO {index.name}{new_suffix}"
+          for index in sorted(Contact.__table__.indexes, key=lambda index: index.name)),
+    ]
+
+
+def swap_statements() -> list[str]:
+    """
+    Builds the statements that put the partitioned table in place of ``contacts``.
+
+    Returns:
+        list[str]: The statements, in order, to run in one transaction after ``check_copied``.
+    """
+    return [
+        f"DROP TRIGGER contacts_mirror ON {SOURCE}",
+        "DROP FUNCTION contacts_mirror()",
+        *rename_statements(SOURCE, RETIRED, "", RETIRED_SUFFIX),
+        *rename_statements(SHADOW, SOURCE, SUFFIX, ""),
+        f"ALTER SEQUENCE contacts_id_seq OWNED BY {SOURCE}.id",
+    ]
+
+
+def unswap_statements() -> list[str]:
+    """
+    Builds the statements that put the unpartitioned table back, the reverse of ``swap_statements``.
+
+    Returns:
+        list[str]: The statements, in order.
+    """
+    return [
+        *rename_statements(SOURCE, SHADOW, "", SUFFIX),
+        *rename_statements(RETIRED, SOURCE, RETIRED_SUFFIX, ""),
+        f"ALTER SEQUENCE contacts_id_seq OWNED BY {SOURCE}.id",
+        MIRROR_FUNCTION,
+        MIRROR_TRIGGER,
+    ]
+
+
+def count_rows(conn: Connection) -> tuple[int, int]:
+    """
+    Counts the rows of ``contacts`` and of the shadow table in one statement.
+
+    Args:
+        conn (Connection): The connection to use.
+
+    Returns:
+        tuple[int, int]: The number of rows of the source and of the shadow table.
+    """
+    row = conn.execute(text(f"SELECT (SELECT count(*) FROM {SOURCE}), (SELECT count(*) FROM {SHADOW})")).one()
+    return row[0], row[1]
+
+
+def check_copied(conn: Connection):
+    """
+    Fails unless every row of ``contacts`` is in the shadow table.
+
+    Args:
+        conn (Connection): The connection to use, ``contacts`` should be locked against writes.
+
+    Raises:
+        RuntimeError: If the shadow table is missing rows.
+    """
+    source, shadow = count_rows(conn)
+    if source != shadow:
+        raise RuntimeError(f"{SHADOW} has {shadow} of {source} rows, run 'python -m src.database.partition copy' first")
+
+
+def copy_rows(engine: Engine, chunk_size: int = CHUNK_SIZE, pause: float = CHUNK_PAUSE) -> int:
+    """
+    Copies the existing rows of ``contacts`` to the shadow table in chunks of ids.
+
+    Each chunk runs in its own short transaction so vacuum and the application are never
+    held back for long. Rows written meanwhile reach the shadow table through the trigger,
+    so the copy can be interrupted and restarted at any time.
+
+    Args:
+        engine (Engine): A sync engine connected to the database.
+        chunk_size (int): The number of ids copied per transaction.
+        pause (float): Seconds to sleep between chunks.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    with engine.connect() as conn:
+        low, high = conn.execute(text(f"SELECT coalesce(min(id), 1) - 1, coalesce(max(id), 0) FROM {SOURCE}")).one()
+    copied = 0
+    while low < high:
+        with engine.begin() as conn:
+            copied += conn.execute(text(COPY_CHUNK), {"low": low, "high": low + chunk_size}).rowcount
+        low += chunk_size
+        logger.info("Copied contacts up to id %s of %s, %s rows", min(low, high), high, copied)
+        if pause:
+            time.sleep(pause)
+    return copied
+
+
+def verify(engine: Engine) -> bool:
+    """
+    Compares the row counts of both tables in one snapshot.
+
+    Args:
+        engine (Engine): A sync engine connected to the database.
+
+    Returns:
+        bool: True if the shadow table holds every row of ``contacts``.
+    """
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        source, shadow = count_rows(conn)
+    logger.info("%s: %s rows, %s: %s rows", SOURCE, source, SHADOW, shadow)
+    return source == shadow
+
+
+def main(argv: list[str] | None = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m src.database.partition", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("copy", "verify"))
+    parser.add_argument("--chunk-size", type=int, default=settings.partition_chunk_size)
+    parser.add_argument("--pause", type=float, default=settings.partition_chunk_pause)
+    args = parser.parse_args(argv)
+    engine = create_engine(sync_url(settings.sqlalchemy_database_url_f or settings.sqlalchemy_database_url))
+    try:
+        if args.command == "copy":
+            copy_rows(engine, args.chunk_size, args.pause)
+        return 0 if verify(engine) else 1
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
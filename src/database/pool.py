@@ -0,0 +1,157 @@
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class WaitHistogram:
+    """
+    A cumulative histogram of connection checkout wait times.
+
+    Attributes:
+        buckets (tuple[float, ...]): Upper bounds of the buckets in milliseconds.
+        counts (list[int]): Number of observations per bucket, the last one is ``+Inf``.
+        total (int): Number of observations.
+        sum_ms (float): Sum of all observed wait times in milliseconds.
+    """
+    buckets = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, wait_ms: float):
+        """
+        Records a single wait time.
+
+        Args:
+            wait_ms (float): The wait time in milliseconds.
+        """
+        self.counts[bisect_left(self.buckets, wait_ms)] += 1
+        self.total += 1
+        self.sum_ms += wait_ms
+        self.max_ms = max(self.max_ms, wait_ms)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the histogram as cumulative ``le`` buckets.
+
+        Returns:
+            dict: Count, sum, max and the cumulative bucket counts.
+        """
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.total, "sum_ms": round(self.sum_ms, 3), "max_ms": round(self.max_ms, 3), "buckets": buckets}
+
+
+class PoolMetrics:
+    """
+    Live counters for the connection pool of an engine.
+
+    Attributes:
+        wait (WaitHistogram): Checkout wait time histogram.
+        connects (int): Number of new DBAPI connections opened.
+        checkouts (int): Number of connections handed out by the pool.
+        timeouts (int): Number of checkouts that failed with a pool timeout.
+        invalidations (int): Number of connections invalidated (e.g. by pre-ping).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all counters and the histogram.
+        """
+        self.wait = WaitHistogram()
+        self.connects = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+
+    def attach(self, pool):
+        """
+        Subscribes the counters to the events of the given pool.
+
+        Args:
+            pool (Pool): The pool of the engine (``engine.sync_engine.pool``).
+        """
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def snapshot(self, pool) -> dict:
+        """
+        Collects the current state of the pool together with the counters.
+
+        Args:
+            pool (Pool): The pool to report on.
+
+        Returns:
+            dict: Pool gauges, counters and the wait time histogram.
+        """
+        stats = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+            )
+        stats.update(
+            connects=self.connects,
+            checkouts=self.checkouts,
+            timeouts=self.timeouts,
+            invalidations=self.invalidations,
+            wait=self.wait.snapshot(),
+        )
+        return stats
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    An async queue pool that measures how long each checkout waits for a connection.
+
+    Every pool counts into its own ``metrics``. ``engine.dispose()`` replaces the pool with
+    a copy that shares the event listeners of the old one, so the copy keeps its metrics too.
+
+    Attributes:
+        metrics (PoolMetrics): The counters of this pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        # a recreated pool gets the listeners, and in recreate the metrics, of the old pool
+        if "_dispatch" not in kwargs:
+            self.metrics.attach(self)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.wait.observe((time.perf_counter() - start) * 1000)
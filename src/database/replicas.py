@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import OrderedDict
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from redis.exceptions import RedisError
+
+from src.services.client_redis import client_redis
+from src.services.logger import logger
+
+
+class ReplicaSet:
+    """
+    Read replicas served round-robin, skipping the ones that failed their health check.
+
+    A replica is marked down when ``check`` cannot run ``SELECT 1`` on it or when one of
+    its connections is lost mid-request, and back up by the next successful ``check``.
+
+    Attributes:
+        engines (list[AsyncEngine]): One engine per replica.
+        sessions (list[async_sessionmaker]): One session factory per replica.
+        healthy (list[bool]): Whether each replica passed its last health check.
+        check_interval (float): Seconds between two health checks of ``run_checks``.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], check_interval: float = 5.0):
+        self.engines = engines
+        self.sessions = [async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+                         for engine in engines]
+        self.healthy = [True] * len(engines)
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        for index, engine in enumerate(engines):
+            event.listen(engine.sync_engine, "handle_error", self._on_error(index))
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def _on_error(self, index: int):
+        def on_error(context):
+            if context.is_disconnect:
+                self.mark(index, False)
+        return on_error
+
+    def mark(self, index: int, healthy: bool):
+        """
+        Records the health of a replica, logging state changes.
+
+        Args:
+            index (int): The position of the replica.
+            healthy (bool): Whether the replica can serve reads.
+        """
+        if self.healthy[index] != healthy:
+            logger.warning("Read replica %s is %s", self.engines[index].url.render_as_string(),
+                           "up" if healthy else "down")
+        self.healthy[index] = healthy
+
+    def pick(self) -> async_sessionmaker | None:
+        """
+        Chooses the next healthy replica in round-robin order.
+
+        Returns:
+            async_sessionmaker | None: Its session factory, or None if no replica is healthy.
+        """
+        for _ in range(len(self.engines)):
+            index = next(self._next) % len(self.engines)
+            if self.healthy[index]:
+                return self.sessions[index]
+        return None
+
+    async def check(self) -> list[bool]:
+        """
+        Runs ``SELECT 1`` on every replica and updates their health.
+
+        Returns:
+            list[bool]: The health of each replica.
+        """
+        for index, engine in enumerate(self.engines):
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                self.mark(index, True)
+            except (SQLAlchemyError, OSError):
+                self.mark(index, False)
+        return list(self.healthy)
+
+    async def run_checks(self):
+        """
+        Checks the replicas every ``check_interval`` seconds until cancelled.
+        """
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def dispose(self):
+        """
+        Closes the connection pools of every replica.
+        """
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RecentWrites:
+    """
+    The read-your-writes window: users who wrote within the last ``window`` seconds read from the primary.
+
+    Writes are recorded in process and, for the other workers, as a Redis key that expires
+    with the window. If Redis cannot be asked, a user is treated as a recent writer.
+
+    Attributes:
+        window (float): Seconds after a write during which the user reads from the primary.
+        maxsize (int): Maximum number of users tracked in process.
+    """
+
+    def __init__(self, window: float = 5.0, maxsize: int = 10000):
+        self.window = window
+        self.maxsize = maxsize
+        self._deadlines: OrderedDict[str, float] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    def key(subject: str) -> str:
+        """
+        Builds the Redis key of a user's write marker.
+
+        Args:
+            subject (str): The email address of the user.
+
+        Returns:
+            str: The Redis key.
+        """
+        return f"recent-write:{subject.lower()}"
+
+    def mark(self, subject: str):
+        """
+        Records a committed write of a user.
+
+        Called from synchronous session events, so the Redis marker is set in a background task.
+
+        Args:
+            subject (str): The email address of the user.
+        """
+        if self.window <= 0:
+            return
+        subject = subject.lower()
+        self._deadlines.pop(subject, None)
+        self._deadlines[subject] = time.monotonic() + self.window
+        while len(self._deadlines) > self.maxsize:
+            self._deadlines.popitem(last=False)
+        try:
+            task = asyncio.get_running_loop().create_task(self._publish(subject))
+        except RuntimeError:
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, subject: str):
+        try:
+            await client_redis.r.set(self.key(subject), 1, ex=max(1, math.ceil(self.window)))
+        except RedisError as err:
+            logger.warning("Redis set %s failed: %s", self.key(subject), err)
+
+    async def recent(self, subject: str) -> bool:
+        """
+        Tells whether a user wrote within the window.
+
+        Args:
+            subject (str): The email address of the user.
+
+        Returns:
+            bool: True if the user's reads must go to the primary.
+        """
+        if self.window <= 0:
+            return False
+        subject = subject.lower()
+        deadline = self._deadlines.get(subject)
+        if deadline is not None:
+            if deadline > time.monotonic():
+                return True
+            del self._deadlines[subject]
+        try:
+            return await client_redis.r.get(self.key(subject)) is not None
+        except RedisError:
+            return True
+
+    def clear(self):
+        """
+        Forgets every write recorded in process.
+        """
+        self._deadlines.clear()
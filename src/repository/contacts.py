@@ -1,22 +1,158 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import text, func, and_
+import operator
+from functools import reduce
+from typing import AsyncIterator, Collection, Iterable
+from sqlalchemy import select, update, delete, func, and_, or_, case, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import with_expression
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
-from datetime import datetime, timedelta, date
+from datetime import datetime, time, timedelta, date
 
-from src.database.models import Contact
-from src.schemas.contact import ContactUpdate, ContactSchema, ContactDataUpdate, ContactResponse
+from src.conf.config import Settings
+from src.database.models import Contact, User, SEARCH_FIELDS, contacts_fts, birthday_mmdd
+from src.schemas.contact import (ContactUpdate, ContactSchema, ContactDataUpdate, ContactResponse,
+                                 ContactBulkResponse, BulkRowError, ContactSelection, ContactBulkUpdate)
 from src.services.client_redis import client_redis
+from src.services.pagination import encode_cursor, decode_cursor
+
+
+# set from the settings by configure
+CACHE_ENABLED = True
+BIRTHDAYS_WINDOW_DAYS = 7
+BULK_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+# users whose birthday digests are built with one query and one Redis round trip
+DIGEST_BATCH_SIZE = 500
+
+
+def configure(settings: Settings):
+    """
+    Takes the contact cache, birthday window and batch sizes from the settings.
+
+    Args:
+        settings (Settings): The settings of the application.
+    """
+    global CACHE_ENABLED, BIRTHDAYS_WINDOW_DAYS, BULK_BATCH_SIZE, EXPORT_BATCH_SIZE
+    CACHE_ENABLED = settings.contacts_cache_enabled
+    BIRTHDAYS_WINDOW_DAYS = settings.birthdays_window_days
+    BULK_BATCH_SIZE = settings.bulk_batch_size
+    EXPORT_BATCH_SIZE = settings.export_batch_size
+
+
+# INSERT ... ON CONFLICT DO NOTHING of the supported databases
+INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# sort keys for keyset pagination, each ends with the primary key to make it unique
+ORDERINGS = {
+    "id": (Contact.id,),
+    "last_name": (Contact.last_name, Contact.id),
+}
+
+
+def paginate(stmt, skip: int, limit: int, cursor: str | None = None, order_by: str = "id"):
+    """
+    Orders a contacts query and applies keyset or legacy offset pagination.
+
+    With a cursor the query seeks past the last row of the previous page, so it costs
+    the same on every page with the ``(user_id, <sort key>)`` indexes. Without one it
+    falls back to ``skip``.
+
+    Args:
+        stmt (Select): The query to paginate.
+        skip (int): The number of rows to skip when no cursor is given.
+        limit (int): The maximum number of rows to return.
+        cursor (str, optional): The cursor of the page to return.
+        order_by (str): The ordering, a key of ``ORDERINGS``.
+
+    Returns:
+        Select: The paginated query.
+    """
+    columns = ORDERINGS[order_by]
+    stmt = stmt.order_by(*columns)
+    if cursor:
+        key = decode_cursor(cursor, order_by, len(columns))
+        try:
+            key = [column.type.python_type(value) for column, value in zip(columns, key)]
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if len(columns) == 1:
+            stmt = stmt.filter(columns[0] > key[0])
+        else:
+            stmt = stmt.filter(tuple_(*columns) > tuple_(*key))
+    elif skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+
+def next_cursor(contacts: list, limit: int, order_by: str = "id") -> str | None:
+    """
+    Builds the cursor of the next page.
+
+    The caller fetches ``limit + 1`` rows, the extra row only tells that another page exists.
+
+    Args:
+        contacts (list): The fetched rows, up to ``limit + 1``.
+        limit (int): The page size.
+        order_by (str): The ordering of the rows.
+
+    Returns:
+        str | None: The cursor of the next page, or None if this is the last one or the page is empty.
+    """
+    if limit <= 0 or len(contacts) <= limit:
+        return None
+    last = contacts[limit - 1]
+    return encode_cursor(order_by, [getattr(last, column.key) for column in ORDERINGS[order_by]])
+
+
+def contact_key(user_id: int, generation: int, contact_id: int) -> str:
+    """Cache key of a single contact in the given generation."""
+    return f"contacts:{user_id}:g{generation}:id:{contact_id}"
+
+
+def generation_key(user_id: int) -> str:
+    """Cache key of the generation counter of a user's contact lists."""
+    return f"contacts:{user_id}:gen"
+
+
+def birthdays_generation_key(user_id: int) -> str:
+    """Cache key of the generation counter of a user's birthday digests."""
+    return f"contacts:{user_id}:birthdays:gen"
+
+
+def page_key(user_id: int, generation: int, *page) -> str:
+    """Cache key of one page of a user's contacts in the given generation."""
+    return f"contacts:{user_id}:g{generation}:page:" + ":".join(str(part) for part in page)
+
+
+async def invalidate_contacts(user_id: int):
+    """
+    Drops every cached contact and page of the user, see ``invalidate_birthdays`` for the digests.
+
+    Entries are not deleted or rewritten one by one: bumping the generation counter makes
+    all of them unreachable and they expire on their own. Readers read the generation
+    before the database, so a reader that loaded a row before the write caches it under
+    the previous generation, where nobody looks it up, instead of overwriting a fresher entry.
+    Call it after the write is committed.
+
+    Args:
+        user_id (int): The user's identifier.
+    """
+    if CACHE_ENABLED:
+        await client_redis.redis_bump(generation_key(user_id))
 
 
 # test is ready
-async def create_contact(user_id: int, body: ContactSchema,  db: Session) -> Contact:
+async def create_contact(user_id: int, body: ContactSchema,  db: AsyncSession) -> Contact:
     """
     Creates a new contact for the user.
 
     Args:
         user_id (int): Identifier of the user.
         body (ContactSchema): New contact details.
-        db (Session): Data base sessions.
+        db (AsyncSession): Data base sessions.
 
     Returns:
         Contact: Established contact.
@@ -31,157 +167,447 @@ async def create_contact(user_id: int, body: ContactSchema,  db: Session) -> Con
         user_id = user_id
     )
     db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    await db.commit()
+    await db.refresh(contact)
+    await invalidate_contacts(user_id)
+    await invalidate_birthdays(user_id, [contact.birthday_mmdd])
     return contact
 
 
+async def insert_batch(user_id: int, batch: list[tuple[int, ContactSchema]], db: AsyncSession) -> list[BulkRowError]:
+    """
+    Inserts a batch of contacts in one statement and one transaction.
+
+    Rows whose email or phone the user already has are skipped by ``ON CONFLICT DO NOTHING``
+    instead of failing the batch, and reported back.
+
+    Args:
+        user_id (int): The user's identifier.
+        batch (list[tuple[int, ContactSchema]]): Row numbers and contacts.
+        db (AsyncSession): The database session.
+
+    Returns:
+        list[BulkRowError]: The rows that were not inserted.
+    """
+    values = [{**body.model_dump(), "birthday_mmdd": birthday_mmdd(body.birthday), "user_id": user_id}
+              for _, body in batch]
+    stmt = INSERTS[db.get_bind().dialect.name](Contact).on_conflict_do_nothing().returning(Contact.email)
+    inserted = set((await db.execute(stmt, values)).scalars().all())
+    await db.commit()
+    skipped = [(row, body) for row, body in batch if body.email not in inserted]
+    if not skipped:
+        return []
+    stmt = select(Contact.email, Contact.phone).filter(Contact.user_id == user_id,
+                                                       or_(Contact.email.in_([body.email for _, body in skipped]),
+                                                           Contact.phone.in_([body.phone for _, body in skipped])))
+    taken = (await db.execute(stmt)).all()
+    emails = {email for email, _ in taken}
+    return [BulkRowError(row=row, detail=f"Contact with email {body.email} already exists" if body.email in emails
+                         else f"Contact with phone {body.phone} already exists") for row, body in skipped]
+
+
+async def bulk_create_contacts(user_id: int, rows: AsyncIterator[tuple[int, ContactSchema | str]], db: AsyncSession,
+                               batch_size: int | None = None) -> ContactBulkResponse:
+    """
+    Imports contacts for the user in batches of ``batch_size`` rows.
+
+    Rows are consumed as they are parsed, so the upload is never held in memory. Invalid
+    rows, duplicates within the upload and unique conflicts with stored contacts are
+    reported by row number and do not stop the import.
+
+    Args:
+        user_id (int): The user's identifier.
+        rows (AsyncIterator[tuple[int, ContactSchema | str]]): Row numbers and contacts or
+            rejection reasons, see ``src.services.bulk.parse_rows``.
+        db (AsyncSession): The database session.
+        batch_size (int): The number of rows per INSERT. Defaults to ``BULK_BATCH_SIZE``.
+
+    Returns:
+        ContactBulkResponse: The number of created contacts and the rejected rows.
+    """
+    batch_size = batch_size or BULK_BATCH_SIZE
+    created, errors, batch = 0, [], []
+    emails, phones, birthdays = {}, {}, set()
+    async for row, body in rows:
+        if isinstance(body, str):
+            errors.append(BulkRowError(row=row, detail=body))
+        elif body.email in emails:
+            errors.append(BulkRowError(row=row, detail=f"Duplicate email of row {emails[body.email]}"))
+        elif body.phone in phones:
+            errors.append(BulkRowError(row=row, detail=f"Duplicate phone of row {phones[body.phone]}"))
+        else:
+            emails[body.email] = phones[body.phone] = row
+            birthdays.add(birthday_mmdd(body.birthday))
+            batch.append((row, body))
+        if len(batch) >= batch_size:
+            failed = await insert_batch(user_id, batch, db)
+            created, batch = created + len(batch) - len(failed), []
+            errors.extend(failed)
+    if batch:
+        failed = await insert_batch(user_id, batch, db)
+        created += len(batch) - len(failed)
+        errors.extend(failed)
+    if created:
+        await invalidate_contacts(user_id)
+        await invalidate_birthdays(user_id, birthdays)
+    errors.sort(key=lambda error: error.row)
+    return ContactBulkResponse(created=created, errors=errors)
+
+
 # test is ready 
-async def get_contacts(user_id: int, skip: int, limit: int, db: Session) -> list[Contact] | list:
+async def get_contacts(user_id: int, skip: int, limit: int, db: AsyncSession,
+                       cursor: str | None = None, order_by: str = "id") -> list[Contact] | list:
     """
     Retrieves user contacts.
 
     Args:
         user_id (int): The user's identifier.
-        skip (int): The number of contacts to skip.
+        skip (int): The number of contacts to skip, ignored when a cursor is given.
         limit (int): The maximum number of contacts to return.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
+        cursor (str, optional): The keyset cursor of the page to return.
+        order_by (str): Sort by ``"id"`` or ``"last_name"``. Defaults to ``"id"``.
 
     Returns:
         list[Contact] | list: A list of user contacts or an empty list if no contacts are found.
     """
-    contacts = client_redis.redis_get(user_id)
-    if contacts:
-        return contacts
-    contacts = db.query(Contact).filter(Contact.user_id==user_id).offset(skip).limit(limit).all()
-    client_redis.redis_set(user_id, contacts)
-    client_redis.redis_expire(user_id)
+    generation = await client_redis.redis_generation(generation_key(user_id)) if CACHE_ENABLED else None
+    key = page_key(user_id, generation, order_by, cursor or skip, limit)
+    if generation is not None:
+        contacts = await client_redis.redis_get(key, ContactResponse, many=True)
+        if contacts is not None:
+            return contacts
+    stmt = paginate(select(Contact).filter(Contact.user_id==user_id), skip, limit, cursor, order_by)
+    contacts = (await db.execute(stmt)).scalars().all()
+    if generation is not None:
+        await client_redis.redis_set(key, [ContactResponse.model_validate(contact) for contact in contacts])
     return contacts
 
 
+async def stream_contacts(user_id: int, db: AsyncSession, batch_size: int | None = None) -> AsyncIterator[Contact]:
+    """
+    Streams all contacts of the user ordered by id through a server-side cursor.
+
+    Rows are fetched ``batch_size`` at a time, so memory use does not depend on the
+    number of contacts.
+
+    Args:
+        user_id (int): The user's identifier.
+        db (AsyncSession): The database session.
+        batch_size (int): The number of rows fetched at a time. Defaults to ``EXPORT_BATCH_SIZE``.
+
+    Yields:
+        Contact: The user's contacts.
+    """
+    stmt = (select(Contact).filter(Contact.user_id == user_id).order_by(Contact.id)
+            .execution_options(yield_per=batch_size or EXPORT_BATCH_SIZE))
+    result = await db.stream(stmt)
+    try:
+        async for contact in result.scalars():
+            yield contact
+    finally:
+        await result.close()
+
+
 # test is ready
-async def get_contact(user_id: int, contact_id: int, db: Session) -> Contact | None:
+async def get_contact(user_id: int, contact_id: int, db: AsyncSession) -> Contact | None:
     """
     Retrieves a user's contact by its ID.
 
     Args:
         user_id (int): The user's identifier.
         contact_id (int): The ID of the contact to retrieve.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         Contact | None: The requested contact if found, else None.
     """
-    contact = client_redis.redis_get(user_id)
-    if contact:
-        return contact
-    contact = db.query(Contact).filter(and_(Contact.id==contact_id, Contact.user_id==user_id)).first()
-    client_redis.redis_set(user_id, contact)
-    client_redis.redis_expire(user_id)
+    generation = await client_redis.redis_generation(generation_key(user_id)) if CACHE_ENABLED else None
+    if generation is not None:
+        contact = await client_redis.redis_get(contact_key(user_id, generation, contact_id), ContactResponse)
+        if contact:
+            return contact
+    stmt = select(Contact).filter(and_(Contact.id==contact_id, Contact.user_id==user_id))
+    contact = (await db.execute(stmt)).scalars().first()
+    if contact and generation is not None:
+        await client_redis.redis_set(contact_key(user_id, generation, contact_id), ContactResponse.model_validate(contact))
     return contact
 
 
 # test is ready
-async def remove_contact(user_id: int, contact_id: int, db: Session) -> Contact | None:
+async def remove_contact(user_id: int, contact_id: int, db: AsyncSession) -> Contact | None:
     """
-    Removes a contact associated with a user.
+    Removes a contact associated with a user with a single DELETE ... RETURNING.
 
     Args:
         user_id (int): The user's identifier.
         contact_id (int): The ID of the contact to remove.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         Contact | None: The removed contact if found, else None.
     """
-    contact = db.query(Contact).filter(and_(Contact.id==contact_id, Contact.user_id==user_id)).first()
+    stmt = (delete(Contact).where(Contact.id == contact_id, Contact.user_id == user_id).returning(Contact)
+            .execution_options(synchronize_session=False))
+    contact = (await db.execute(stmt)).scalars().first()
+    await db.commit()
     if contact:
-        db.delete(contact)
-        db.commit()
+        await invalidate_contacts(user_id)
+        await invalidate_birthdays(user_id, [contact.birthday_mmdd])
     return contact
 
 
 # test is ready
-async def update_contact(user_id: int, contact_id: int, body: ContactUpdate, db: Session) -> Contact | None:
+async def update_contact(user_id: int, contact_id: int, body: ContactUpdate, db: AsyncSession) -> Contact | None:
     """
-    Updates the details of a user's contact.
+    Updates the details of a user's contact with a single UPDATE ... RETURNING.
 
     Args:
         user_id (int): The user's identifier.
         contact_id (int): The ID of the contact to update.
         body (ContactUpdate): The updated details of the contact.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         Contact | None: The updated contact if found, else None.
     """
-    contact = db.query(Contact).filter(and_(Contact.id==contact_id, Contact.user_id==user_id)).first()
+    stmt = (update(Contact).where(Contact.id == contact_id, Contact.user_id == user_id)
+            .values(**body.model_dump(), birthday_mmdd=birthday_mmdd(body.birthday)).returning(Contact)
+            .execution_options(synchronize_session=False, populate_existing=True))
+    contact = (await db.execute(stmt)).scalars().first()
+    await db.commit()
     if contact:
-        contact.first_name = body.first_name
-        contact.last_name = body.last_name
-        # user = db.query(Contact).filter(Contact.email==body.email).first() не помню зачем я сделал єто
-        
-        # if user is None:
-        contact.email = body.email
-        # user = db.query(Contact).filter(Contact.phone==body.phone).first() не помню зачем я сделал єто
-
-        # if user is None:
-        contact.phone = body.phone
-        contact.birthday = body.birthday
-        contact.data = body.data
-        db.commit()
+        await invalidate_contacts(user_id)
+        # the previous birthday is not returned, today's digest tells whether it was upcoming
+        await invalidate_birthdays(user_id, [contact.birthday_mmdd], [contact.id])
     return contact
 
 
 # test is ready
-async def update_data_contact(user_id: int, contact_id: int, body: ContactDataUpdate, db: Session) -> Contact | None:
+async def update_data_contact(user_id: int, contact_id: int, body: ContactDataUpdate, db: AsyncSession) -> Contact | None:
     """
     Updates the data field of a user's contact.
 
+    The update only matches a contact whose data differs, so the common case is a single
+    UPDATE ... RETURNING; the contact is looked up again only to tell 404 from 409.
+
     Args:
         user_id (int): The user's identifier.
         contact_id (int): The ID of the contact to update.
         body (ContactDataUpdate): The updated data of the contact.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         Contact | None: The updated contact if found, else None.
     Raises:
         HTTPException: If the provided data conflicts with existing data.
     """
-    contact = db.query(Contact).filter(and_(Contact.user_id==user_id, Contact.id==contact_id)).first()
+    stmt = (update(Contact)
+            .where(Contact.id == contact_id, Contact.user_id == user_id, Contact.data.is_distinct_from(body.data))
+            .values(data=body.data).returning(Contact)
+            .execution_options(synchronize_session=False, populate_existing=True))
+    contact = (await db.execute(stmt)).scalars().first()
+    await db.commit()
     if contact:
-        if contact.data == body.data:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'With this data "{body.data}" data exists')
-        else:
-            contact.data = body.data
-            db.commit()
-    return contact
+        await invalidate_contacts(user_id)
+        await invalidate_birthdays(user_id, [contact.birthday_mmdd])
+        return contact
+    stmt = select(Contact.id).filter(Contact.id == contact_id, Contact.user_id == user_id)
+    if (await db.execute(stmt)).scalars().first() is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'With this data "{body.data}" data exists')
+    return None
+
+
+def window_bounds(today: date, days: int) -> tuple[int, int] | None:
+    """
+    Returns the first and last ``birthday_mmdd`` of a window, or None if it spans the whole year.
+    """
+    if days >= 365:
+        return None
+    return birthday_mmdd(today), birthday_mmdd(today + timedelta(days=days))
+
+
+def birthday_window(today: date, days: int):
+    """
+    Builds the filter of birthdays from ``today`` to ``days`` days later inclusive.
+
+    The filter compares ``birthday_mmdd`` with constants, so it is served by the
+    ``(user_id, birthday_mmdd)`` index. A window that crosses New Year is split into
+    the end of December and the start of January.
+
+    Args:
+        today (date): The first day of the window.
+        days (int): The length of the window in days.
+
+    Returns:
+        ColumnElement: The filter.
+    """
+    bounds = window_bounds(today, days)
+    if bounds is None:
+        return Contact.birthday_mmdd.isnot(None)
+    start, end = bounds
+    if start <= end:
+        return Contact.birthday_mmdd.between(start, end)
+    return or_(Contact.birthday_mmdd >= start, Contact.birthday_mmdd <= end)
+
+
+def in_birthday_window(mmdd: int | None, today: date, days: int) -> bool:
+    """
+    Checks a ``birthday_mmdd`` against the window of ``birthday_window`` in Python.
+    """
+    if mmdd is None:
+        return False
+    bounds = window_bounds(today, days)
+    if bounds is None:
+        return True
+    start, end = bounds
+    return start <= mmdd <= end if start <= end else mmdd >= start or mmdd <= end
+
+
+def digest_key(user_id: int, generation: int, day: date) -> str:
+    """Cache key of a user's birthday digest for one day in the given digest generation."""
+    return f"contacts:{user_id}:b{generation}:birthdays:{day.isoformat()}"
+
+
+def digest_ttl(day: date) -> int:
+    """Seconds until an hour past the end of ``day``, the lifetime of its digests."""
+    end = datetime.combine(day + timedelta(days=1), time.min) + timedelta(hours=1)
+    return max(int((end - datetime.now()).total_seconds()), 1)
+
+
+def page_digest(digest: list[ContactResponse], skip: int, limit: int, cursor: str | None) -> list[ContactResponse]:
+    """
+    Cuts one page out of a digest ordered by id, the same way ``paginate`` pages the query.
+    """
+    if cursor:
+        key = decode_cursor(cursor, "id", 1)
+        if not isinstance(key[0], int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        digest = [contact for contact in digest if contact.id > key[0]]
+    elif skip:
+        digest = digest[skip:]
+    return digest[:limit]
+
+
+async def invalidate_birthdays(user_id: int, birthdays: Iterable[int | None], changed: Collection[int] = ()):
+    """
+    Drops the birthday digests of the user if a write touched an upcoming birthday.
+
+    Digests list whole contacts, so they are dropped when a created, updated or removed
+    contact has its ``birthday_mmdd`` in the window, widened by a day to cover the digests
+    the job builds at midnight. ``changed`` are updated contacts whose previous birthday is
+    unknown: the digests are dropped if today's digest lists one of them, or if it is not
+    built, as a reader may be building it from the rows before the write. Writes to other
+    contacts keep the digests. Like ``invalidate_contacts`` the digest generation is bumped,
+    so a late write of a digest built before the change is never read.
+    Call it after the write is committed.
+
+    Args:
+        user_id (int): The user's identifier.
+        birthdays (Iterable[int | None]): The ``birthday_mmdd`` of the written contacts.
+        changed (Collection[int], optional): The contacts whose birthday may have been changed.
+    """
+    if not CACHE_ENABLED:
+        return
+    today = date.today()
+    key = birthdays_generation_key(user_id)
+    if not any(in_birthday_window(mmdd, today, BIRTHDAYS_WINDOW_DAYS + 1) for mmdd in birthdays):
+        if not changed:
+            return
+        generation = await client_redis.redis_generation(key)
+        if generation is None:
+            return
+        digest = await client_redis.redis_get(digest_key(user_id, generation, today), ContactResponse, many=True)
+        if digest is not None and not any(contact.id in changed for contact in digest):
+            return
+    await client_redis.redis_bump(key)
+
+
+async def materialize_birthdays(db: AsyncSession, today: date | None = None,
+                                batch_size: int = DIGEST_BATCH_SIZE) -> int:
+    """
+    Writes the birthday digest of every user for ``today``.
+
+    A digest is the list of contacts with a birthday in the next ``BIRTHDAYS_WINDOW_DAYS``
+    days. Users without upcoming birthdays get an empty digest, so the endpoint never
+    falls back to the database for them. Users are taken ``batch_size`` at a time: their
+    digest generations are read in one round trip before the query, their contacts are
+    fetched with one query on the ``(user_id, birthday_mmdd)`` index and their digests are
+    written in one round trip. A user who writes an upcoming contact meanwhile has bumped
+    the generation and gets the digest rebuilt on the next read.
+
+    Args:
+        db (AsyncSession): The database session.
+        today (date, optional): The day to build the digests for. Defaults to today.
+        batch_size (int): The number of users per query. Defaults to ``DIGEST_BATCH_SIZE``.
+
+    Returns:
+        int: The number of digests written.
+    """
+    today = today or date.today()
+    ttl = digest_ttl(today)
+    written, last = 0, None
+    while True:
+        stmt = select(User.id).order_by(User.id).limit(batch_size)
+        if last is not None:
+            stmt = stmt.filter(User.id > last)
+        user_ids = (await db.execute(stmt)).scalars().all()
+        if not user_ids:
+            return written
+        last = user_ids[-1]
+        generations = await client_redis.redis_generations(*(birthdays_generation_key(user_id) for user_id in user_ids))
+        if generations is None:
+            return written
+        stmt = (select(Contact).filter(Contact.user_id.in_(user_ids), birthday_window(today, BIRTHDAYS_WINDOW_DAYS))
+                .order_by(Contact.user_id, Contact.id))
+        digests = {user_id: [] for user_id in user_ids}
+        for contact in (await db.execute(stmt)).scalars():
+            digests[contact.user_id].append(ContactResponse.model_validate(contact))
+        await client_redis.redis_set_many({digest_key(user_id, generation, today): digests[user_id]
+                                           for user_id, generation in zip(user_ids, generations)}, ttl)
+        written += len(user_ids)
 
 
 # test is ready
-async def get_birstdays(user_id: int, skip: int, limit: int, db: Session) -> list[ContactResponse] | list:
+async def get_birstdays(user_id: int, skip: int, limit: int, db: AsyncSession,
+                        cursor: str | None = None, days: int | None = None) -> list[ContactResponse] | list:
     
     """
     Retrieves upcoming birthdays of contacts for a user.
 
+    The default window is answered from the user's digest for today (see
+    ``materialize_birthdays``), rebuilt from the database after a write to an upcoming
+    birthday, other windows query the database.
+
     Args:
         user_id (int): The user's identifier.
-        skip (int): The number of birthdays to skip.
+        skip (int): The number of birthdays to skip, ignored when a cursor is given.
         limit (int): The maximum number of birthdays to return.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
+        cursor (str, optional): The keyset cursor of the page to return.
+        days (int): The number of days ahead to look. Defaults to ``BIRTHDAYS_WINDOW_DAYS``.
 
     Returns:
         List[ContactResponse], List: A list of upcoming birthdays of contacts for the user, 
         or an empty list if no birthdays are found.
     """
-    # postgres
-    today = datetime.today()
-    seven_days_later = today + timedelta(days=7)
-    contact_birthdays = db.query(Contact).filter(and_(Contact.user_id==user_id,
-        text("TO_CHAR(birthday, 'MM-DD') BETWEEN :start_date AND :end_date")).params(
-        start_date=today.strftime('%m-%d'), 
-        end_date=seven_days_later.strftime('%m-%d'))).offset(skip).limit(limit).all()
+    days = BIRTHDAYS_WINDOW_DAYS if days is None else days
+    today = date.today()
+    generation = None
+    if CACHE_ENABLED and days == BIRTHDAYS_WINDOW_DAYS:
+        generation = await client_redis.redis_generation(birthdays_generation_key(user_id))
+    if generation is not None:
+        # the default window is served from the daily digest, built here on a miss
+        key = digest_key(user_id, generation, today)
+        digest = await client_redis.redis_get(key, ContactResponse, many=True)
+        if digest is None:
+            stmt = select(Contact).filter(Contact.user_id == user_id, birthday_window(today, days)).order_by(Contact.id)
+            digest = [ContactResponse.model_validate(contact) for contact in (await db.execute(stmt)).scalars().all() or []]
+            await client_redis.redis_set(key, digest, digest_ttl(today))
+        return page_digest(digest, skip, limit, cursor)
+    stmt = select(Contact).filter(Contact.user_id == user_id, birthday_window(today, days))
+    stmt = paginate(stmt, skip, limit, cursor)
+    contact_birthdays = (await db.execute(stmt)).scalars().all()
     contact_list = []
     if not contact_birthdays:
         return contact_list
@@ -201,10 +627,66 @@ async def get_birstdays(user_id: int, skip: int, limit: int, db: Session) -> lis
 
 
 # test is ready
-async def search_contacts(user_id: int, first_name: str, last_name: str, email: str, phone: str, birthday: date, db: Session) -> list[Contact] | list:
+def search_filters(first_name: str, last_name: str, email: str, phone: str, birthday: date,
+                   dialect: str = "postgresql") -> list:
+    """
+    Builds one filter per given search criterion.
+
+    Text criteria match substrings. On Postgres ``ILIKE`` is served by the trigram
+    indexes, on SQLite the filter goes through the ``contacts_fts`` trigram table.
+
+    Args:
+        first_name (str): The first name to search for.
+        last_name (str): The last name to search for.
+        email (str): The email to search for.
+        phone (str): The phone number to search for.
+        birthday (date): The birthday to search for.
+        dialect (str): The name of the database dialect. Defaults to "postgresql".
+
+    Returns:
+        list: The filters of the criteria that are set.
+    """
+    terms = dict(zip(SEARCH_FIELDS, (first_name, last_name, email, phone)))
+    filters = []
+    for name, term in terms.items():
+        if not term:
+            continue
+        if dialect == "sqlite":
+            # FTS5 trigram LIKE is case-insensitive and only uses the index on the bare column
+            matches = select(contacts_fts.c.rowid).where(contacts_fts.c[name].like(f"%{term}%"))
+            filters.append(Contact.id.in_(matches))
+        else:
+            filters.append(getattr(Contact, name).ilike(f"%{term}%"))
+    if birthday:
+        filters.append(func.DATE(Contact.birthday) == birthday)
+    return filters
+
+
+def search_cursor(contacts: list[Contact], limit: int) -> str | None:
+    """
+    Builds the cursor of the next page of search results.
+
+    Args:
+        contacts (list[Contact]): The fetched results, up to ``limit + 1``.
+        limit (int): The page size.
+
+    Returns:
+        str | None: The cursor of the next page, or None if this is the last one or the page is empty.
+    """
+    if limit <= 0 or len(contacts) <= limit:
+        return None
+    last = contacts[limit - 1]
+    return encode_cursor("rank", [last.rank, last.id])
+
+
+async def search_contacts(user_id: int, first_name: str, last_name: str, email: str, phone: str, birthday: date,
+                          db: AsyncSession, match: str = "any", limit: int = 100, cursor: str | None = None) -> list[Contact] | list:
     """
     Searches for contacts based on the provided criteria.
 
+    All criteria are checked in one query. Results are ranked by the number of
+    criteria they match, best first, then by id.
+
     Args:
         user_id (int): The user's identifier.
         first_name (str): The first name to search for.
@@ -212,28 +694,115 @@ async def search_contacts(user_id: int, first_name: str, last_name: str, email:
         email (str): The email to search for.
         phone (str): The phone number to search for.
         birthday (date): The birthday to search for.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
+        match (str): "any" to return contacts matching any criterion, "all" for all of them. Defaults to "any".
+        limit (int): The maximum number of contacts to return. Defaults to 100.
+        cursor (str, optional): The cursor of the page to return, see ``search_cursor``.
 
     Returns:
         List[Contact], List: A list of contacts matching the search criteria, 
         or an empty list if no contacts are found.
     """
-    query = db.query(Contact).filter(Contact.user_id==user_id)
-    contacts = []
-    if first_name and query is not None:
-        query1 = query.filter(Contact.first_name.ilike(f"%{first_name}%"))
-        contacts.extend(query1.all())
-    if last_name and query is not None:
-        query1 = query.filter(Contact.last_name.ilike(f"%{last_name}%"))
-        contacts.extend(query1.all())
-    if email and query is not None:
-        query1 = query.filter(Contact.email.ilike(f"%{email}%"))     
-        contacts.extend(query1.all())
-    if phone and query is not None:
-        query1 = query.filter(Contact.phone.ilike(f"%{phone}%"))       
-        contacts.extend(query1.all())
-    if birthday and query is not None:
-        query1 = query.filter(func.DATE(Contact.birthday) == birthday)
-        contacts.extend(query1.all())
- 
-    return list(set(contacts))
+    filters = search_filters(first_name, last_name, email, phone, birthday, db.get_bind().dialect.name)
+    if not filters:
+        return []
+    rank = reduce(operator.add, (case((condition, 1), else_=0) for condition in filters))
+    stmt = (select(Contact)
+            .options(with_expression(Contact.rank, rank))
+            .filter(Contact.user_id == user_id, and_(*filters) if match == "all" else or_(*filters))
+            .order_by(rank.desc(), Contact.id)
+            .execution_options(populate_existing=True))
+    if cursor:
+        key = decode_cursor(cursor, "rank", 2)
+        if not all(isinstance(value, int) for value in key):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        stmt = stmt.filter(or_(rank < key[0], and_(rank == key[0], Contact.id > key[1])))
+    return list((await db.execute(stmt.limit(limit))).scalars().all())
+
+
+def selection_filters(user_id: int, selection: ContactSelection, dialect: str) -> list:
+    """
+    Builds the WHERE clause of a bulk operation: the user's contacts with the given ids
+    and, if a filter is given, matching it.
+
+    Args:
+        user_id (int): The user's identifier.
+        selection (ContactSelection): The ids and/or the filter.
+        dialect (str): The name of the database dialect.
+
+    Returns:
+        list: The conditions, to be AND-ed.
+
+    Raises:
+        HTTPException: 422 if neither the ids nor the filter narrow the selection down.
+    """
+    conditions = [Contact.user_id == user_id]
+    if selection.ids:
+        conditions.append(Contact.id.in_(selection.ids))
+    if selection.filter:
+        criteria = selection.filter
+        filters = search_filters(criteria.first_name, criteria.last_name, criteria.email, criteria.phone,
+                                 criteria.birthday, dialect)
+        if filters:
+            conditions.append(and_(*filters) if criteria.match == "all" else or_(*filters))
+    if len(conditions) == 1:
+        # never let a selection touch every contact of the user
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Select contacts by ids or by at least one filter field")
+    return conditions
+
+
+async def bulk_update_contacts(user_id: int, body: ContactBulkUpdate, db: AsyncSession,
+                               returning: bool = False) -> tuple[int, list[Contact] | None]:
+    """
+    Updates the selected contacts of the user with one UPDATE statement.
+
+    Args:
+        user_id (int): The user's identifier.
+        body (ContactBulkUpdate): The selection and the values to set.
+        db (AsyncSession): The database session.
+        returning (bool): Whether to return the updated contacts. Defaults to False.
+
+    Returns:
+        tuple[int, list[Contact] | None]: The number of updated contacts and, if requested, the contacts.
+    """
+    values = body.values.model_dump(exclude_none=True)
+    if "birthday" in values:
+        values["birthday_mmdd"] = birthday_mmdd(values["birthday"])
+    stmt = (update(Contact).where(*selection_filters(user_id, body, db.get_bind().dialect.name)).values(**values)
+            .execution_options(synchronize_session=False, populate_existing=True))
+    stmt = stmt.returning(Contact) if returning else stmt.returning(Contact.id, Contact.birthday_mmdd)
+    result = await db.execute(stmt)
+    rows = result.scalars().all() if returning else result.all()
+    await db.commit()
+    if rows:
+        await invalidate_contacts(user_id)
+        await invalidate_birthdays(user_id, {row.birthday_mmdd for row in rows},
+                                   {row.id for row in rows} if "birthday" in values else ())
+    return len(rows), list(rows) if returning else None
+
+
+async def bulk_remove_contacts(user_id: int, selection: ContactSelection, db: AsyncSession,
+                               returning: bool = False) -> tuple[int, list[Contact] | None]:
+    """
+    Removes the selected contacts of the user with one DELETE statement.
+
+    Args:
+        user_id (int): The user's identifier.
+        selection (ContactSelection): The ids and/or the filter.
+        db (AsyncSession): The database session.
+        returning (bool): Whether to return the removed contacts. Defaults to False.
+
+    Returns:
+        tuple[int, list[Contact] | None]: The number of removed contacts and, if requested, the contacts.
+    """
+    stmt = (delete(Contact).where(*selection_filters(user_id, selection, db.get_bind().dialect.name))
+            .execution_options(synchronize_session=False))
+    stmt = stmt.returning(Contact) if returning else stmt.returning(Contact.id, Contact.birthday_mmdd)
+    result = await db.execute(stmt)
+    rows = result.scalars().all() if returning else result.all()
+    await db.commit()
+    if rows:
+        await invalidate_contacts(user_id)
+        await invalidate_birthdays(user_id, {row.birthday_mmdd for row in rows})
+    return len(rows), list(rows) if returning else None
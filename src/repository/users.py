@@ -1,20 +1,42 @@
 from fastapi import Depends
-from sqlalchemy import select 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.database.models import User
 from src.schemas.user import UserSchema
+from src.services.client_redis import client_redis
+from src.services.token_cache import token_cache
+
+
+def user_key(email: str) -> str:
+    """Cache key of the snapshot of a user, see ``Auth.get_current_user``."""
+    return f"users:{email.lower()}"
+
+
+async def invalidate_user(email: str):
+    """
+    Drops the cached snapshots of a user after a write.
+
+    The Redis snapshot is shared by every worker and is deleted. The token cache lives in
+    the memory of one worker, so other workers may keep serving the old snapshot for up to
+    ``TOKEN_CACHE_TTL`` seconds.
+
+    Args:
+        email (str): The email address of the user.
+    """
+    token_cache.invalidate(email)
+    await client_redis.redis_delete(user_key(email))
 
 
 # test is ready
-async def create_user(body: UserSchema, db: Session=Depends(get_db)) -> User:
+async def create_user(body: UserSchema, db: AsyncSession=Depends(get_db)) -> User:
     """
     Creates a new user.
 
     Args:
         body (UserSchema): The data representing the new user.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         User: The newly created user object.
@@ -22,117 +44,142 @@ async def create_user(body: UserSchema, db: Session=Depends(get_db)) -> User:
     new_user = User(**body.model_dump())
     new_user.avatar = "https://www.rpnation.com/gallery/250-x-250-placeholder.30091/full?d=1504582354"
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 # test is ready
-async def confirmed_email(email: str, db: Session) -> User:
+async def confirmed_email(email: str, db: AsyncSession) -> User:
     """
     Confirms the email address of a user.
 
     Args:
         email (str): The email address to confirm.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         User: The user object with the confirmed email address.
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await invalidate_user(user.email)
     return user
 
 
 # test is ready
-async def update_avatar(email: str, url: str, db: Session) -> User:
+async def update_avatar(email: str, url: str, db: AsyncSession) -> User:
     """
     Updates the avatar URL of a user.
 
     Args:
         email (str): The email address of the user.
         url (str): The new avatar URL.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         User: The user object with the updated avatar URL.
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    await db.commit()
+    await invalidate_user(user.email)
     return user
 
 
 # test is ready
-async def update_token(user: User, token: str | None, db: Session) -> User:
+async def update_token(user: User, token: str | None, db: AsyncSession) -> User:
     """
     Updates the refresh token of a user.
 
     Args:
         user (User): The user object.
         token (str, optional): The new refresh token, or None if the token should be removed.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         User: The user object with the updated refresh token.
     """
     user.refresh_token = token
-    db.commit()
+    await db.commit()
+    await invalidate_user(user.email)
+    return user
+
+
+async def update_password(user: User, password: str, db: AsyncSession) -> User:
+    """
+    Updates the password hash of a user.
+
+    Args:
+        user (User): The user object.
+        password (str): The new hashed password.
+        db (AsyncSession): The database session.
+
+    Returns:
+        User: The user object with the updated password.
+    """
+    user.password = password
+    await db.commit()
+    await invalidate_user(user.email)
     return user
 
 
 # test is ready
-async def get_user_by_email(email: str, db: Session=Depends(get_db)) -> User | None:
+async def get_user_by_email(email: str, db: AsyncSession=Depends(get_db)) -> User | None:
     """
-    Retrieves a user by their email address.
+    Retrieves a user by their email address, ignoring case.
+
+    The unique ``ix_users_email_lower`` index keeps emails that differ in case only apart,
+    so at most one user matches.
 
     Args:
         email (str): The email address of the user.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         User: The user object if found, else None.
     """
-    stmt = select(User).filter_by(email=email)
-    user = db.execute(stmt)
+    stmt = select(User).filter(func.lower(User.email) == email.lower())
+    user = await db.execute(stmt)
     user = user.scalar_one_or_none()
     return user
 
 
 # test is ready
-async def get_user_by_username(username: str, db: Session=Depends(get_db)) -> User | None:
+async def get_user_by_username(username: str, db: AsyncSession=Depends(get_db)) -> User | None:
     """
     Retrieves a user by their username.
 
     Args:
         username (str): The username of the user.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         User: The user object if found, else None.
     """
     stmt = select(User).filter_by(username=username)
-    user = db.execute(stmt)
+    user = await db.execute(stmt)
     user = user.scalar_one_or_none()
     return user
 
 
 # test is ready
-async def remove_user(email: str, db: Session) -> User:
+async def remove_user(email: str, db: AsyncSession) -> User:
     """
     Removes a user based on their email address.
 
     Args:
         email (str): The email address of the user to remove.
-        db (Session): The database session.
+        db (AsyncSession): The database session.
 
     Returns:
         User: The removed user object if found, else None.
     """
     user = await get_user_by_email(email, db)
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    await invalidate_user(user.email)
     return user
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
 from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks, Request
 
@@ -16,8 +16,8 @@ get_refresh_token = HTTPBearer()
 
 #
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-@limiter.limit("100/minute")
-async def signup(request: Request, background_tasks: BackgroundTasks, body: UserSchema, db: Session = Depends(get_db)) -> User | HTTPException:
+@limiter.limit(limiter.route_limit("login"))
+async def signup(request: Request, background_tasks: BackgroundTasks, body: UserSchema, db: AsyncSession = Depends(get_db)) -> User | HTTPException:
     """
     Registers a new user.
 
@@ -25,7 +25,7 @@ async def signup(request: Request, background_tasks: BackgroundTasks, body: User
         request (Request): The request object.
         background_tasks (BackgroundTasks): Background tasks to be executed.
         body (UserSchema): The request body containing user data.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         User, HTTPException: The newly created user object if the signup is successful,
@@ -37,22 +37,22 @@ async def signup(request: Request, background_tasks: BackgroundTasks, body: User
     exist_user = await repository_users.get_user_by_username(body.username, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="An account with this username exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
     background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
     return new_user
 
 #
 @router.post("/login",  response_model=TokenModel, status_code=status.HTTP_200_OK)
-@limiter.limit("100/minute")
-async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)) -> dict | HTTPException: 
+@limiter.limit(limiter.route_limit("login"))
+async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)) -> dict | HTTPException: 
     """
     Logins in a user.
 
     Args:
         request (Request): The request object.
         body (OAuth2PasswordRequestForm): The request body containing the username (email) and password.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         Dict, HTTPException: A dictionary with the access token, refresh token, and token type if the login is successful,
@@ -65,8 +65,11 @@ async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(), d
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    verified, new_hash = await auth_service.verify_and_update_password(body.password, user.password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+    if new_hash:
+        await repository_users.update_password(user, new_hash, db)
 
     access_token = await auth_service.create_access_token(data={"sub": user.email})
     refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
@@ -75,16 +78,16 @@ async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(), d
 
 #
 @router.get('/refresh_token',  response_model=TokenModel)
-@limiter.limit("10/minute")
+@limiter.limit(limiter.route_limit("auth"))
 async def refresh_token(request: Request, credentials: HTTPAuthorizationCredentials = Depends(get_refresh_token),
-                        db: Session = Depends(get_db)) -> dict | HTTPException:
+                        db: AsyncSession = Depends(get_db)) -> dict | HTTPException:
     """
     Refreshes the access token using the refresh token.
 
     Args:
         request (Request): The request object.
         credentials (HTTPAuthorizationCredentials): The HTTP authorization credentials containing the refresh token.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         Dict, HTTPException: A dictionary with the new access token, refresh token, and token type if the refresh is successful,
@@ -104,8 +107,8 @@ async def refresh_token(request: Request, credentials: HTTPAuthorizationCredenti
 
 #
 @router.post('/reset_password')
-@limiter.limit("10/minute")
-async def reset_password(request: Request, body: RequestEmail, background_tasks: BackgroundTasks, db: Session = Depends(get_db)): #  -> dict | HTTPException
+@limiter.limit(limiter.route_limit("auth"))
+async def reset_password(request: Request, body: RequestEmail, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)): #  -> dict | HTTPException
     """
     Initiates the password reset process.
 
@@ -113,7 +116,7 @@ async def reset_password(request: Request, body: RequestEmail, background_tasks:
         request (Request): The request object.
         body (RequestEmail): The request body containing the email address for password reset.
         background_tasks (BackgroundTasks): Background tasks to be executed.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         Dict, HTTPException: A dictionary with a success message if the reset process is initiated successfully,
@@ -128,8 +131,8 @@ async def reset_password(request: Request, body: RequestEmail, background_tasks:
 
 #
 @router.post('/reset_password/{token}')
-@limiter.limit("10/minute")
-async def reset_password_token(body: RequestUserNewPassword, request: Request, token: str, db: Session = Depends(get_db)): #  -> dict | HTTPException
+@limiter.limit(limiter.route_limit("auth"))
+async def reset_password_token(body: RequestUserNewPassword, request: Request, token: str, db: AsyncSession = Depends(get_db)): #  -> dict | HTTPException
     """
     Resets the user's password using the reset token.
 
@@ -137,7 +140,7 @@ async def reset_password_token(body: RequestUserNewPassword, request: Request, t
         body (RequestUserNewPassword): The request body containing the new password.
         request (Request): The request object.
         token (str): The reset token.
-        db (Sessionl): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         Dict, HTTPException]: A dictionary with a success message if the password reset is successful,
@@ -148,15 +151,15 @@ async def reset_password_token(body: RequestUserNewPassword, request: Request, t
     if user is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Reset password error")
     if user:
-        user.password = auth_service.get_password_hash(body.new_password)
-        db.commit()
+        new_hash = await auth_service.get_password_hash(body.new_password)
+        await repository_users.update_password(user, new_hash, db)
         return {"message": "Password has been changed"}
 
 #
 @router.post('/request_email')
-@limiter.limit("10/minute")
+@limiter.limit(limiter.route_limit("auth"))
 async def request_email(request: Request, body: RequestEmail, background_tasks: BackgroundTasks,
-                        db: Session = Depends(get_db)): #  -> dict
+                        db: AsyncSession = Depends(get_db)): #  -> dict
     """
     Endpoint to request email confirmation.
 
@@ -167,7 +170,7 @@ async def request_email(request: Request, body: RequestEmail, background_tasks:
         request (Request): The request object.
         body (RequestEmail): The request body containing the email.
         background_tasks (BackgroundTasks): Background tasks to be executed.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         dict: A message indicating the outcome of the request.
@@ -185,15 +188,15 @@ async def request_email(request: Request, body: RequestEmail, background_tasks:
 
 #
 @router.get('/confirmed_email/{token}')
-@limiter.limit("10/minute")
-async def confirmed_email(request: Request, token: str, db: Session = Depends(get_db)): #  -> dict | HTTPException
+@limiter.limit(limiter.route_limit("auth"))
+async def confirmed_email(request: Request, token: str, db: AsyncSession = Depends(get_db)): #  -> dict | HTTPException
     """
     Confirms the user's email using the verification token.
 
     Args:
         request (Request): The request object.
         token (str): The verification token.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         Dict, HTTPException: A dictionary with a confirmation message if successful,
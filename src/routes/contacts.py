@@ -1,13 +1,18 @@
 from datetime import date
-from fastapi import APIRouter, HTTPException, Depends, status, Query, Request
-from sqlalchemy.orm import Session
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
-from src.schemas.contact import ContactSchema, ContactResponse, ContactDataUpdate, ContactUpdate
+from src.schemas.contact import (ContactSchema, ContactResponse, ContactDataUpdate, ContactUpdate, ContactBulkResponse,
+                                 ContactSelection, ContactBulkUpdate, ContactBulkResult)
 from src.database.models import User 
 from src.repository import contacts as repository_contact 
-from src.services.auth import auth_service
+from src.services.auth import auth_service, get_read_db
 from src.services.limiter import limiter
+from src.services.pagination import set_next_cursor
+from src.services import bulk, export
 from src.database.models import Contact
 
 
@@ -15,8 +20,8 @@ router = APIRouter(prefix='/contacts', tags=['contacts'])
 
 #
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
-@limiter.limit("30/minute")
-async def create_contact(request: Request, body: ContactSchema, db: Session = Depends(get_db), 
+@limiter.limit(limiter.route_limit("contacts_create"))
+async def create_contact(request: Request, body: ContactSchema, db: AsyncSession = Depends(get_db), 
         current_user: User = Depends(auth_service.get_current_user)) -> Contact:
     """
     Creates a new contact for the current user.
@@ -24,7 +29,7 @@ async def create_contact(request: Request, body: ContactSchema, db: Session = De
     Args:
         request (Request): The request object.
         body (ContactSchema): The request body containing contact data.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
@@ -33,53 +38,174 @@ async def create_contact(request: Request, body: ContactSchema, db: Session = De
     user_id = current_user.id
     return await repository_contact.create_contact(user_id, body, db)
 
+#
+@router.post("/bulk", response_model=ContactBulkResponse)
+@limiter.limit(limiter.route_limit("contacts_heavy"))
+async def bulk_create_contacts(request: Request,
+        format: Literal["csv", "ndjson"] = Query(None, description="Upload format, taken from Content-Type by default"),
+        db: AsyncSession = Depends(get_db), 
+        current_user: User = Depends(auth_service.get_current_user)) -> ContactBulkResponse:
+    """
+    Imports an address book for the current user.
+
+    The body is a CSV file with a header row or NDJSON, one contact per line. It is
+    parsed while it is uploaded and inserted in batches; rejected rows are reported
+    by line number and do not stop the import. A line longer than ``bulk.MAX_LINE_LENGTH``
+    characters ends the import with a 413, the batches inserted before it are kept.
+
+    Args:
+        request (Request): The request object, its body is the uploaded file.
+        format (str): "csv" or "ndjson". Defaults to the format of the Content-Type header.
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
+        current_user (User): The current authenticated user obtained from the access token.
+
+    Returns:
+        ContactBulkResponse: The number of created contacts and the rejected rows.
+    """
+    kind = format or bulk.detect_format(request.headers.get("content-type"))
+    rows = bulk.parse_rows(request.stream(), kind)
+    return await repository_contact.bulk_create_contacts(current_user.id, rows, db)
+
+#
+@router.patch("/bulk", response_model=ContactBulkResult, response_model_exclude_none=True)
+@limiter.limit(limiter.route_limit("contacts"))
+async def bulk_update_contacts(request: Request, body: ContactBulkUpdate,
+        returning: bool = Query(False, description="Return the updated contacts"),
+        db: AsyncSession = Depends(get_db), 
+        current_user: User = Depends(auth_service.get_current_user)) -> ContactBulkResult:
+    """
+    Updates many contacts of the current user in one transaction.
+
+    Args:
+        request (Request): The request object.
+        body (ContactBulkUpdate): The ids and/or the filter of the contacts, and the values to set.
+        returning (bool): Whether to return the updated contacts. Defaults to False.
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
+        current_user (User): The current authenticated user obtained from the access token.
+
+    Returns:
+        ContactBulkResult: The number of updated contacts and, if requested, the contacts.
+    """
+    count, contacts = await repository_contact.bulk_update_contacts(current_user.id, body, db, returning)
+    return ContactBulkResult(count=count, contacts=contacts)
+
+#
+@router.delete("/bulk", response_model=ContactBulkResult, response_model_exclude_none=True)
+@limiter.limit(limiter.route_limit("contacts"))
+async def bulk_remove_contacts(request: Request, body: ContactSelection,
+        returning: bool = Query(False, description="Return the removed contacts"),
+        db: AsyncSession = Depends(get_db), 
+        current_user: User = Depends(auth_service.get_current_user)) -> ContactBulkResult:
+    """
+    Removes many contacts of the current user in one transaction.
+
+    Args:
+        request (Request): The request object.
+        body (ContactSelection): The ids and/or the filter of the contacts.
+        returning (bool): Whether to return the removed contacts. Defaults to False.
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
+        current_user (User): The current authenticated user obtained from the access token.
+
+    Returns:
+        ContactBulkResult: The number of removed contacts and, if requested, the contacts.
+    """
+    count, contacts = await repository_contact.bulk_remove_contacts(current_user.id, body, db, returning)
+    return ContactBulkResult(count=count, contacts=contacts)
+
+#
+@router.get("/export", response_class=StreamingResponse)
+@limiter.limit(limiter.route_limit("contacts_heavy"))
+async def export_contacts(request: Request,
+        format: Literal["csv", "ndjson", "vcard"] = Query("csv", description="Export format"),
+        db: AsyncSession = Depends(get_read_db), 
+        current_user: User = Depends(auth_service.get_current_user)) -> StreamingResponse:
+    """
+    Exports all contacts of the current user as a file download.
+
+    The contacts are streamed from a server-side cursor straight into the response and
+    compressed on the fly when the client accepts gzip.
+
+    Args:
+        request (Request): The request object.
+        format (str): "csv", "ndjson" or "vcard". Defaults to "csv".
+        db (AsyncSession): The database session. Defaults to Depends(get_read_db).
+        current_user (User): The current authenticated user obtained from the access token.
+
+    Returns:
+        StreamingResponse: The exported contacts.
+    """
+    media_type, extension = export.MEDIA_TYPES[format]
+    content = export.export_contacts(repository_contact.stream_contacts(current_user.id, db), format)
+    headers = {"Content-Disposition": f'attachment; filename="contacts.{extension}"', "Vary": "Accept-Encoding"}
+    if export.accepts_encoding(request.headers.get("accept-encoding"), "gzip"):
+        content = export.gzip_stream(content)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(content, media_type=media_type, headers=headers)
+
 #
 @router.get("/search", response_model=list[ContactResponse])
-@limiter.limit("10/minute")
-async def search_contacts(request: Request,
+@limiter.limit(limiter.route_limit("contacts"))
+async def search_contacts(request: Request, response: Response,
         first_name: str = Query(None, description="Search contacts by first name"),
         last_name: str = Query(None, description="Search contacts by last name"),
         email: str = Query(None, description="Search contacts by email"),
         phone: str = Query(None, description="Search contacts by phone"), 
         birthday: date = Query(None, description="Search contacts by birthday"),
-        db: Session = Depends(get_db), 
+        match: Literal["any", "all"] = Query("any", description="Match any or all of the given criteria"),
+        limit: int = Query(100, ge=1, le=1000, description="Page size"),
+        cursor: str = Query(None, description="Cursor of the page from the X-Next-Cursor header"),
+        db: AsyncSession = Depends(get_read_db), 
         current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
     """
     Searches contacts based on provided criteria for the current user.
 
     Args:
         request (Request): The request object.
+        response (Response): The response object, receives the next page cursor headers.
         first_name (str): Search contacts by first name. Defaults to None.
         last_name (str): Search contacts by last name. Defaults to None.
         email (str): Search contacts by email. Defaults to None.
         phone (str): Search contacts by phone. Defaults to None.
         birthday (date): Search contacts by birthday. Defaults to None.
-        db (Session): The database session. Defaults to Depends(get_db).
+        match (str): "any" or "all" of the given criteria must match. Defaults to "any".
+        limit (int): Maximum number of records to return. Defaults to 100.
+        cursor (str): Cursor of the page to return. Defaults to None.
+        db (AsyncSession): The database session. Defaults to Depends(get_read_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
-        Contact, HTTPException: The contacts matching the search criteria if found,
+        Contact, HTTPException: The contacts matching the search criteria if found, best matches first,
         or an HTTPException with a status code and detail message if no contacts are found.
     """
     user_id = current_user.id
-    contacts = await repository_contact.search_contacts(user_id, first_name, last_name, email, phone, birthday, db)
+    contacts = await repository_contact.search_contacts(user_id, first_name, last_name, email, phone, birthday, db,
+                                                        match, limit + 1, cursor)
     if contacts == []:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Birstday not found")
-    return contacts
+    set_next_cursor(request, response, repository_contact.search_cursor(contacts, limit))
+    return contacts[:limit]
 
 #
 @router.get("/birstdays", response_model=list[ContactResponse])
-@limiter.limit("10/minute")
-async def get_birstdays(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), 
+@limiter.limit(limiter.route_limit("contacts"))
+async def get_birstdays(request: Request, response: Response, skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000, description="Page size"),
+        cursor: str = Query(None, description="Cursor of the page from the X-Next-Cursor header"),
+        days: int = Query(None, ge=0, le=366,
+                          description="Number of days ahead to look for birthdays"),
+        db: AsyncSession = Depends(get_read_db), 
         current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
     """
     Retrieves upcoming birthdays for the current user.
 
     Args:
         request (Request): The request object.
-        skip (int): Number of records to skip. Defaults to 0.
+        response (Response): The response object, receives the next page cursor headers.
+        skip (int): Number of records to skip, legacy alternative to cursor. Defaults to 0.
         limit (int): Maximum number of records to return. Defaults to 100.
-        db (Session): The database session. Defaults to Depends(get_db).
+        cursor (str): Cursor of the page to return. Defaults to None.
+        days (int): Number of days ahead to look. Defaults to ``BIRTHDAYS_WINDOW_DAYS``.
+        db (AsyncSession): The database session. Defaults to Depends(get_read_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
@@ -87,39 +213,51 @@ async def get_birstdays(request: Request, skip: int = 0, limit: int = 100, db: S
         or an HTTPException with a status code and detail message if no birthdays are found.
     """
     user_id = current_user.id
-    contacts = await repository_contact.get_birstdays(user_id, skip, limit, db)
+    contacts = await repository_contact.get_birstdays(user_id, skip, limit + 1, db, cursor, days)
     if contacts == []:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Birstday not found")
-    return contacts
+    set_next_cursor(request, response, repository_contact.next_cursor(contacts, limit))
+    return contacts[:limit]
 
 #
 @router.get("/", response_model=list[ContactResponse])
-@limiter.limit("10/minute")
-async def get_contacts(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), 
+@limiter.limit(limiter.route_limit("contacts"))
+async def get_contacts(request: Request, response: Response, skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000, description="Page size"),
+        cursor: str = Query(None, description="Cursor of the page from the X-Next-Cursor header"),
+        order_by: Literal["id", "last_name"] = Query("id", description="Sort contacts by id or by last name"),
+        db: AsyncSession = Depends(get_read_db), 
         current_user: User = Depends(auth_service.get_current_user)) -> list[Contact] | list:
     """
     Retrieves contacts for the current user.
 
+    Pages are linked by an opaque cursor returned in the ``X-Next-Cursor`` and ``Link``
+    headers; ``skip`` is kept for legacy clients.
+
     Args:
         request (Request): The request object.
-        skip (int): Number of records to skip. Defaults to 0.
+        response (Response): The response object, receives the next page cursor headers.
+        skip (int): Number of records to skip, legacy alternative to cursor. Defaults to 0.
         limit (int): Maximum number of records to return. Defaults to 100.
-        db (Session): The database session. Defaults to Depends(get_db).
+        cursor (str): Cursor of the page to return. Defaults to None.
+        order_by (str): Sort by "id" or "last_name". Defaults to "id".
+        db (AsyncSession): The database session. Defaults to Depends(get_read_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
         List[Contact], List: A list of contacts if found, or an empty list if no contacts are found.
     """
     user_id = current_user.id
-    contacts = await repository_contact.get_contacts(user_id, skip, limit, db)
+    contacts = await repository_contact.get_contacts(user_id, skip, limit + 1, db, cursor, order_by)
     if contacts == []:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    return contacts
+    set_next_cursor(request, response, repository_contact.next_cursor(contacts, limit, order_by))
+    return contacts[:limit]
 
 #
 @router.get("/{contact_id}", response_model=ContactResponse)
-@limiter.limit("10/minute")
-async def get_contact(request: Request, contact_id: int, db: Session = Depends(get_db), 
+@limiter.limit(limiter.route_limit("contacts"))
+async def get_contact(request: Request, contact_id: int, db: AsyncSession = Depends(get_read_db), 
         current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
     """
     Retrieves a specific contact for the current user by ID.
@@ -127,7 +265,7 @@ async def get_contact(request: Request, contact_id: int, db: Session = Depends(g
     Args:
         request (Request): The request object.
         contact_id (int): The ID of the contact to retrieve.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_read_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
@@ -141,8 +279,8 @@ async def get_contact(request: Request, contact_id: int, db: Session = Depends(g
 
 #
 @router.delete("/{contact_id}", response_model=ContactResponse)
-@limiter.limit("10/minute")
-async def remove_contact(request: Request, contact_id: int, db: Session = Depends(get_db), 
+@limiter.limit(limiter.route_limit("contacts"))
+async def remove_contact(request: Request, contact_id: int, db: AsyncSession = Depends(get_db), 
         current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
     """
     Removes a specific contact for the current user by ID.
@@ -150,7 +288,7 @@ async def remove_contact(request: Request, contact_id: int, db: Session = Depend
     Args:
         request (Request): The request object.
         contact_id (int): The ID of the contact to remove.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
@@ -164,9 +302,9 @@ async def remove_contact(request: Request, contact_id: int, db: Session = Depend
 
 #
 @router.put("/{contact_id}", response_model=ContactResponse)
-@limiter.limit("10/minute")
+@limiter.limit(limiter.route_limit("contacts"))
 async def update_contact(request: Request, contact_id: int, body: ContactUpdate, 
-        db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
+        db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
     
     """
     Updates a specific contact for the current user by ID.
@@ -175,7 +313,7 @@ async def update_contact(request: Request, contact_id: int, body: ContactUpdate,
         request (Request): The request object.
         contact_id (int): The ID of the contact to update.
         body (ContactUpdate): The request body containing the updated contact data.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
@@ -189,9 +327,9 @@ async def update_contact(request: Request, contact_id: int, body: ContactUpdate,
 
 #
 @router.patch("/{contact_id}", response_model=ContactResponse)
-@limiter.limit("10/minute")
+@limiter.limit(limiter.route_limit("contacts"))
 async def update_data_contact(request: Request, contact_id: int, body: ContactDataUpdate, 
-        db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
+        db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)) -> Contact | HTTPException:
     """
     Updates data of a specific contact for the current user by ID.
 
@@ -199,7 +337,7 @@ async def update_data_contact(request: Request, contact_id: int, body: ContactDa
         request (Request): The request object.
         contact_id (int): The ID of the contact to update.
         body (ContactDataUpdate): The request body containing the updated data for the contact.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
         current_user (User): The current authenticated user obtained from the access token.
 
     Returns:
@@ -0,0 +1,45 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from src.conf.config import Settings, app_settings
+from src.database.db import engine_metrics, get_engine
+
+
+async def verify_internal_key(x_internal_key: str | None = Header(None),
+                              settings: Settings = Depends(app_settings)):
+    """
+    Lets a request through only with the ``X-Internal-Key`` header set to ``INTERNAL_API_KEY``.
+
+    The internal routes do not exist while ``INTERNAL_API_KEY`` is empty, which is the default.
+
+    Args:
+        x_internal_key (str, optional): The key sent by the caller.
+        settings (Settings): The settings of the application.
+
+    Raises:
+        HTTPException: 404 if the internal routes are disabled, 401 if the key is missing or wrong.
+    """
+    if not settings.internal_api_key:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    # compare_digest only takes ASCII strings, so compare bytes: the raw bytes of the header,
+    # which Starlette decodes as latin-1, with the UTF-8 of the key
+    if x_internal_key is None or not secrets.compare_digest(x_internal_key.encode("latin-1"),
+                                                            settings.internal_api_key.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid internal key")
+
+
+router = APIRouter(prefix='/internal', tags=['internal'], include_in_schema=False,
+                   dependencies=[Depends(verify_internal_key)])
+
+#
+@router.get("/pool")
+async def pool_stats() -> dict:
+    """
+    Reports live metrics of the database connection pool.
+
+    Returns:
+        dict: Checked-out and overflow gauges, connection counters and the checkout wait time histogram.
+    """
+    engine = get_engine()
+    return engine_metrics(engine).snapshot(engine.sync_engine.pool)
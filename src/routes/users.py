@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, UploadFile, File, Request
 from src.database.db import get_db
 from src.database.models import User
@@ -11,7 +11,7 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 #
 @router.get("/me", response_model=UserDb)
-@limiter.limit("1/minute")
+@limiter.limit(limiter.route_limit("users"))
 async def read_user_me(request: Request, current_user: User = Depends(auth_service.get_current_user)) -> User:
     """
     Retrieves the details of the currently authenticated user.
@@ -27,9 +27,9 @@ async def read_user_me(request: Request, current_user: User = Depends(auth_servi
 
 #
 @router.patch('/avatar', response_model=UserDb)
-@limiter.limit("1/minute")
+@limiter.limit(limiter.route_limit("users"))
 async def update_avatar_user(request: Request, file: UploadFile = File(), 
-        current_user: User = Depends(auth_service.get_current_user), db: Session = Depends(get_db)) -> User:
+        current_user: User = Depends(auth_service.get_current_user), db: AsyncSession = Depends(get_db)) -> User:
     """
     Updates the avatar of the current user with the provided image file.
 
@@ -37,11 +37,11 @@ async def update_avatar_user(request: Request, file: UploadFile = File(),
         request (Request): The request object.
         file (UploadFile): The image file to be uploaded as the new avatar. Defaults to File().
         current_user (User): The current authenticated user obtained from the access token.
-        db (Session): The database session. Defaults to Depends(get_db).
+        db (AsyncSession): The database session. Defaults to Depends(get_db).
 
     Returns:
         User: The updated user object with the new avatar URL.
     """
-    src_url = auth_service.cloud_inary(file, current_user)
+    src_url = await auth_service.cloud_inary(file, current_user)
     user = await repository_users.update_avatar(current_user.email, src_url, db)
     return user
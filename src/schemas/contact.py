@@ -1,5 +1,6 @@
 from datetime import date
-from pydantic import BaseModel, Field, EmailStr
+from typing import Annotated, Literal
+from pydantic import BaseModel, Field, EmailStr, StringConstraints, model_validator
 
 
 class ContactSchema(BaseModel):
@@ -37,3 +38,61 @@ class ContactResponse(BaseModel):
     class Config:
         from_attributes = True
         # orm_mode = True
+
+
+class BulkRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class ContactBulkResponse(BaseModel):
+    created: int
+    errors: list[BulkRowError]
+
+
+# a blank term matches nothing and would be dropped, widening a bulk selection to every contact
+SearchTerm = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+
+class ContactFilter(BaseModel):
+    first_name: SearchTerm | None = None
+    last_name: SearchTerm | None = None
+    email: SearchTerm | None = None
+    phone: SearchTerm | None = None
+    birthday: date | None = None
+    match: Literal["any", "all"] = "all"
+
+
+class ContactSelection(BaseModel):
+    ids: list[int] | None = Field(None, min_length=1, max_length=10000)
+    filter: ContactFilter | None = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        # never let an empty selection touch every contact of the user
+        criteria = self.filter.model_dump(exclude={"match"}, exclude_none=True) if self.filter else {}
+        if not self.ids and not criteria:
+            raise ValueError("Select contacts by ids or by at least one filter field")
+        return self
+
+
+class ContactBulkValues(BaseModel):
+    first_name: str | None = Field(None, max_length=40)
+    last_name: str | None = Field(None, max_length=40)
+    birthday: date | None = None
+    data: str | None = Field(None, max_length=250)
+
+
+class ContactBulkUpdate(ContactSelection):
+    values: ContactBulkValues
+
+    @model_validator(mode="after")
+    def check_values(self):
+        if not self.values.model_dump(exclude_none=True):
+            raise ValueError("Set at least one value")
+        return self
+
+
+class ContactBulkResult(BaseModel):
+    count: int
+    contacts: list[ContactResponse] | None = None
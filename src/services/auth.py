@@ -1,28 +1,57 @@
-import cloudinary
-import cloudinary.uploader
-from decouple import config
-from typing import Optional
-from decouple import config
+import functools
+from typing import AsyncIterator, Optional
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
-from src.database.models import User
+from src.conf.config import Settings, get_settings
+from src.database.db import get_db, read_session
 from src.repository import users as repository_users
+from src.schemas.user import UserDb
 from src.services.client_redis import client_redis
-from src.services.logger import logger
+from src.services.hashing import password_hasher
+from src.services.token_cache import token_cache
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    SECRET_KEY = config('SECRET_KEY')
-    ALGORITHM = config('ALGORITHM')
+    hasher = password_hasher
 
-    def verify_password(self, plain_password, hashed_password) -> True | False:
+    def __init__(self, settings: Settings | None = None):
+        self._settings = settings
+
+    def configure(self, settings: Settings):
+        """
+        Signs and verifies tokens with the keys of the settings and uploads with their cloudinary account.
+
+        Args:
+            settings (Settings): The settings of the application.
+        """
+        self._settings = settings
+        cloudinary_client.cache_clear()
+
+    @property
+    def settings(self) -> Settings:
+        """
+        The settings given to ``configure``, ``get_settings()`` if it was not called.
+        """
+        if self._settings is None:
+            self._settings = get_settings()
+        return self._settings
+
+    @property
+    def SECRET_KEY(self) -> str:
+        """The key that signs the tokens."""
+        return self.settings.secret_key
+
+    @property
+    def ALGORITHM(self) -> str:
+        """The algorithm of the tokens."""
+        return self.settings.algorithm
+
+    async def verify_password(self, plain_password, hashed_password) -> True | False:
         """
         Verifies if the provided plain password matches the hashed password.
 
@@ -33,9 +62,22 @@ class Auth:
         Returns:
             bool: True if the plain password matches the hashed password, False otherwise.
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await self.hasher.verify(plain_password, hashed_password)
+
+    async def verify_and_update_password(self, plain_password, hashed_password) -> tuple[bool, str | None]:
+        """
+        Verifies the password and rehashes it when the hashing cost parameters have changed.
+
+        Args:
+            plain_password (str): The plain text password to be verified.
+            hashed_password (str): The stored hashed password.
+
+        Returns:
+            tuple[bool, str | None]: True if the password matches, and the new hash to store or None.
+        """
+        return await self.hasher.verify_and_update(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """
         Hashes the provided password using the configured hashing algorithm.
 
@@ -45,7 +87,7 @@ class Auth:
         Returns:
             str: The hashed password.
         """ 
-        return self.pwd_context.hash(password)
+        return await self.hasher.hash(password)
 
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
@@ -113,20 +155,29 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> UserDb:
         """
         Retrieves the current user based on the provided access token.
 
+        Tokens that were already verified are served from the in-process token cache
+        without decoding the JWT or touching Redis and the database, other lookups go
+        to a read replica. The request session is tagged with the user, so its writes
+        open the user's read-your-writes window.
+
         Args:
             token (str): The access token used for authentication.
-            db (Session): The database session.
+            db (AsyncSession): The database session of the request.
 
         Returns:
-            User: The current user.
+            UserDb: A detached snapshot of the current user.
 
         Raises:
             HTTPException: If the provided token cannot be decoded, has an invalid scope, or if the user cannot be retrieved from the database.
         """
+        user = token_cache.get(token)
+        if user is not None:
+            db.info["subject"] = user.email
+            return user
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -143,14 +194,20 @@ class Auth:
                 raise credentials_exception
         except JWTError as e:
             raise credentials_exception
-        user = client_redis.redis_get(email)
+        db.info["subject"] = email
+        user = await client_redis.redis_get(repository_users.user_key(email), UserDb)
         if user is None:
-            user = await repository_users.get_user_by_email(email, db)
+            replica = await read_session(email)
+            if replica is None:
+                user = await repository_users.get_user_by_email(email, db)
+            else:
+                async with replica:
+                    user = await repository_users.get_user_by_email(email, replica)
             if user is None:
                 raise credentials_exception
-            client_redis.redis_set(email, user)
-            client_redis.redis_expire(email)
-            return user
+            user = UserDb.model_validate(user)
+            await client_redis.redis_set(repository_users.user_key(email), user)
+        token_cache.set(token, email, user, payload["exp"])
         return user
 
 
@@ -208,16 +265,69 @@ class Auth:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                                 detail="Invalid token for email verification")
         
-    async def cloud_inary(file, current_user):
-        cloudinary.config(
-            cloud_name=config("cloudinary_name"), 
-            api_key=config("cloudinary_api_key"),
-            api_secret=config("cloudinary_api_secret"),
-            secure=True
-        )
+    async def cloud_inary(self, file, current_user) -> str:
+        """
+        Uploads the avatar of a user to cloudinary.
 
-        r = cloudinary.uploader.upload(file.file, public_id=f'NotesApp/{current_user.username}', overwrite=True)
+        The cloudinary SDK is blocking, so the upload runs in the threadpool instead of the event loop.
+
+        Args:
+            file (UploadFile): The uploaded image.
+            current_user (User): The user the avatar belongs to.
+
+        Returns:
+            str: The URL of the avatar cropped to 250x250.
+        """
+        cloudinary = cloudinary_client()
+        r = await run_in_threadpool(cloudinary.uploader.upload, file.file,
+                                    public_id=f'NotesApp/{current_user.username}', overwrite=True)
         return cloudinary.CloudinaryImage(f'NotesApp/{current_user.username}')\
                             .build_url(width=250, height=250, crop='fill', version=r.get('version'))
 
-auth_service = Auth()
\ No newline at end of file
+@functools.cache
+def cloudinary_client():
+    """
+    Imports and configures cloudinary once, on the first upload, with the settings of ``auth_service``.
+
+    cloudinary is only needed by the avatar route, so importing the app does not import it.
+
+    Returns:
+        module: The configured ``cloudinary`` module.
+    """
+    import cloudinary
+    import cloudinary.uploader
+
+    settings = auth_service.settings
+    cloudinary.config(
+        cloud_name=settings.cloudinary_name,
+        api_key=settings.cloudinary_api_key,
+        api_secret=settings.cloudinary_api_secret,
+        secure=True
+    )
+    return cloudinary
+
+
+auth_service = Auth()
+
+
+async def get_read_db(db: AsyncSession = Depends(get_db),
+                      current_user: UserDb = Depends(auth_service.get_current_user)) -> AsyncIterator[AsyncSession]:
+    """
+    Generates a database session for read-only routes of the current user.
+
+    Reads go round-robin to the healthy read replicas, or to the primary session of the
+    request if none is configured or the user wrote within the read-your-writes window.
+
+    Args:
+        db (AsyncSession): The primary database session of the request.
+        current_user (UserDb): The authenticated user.
+
+    Yields:
+        AsyncSession: A replica or the primary database session.
+    """
+    replica = await read_session(current_user.email)
+    if replica is None:
+        yield db
+        return
+    async with replica:
+        yield replica
\ No newline at end of file
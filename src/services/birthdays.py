@@ -0,0 +1,78 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+
+from src.database.db import session_factory
+from src.repository import contacts as repository_contact
+from src.services.client_redis import client_redis
+from src.services.logger import logger
+
+
+# seconds a worker may hold the lock of a run before another worker can take over
+JOB_LOCK_TTL = 600
+
+
+def seconds_until_tomorrow(now: datetime | None = None) -> float:
+    """
+    Returns the number of seconds until just after the next midnight.
+
+    Args:
+        now (datetime, optional): The current time. Defaults to now.
+
+    Returns:
+        float: The delay before the next run of the digest job.
+    """
+    now = now or datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return (tomorrow - now).total_seconds() + 1
+
+
+def job_key(day: date) -> str:
+    """Redis key of the lock of the digest job for one day."""
+    return f"birthdays:job:{day.isoformat()}"
+
+
+async def materialize_once(today: date | None = None) -> int | None:
+    """
+    Materializes the birthday digests of ``today`` unless another worker has done it.
+
+    The worker that takes the day's lock builds the digests and keeps the lock until they
+    expire, so the other workers skip the run at startup and at midnight. A failed run
+    releases the lock for the next one.
+
+    Args:
+        today (date, optional): The day to build the digests for. Defaults to today.
+
+    Returns:
+        int | None: The number of digests written, None if another worker has the lock.
+    """
+    today = today or date.today()
+    key = job_key(today)
+    if not await client_redis.redis_lock(key, JOB_LOCK_TTL):
+        return None
+    try:
+        async with session_factory()() as db:
+            count = await repository_contact.materialize_birthdays(db, today)
+    except BaseException:
+        await client_redis.redis_delete(key)
+        raise
+    await client_redis.redis_expire(key, repository_contact.digest_ttl(today))
+    return count
+
+
+async def birthday_digest_job():
+    """
+    Materializes the birthday digests of all users on start and then once a day.
+
+    Every worker runs the job, one of them does the work under a Redis lock.
+    Between runs a write to an upcoming birthday invalidates the digest of its user, which the next read rebuilds.
+    """
+    while True:
+        try:
+            count = await materialize_once()
+            if count is None:
+                logger.info("Birthday digests are materialized by another worker")
+            else:
+                logger.info("Birthday digests materialized for %s users", count)
+        except Exception as err:
+            logger.error("Birthday digest job failed: %s", err)
+        await asyncio.sleep(seconds_until_tomorrow())
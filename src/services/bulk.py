@@ -0,0 +1,133 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+
+from src.schemas.contact import ContactSchema
+
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+# longest accepted line in characters, a contact row is a few hundred
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def detect_format(content_type: str | None) -> str:
+    """
+    Picks the import format from the Content-Type header.
+
+    Args:
+        content_type (str | None): The Content-Type of the request.
+
+    Returns:
+        str: ``"csv"`` or ``"ndjson"``.
+
+    Raises:
+        HTTPException: 415 if the content type is not supported.
+    """
+    kind = FORMATS.get((content_type or "").split(";")[0].strip().lower())
+    if kind is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Send text/csv or application/x-ndjson")
+    return kind
+
+
+def line_too_long(number: int, max_length: int) -> HTTPException:
+    """Builds the 413 error of a line longer than ``max_length`` characters."""
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Line {number} is longer than {max_length} characters")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int = MAX_LINE_LENGTH) -> AsyncIterator[tuple[int, str]]:
+    """
+    Splits a UTF-8 byte stream into numbered lines as it arrives.
+
+    The partial line carried over to the next chunk is limited to ``max_length`` characters,
+    so a body without line breaks cannot grow the buffer without bound.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body.
+        max_length (int): The longest accepted line in characters.
+
+    Yields:
+        tuple[int, str]: The 1-based line number and the line without its line break.
+
+    Raises:
+        HTTPException: 400 if the body is not valid UTF-8, 413 if a line is longer than ``max_length``.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer, number = "", 0
+    try:
+        async for chunk in chunks:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                number += 1
+                line = line.rstrip("\r")
+                if len(line) > max_length:
+                    raise line_too_long(number, max_length)
+                yield number, line
+            # the partial line may still end with the "\r" of a CRLF break
+            if len(buffer) > max_length + 1:
+                raise line_too_long(number + 1, max_length)
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The file is not valid UTF-8")
+    if len(buffer.rstrip("\r")) > max_length:
+        raise line_too_long(number + 1, max_length)
+    if buffer:
+        yield number + 1, buffer.rstrip("\r")
+
+
+def describe(err: ValidationError) -> str:
+    """Formats a validation error as ``field: message`` pairs."""
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in err.errors())
+
+
+async def parse_rows(chunks: AsyncIterator[bytes], kind: str) -> AsyncIterator[tuple[int, ContactSchema | str]]:
+    """
+    Parses and validates an uploaded address book row by row.
+
+    CSV files start with a header naming the ``ContactSchema`` fields, NDJSON files hold
+    one JSON object per line. Every record must fit on one line. Blank lines are skipped.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The request body.
+        kind (str): ``"csv"`` or ``"ndjson"``.
+
+    Yields:
+        tuple[int, ContactSchema | str]: The line number and the contact, or the reason it was rejected.
+    """
+    header = None
+    async for number, line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        if kind == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield number, f"Expected {len(header)} fields, got {len(values)}"
+                continue
+            row = dict(zip(header, values))
+        else:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, "Invalid JSON"
+                continue
+            if not isinstance(row, dict):
+                yield number, "Expected a JSON object"
+                continue
+        try:
+            yield number, ContactSchema.model_validate(row)
+        except ValidationError as err:
+            yield number, describe(err)
@@ -1,38 +1,170 @@
-import redis
-import pickle
+import time
+import redis.asyncio as redis
+from redis.exceptions import RedisError
 from typing import Any
+from pydantic import BaseModel
+
+from src.conf.config import Settings
+from src.services.codec import Codec, get_codec
+from src.services.logger import logger
 
 class ClientRedis:
     """
-    A client for interacting with a Redis database.
+    An async client for interacting with a Redis database.
+
+    All clients share one blocking connection pool that is opened in the application
+    lifespan (``connect``/``close``), or lazily on first use outside of it. Values are
+    stored as Pydantic schemas serialized by a versioned codec (``redis_codec``, json
+    by default), never as pickled ORM objects. Cache errors are logged and treated as
+    misses so an unavailable Redis never fails a request.
 
     Attributes:
-        r (redis.Redis): The Redis client instance.
+        codec (Codec): The codec used to serialize cached values.
+        ttl (int): Default expiration of cached values in seconds.
     """
-    r = redis.Redis(host='localhost', port=6379, db=0)
-    
-    async def redis_get(self, read) -> Any | None:
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, max_connections: int = 50,
+                 socket_timeout: float = 1.0, connect_timeout: float = 1.0, codec: str = "json", ttl: int = 3600):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.max_connections = max_connections
+        self.socket_timeout = socket_timeout
+        self.connect_timeout = connect_timeout
+        self.codec: Codec = get_codec(codec)
+        self.ttl = ttl
+        self.pool: redis.BlockingConnectionPool | None = None
+        self._client: redis.Redis | None = None
+
+    def configure(self, settings: Settings):
+        """
+        Takes the connection, codec and expiration settings, the pool uses them from its next ``connect``.
+
+        Args:
+            settings (Settings): The settings of the application.
+        """
+        self.host = settings.redis_host
+        self.port = settings.redis_port
+        self.db = settings.redis_db
+        self.max_connections = settings.redis_pool_size
+        self.socket_timeout = settings.redis_socket_timeout
+        self.connect_timeout = settings.redis_connect_timeout
+        self.codec = get_codec(settings.redis_codec)
+        self.ttl = settings.redis_cache_ttl
+
+    def connect(self) -> redis.Redis:
+        """
+        Creates the shared connection pool and client if they do not exist yet.
+
+        Returns:
+            redis.Redis: The client bound to the shared pool.
+        """
+        if self._client is None:
+            self.pool = redis.BlockingConnectionPool(
+                host=self.host,
+                port=self.port,
+                db=self.db,
+                max_connections=self.max_connections,
+                timeout=self.socket_timeout,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.connect_timeout,
+            )
+            self._client = redis.Redis(connection_pool=self.pool)
+        return self._client
+
+    async def warm_up(self):
+        """
+        Connects the pool with one ``PING``, a failure is logged since the cache is optional.
+        """
+        try:
+            await self.connect().ping()
+        except RedisError as err:
+            logger.warning("Redis is unavailable at startup: %s", err)
+
+    async def close(self):
+        """
+        Closes the client and disconnects every pooled connection.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            if self.pool is not None:
+                await self.pool.disconnect()
+            self._client = None
+            self.pool = None
+
+    @property
+    def r(self) -> redis.Redis:
+        """
+        The Redis client bound to the shared pool.
+        """
+        return self.connect()
+
+    async def redis_get(self, read, schema: type[BaseModel], many: bool = False) -> Any | None:
         """
         Retrieves data from Redis based on the provided key.
 
         Args:
             read: The key used to retrieve data from Redis.
+            schema (type[BaseModel]): The schema of the cached value.
+            many (bool): Whether the cached value is a list of ``schema``.
 
         Returns:
-            Any: The deserialized data retrieved from Redis, or None if the key does not exist.
+            Any: The decoded data retrieved from Redis, or None if the key does not exist,
+            holds an entry of another codec or schema version, or Redis is unavailable.
         """
-        result = self.r.get(str(read))
-        return pickle.loads(result) if result else result
+        try:
+            result = await self.r.get(str(read))
+        except RedisError as err:
+            logger.warning("Redis get %s failed: %s", read, err)
+            return None
+        return self.codec.decode(result, schema, many)
 
-    async def redis_set(self, read, write):
+    async def redis_set(self, read, write: BaseModel | list[BaseModel], integer: int | None = None):
         """
-        Stores data in Redis with the provided key.
+        Stores data in Redis with the provided key and expiration in one round trip.
 
         Args:
             read: The key used to store data in Redis.
-            write: The data to be stored in Redis.
+            write (BaseModel | list[BaseModel]): The data to be stored in Redis.
+            integer (int, optional): The expiration time in seconds. Defaults to ``ttl``.
+        """
+        try:
+            await self.r.set(str(read), self.codec.encode(write), ex=integer or self.ttl)
+        except RedisError as err:
+            logger.warning("Redis set %s failed: %s", read, err)
+
+    async def redis_set_many(self, writes: dict[str, BaseModel | list[BaseModel]], integer: int | None = None):
+        """
+        Stores several values with the same expiration in one round trip.
+
+        Args:
+            writes (dict[str, BaseModel | list[BaseModel]]): The values by key.
+            integer (int, optional): The expiration time in seconds. Defaults to ``ttl``.
+        """
+        try:
+            async with self.r.pipeline(transaction=False) as pipe:
+                for read, write in writes.items():
+                    pipe.set(str(read), self.codec.encode(write), ex=integer or self.ttl)
+                await pipe.execute()
+        except RedisError as err:
+            logger.warning("Redis set of %s keys failed: %s", len(writes), err)
+
+    async def redis_lock(self, read, integer: int) -> bool:
         """
-        self.r.set(str(read), pickle.dumps(write))
+        Takes a lock with ``SET NX``, it is held until the key is deleted or expires.
+
+        Args:
+            read: The key of the lock.
+            integer (int): The expiration time in seconds.
+
+        Returns:
+            bool: True if the lock was taken, False if it is held elsewhere or Redis is unavailable.
+        """
+        try:
+            return bool(await self.r.set(str(read), time.time_ns(), ex=integer, nx=True))
+        except RedisError as err:
+            logger.warning("Redis lock %s failed: %s", read, err)
+            return False
 
     async def redis_expire(self, read, integer=3600):
         """
@@ -40,8 +172,81 @@ class ClientRedis:
 
         Args:
             read: The key for which the expiration time will be set.
-            integer (int): The expiration time in seconds. Defaults to 300 seconds (5 minutes).
+            integer (int): The expiration time in seconds. Defaults to 3600 seconds (1 hour).
+        """
+        try:
+            await self.r.expire(str(read), integer)
+        except RedisError as err:
+            logger.warning("Redis expire %s failed: %s", read, err)
+
+    async def redis_delete(self, *reads):
+        """
+        Deletes keys from Redis.
+
+        Args:
+            *reads: The keys to delete.
+        """
+        try:
+            await self.r.delete(*(str(read) for read in reads))
+        except RedisError as err:
+            logger.warning("Redis delete %s failed: %s", reads, err)
+
+    async def redis_generation(self, read) -> int | None:
+        """
+        Reads a generation counter, initializing it if it does not exist.
+
+        A missing counter (never set, or evicted) starts from the current time in
+        nanoseconds, so it can never fall back to a generation that is still cached.
+
+        Args:
+            read: The key of the counter.
+
+        Returns:
+            int | None: The current generation, or None if Redis is unavailable.
+        """
+        try:
+            value = await self.r.get(str(read))
+            if value is None:
+                await self.r.set(str(read), time.time_ns(), nx=True)
+                value = await self.r.get(str(read))
+            return int(value)
+        except RedisError as err:
+            logger.warning("Redis generation %s failed: %s", read, err)
+            return None
+
+    async def redis_generations(self, *reads) -> list[int] | None:
+        """
+        Reads several generation counters in one round trip, initializing the missing ones
+        like ``redis_generation``.
+
+        Args:
+            *reads: The keys of the counters.
+
+        Returns:
+            list[int] | None: The current generations in the order of the keys, or None if Redis is unavailable.
+        """
+        try:
+            async with self.r.pipeline(transaction=False) as pipe:
+                for read in reads:
+                    pipe.set(str(read), time.time_ns(), nx=True)
+                    pipe.get(str(read))
+                results = await pipe.execute()
+            return [int(value) for value in results[1::2]]
+        except RedisError as err:
+            logger.warning("Redis generations of %s keys failed: %s", len(reads), err)
+            return None
+
+    async def redis_bump(self, read):
+        """
+        Increments a generation counter, which invalidates every key built from it.
+
+        Args:
+            read: The key of the counter.
         """
-        self.r.expire(str(read), integer)
+        try:
+            if await self.r.incr(str(read)) == 1:
+                await self.r.set(str(read), time.time_ns())
+        except RedisError as err:
+            logger.warning("Redis bump %s failed: %s", read, err)
 
-client_redis = ClientRedis()
\ No newline at end of file
+client_redis = ClientRedis()
@@ -0,0 +1,165 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+from pydantic import BaseModel, EmailStr, TypeAdapter, ValidationError, create_model
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional codec
+    msgpack = None
+
+
+# bump when the cached shapes (ContactResponse, UserDb, ...) change incompatibly
+SCHEMA_VERSION = 1
+
+
+class Codec(ABC):
+    """
+    Serializes cache values to bytes.
+
+    Payloads are prefixed with ``<name>:<SCHEMA_VERSION>:`` so entries written by another
+    codec or by an older schema version are rejected instead of being misread.
+
+    Attributes:
+        name (str): The codec name used in the payload prefix.
+    """
+    name = ""
+
+    @property
+    def header(self) -> bytes:
+        """The payload prefix of this codec and schema version."""
+        return f"{self.name}:{SCHEMA_VERSION}:".encode()
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        """Serializes plain JSON-compatible data."""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """Deserializes data written by ``dumps``."""
+
+    def encode(self, value: BaseModel | list[BaseModel]) -> bytes:
+        """
+        Encodes a Pydantic model or a list of models.
+
+        Args:
+            value (BaseModel | list[BaseModel]): The value to encode.
+
+        Returns:
+            bytes: The prefixed payload.
+        """
+        if isinstance(value, list):
+            value = [item.model_dump(mode="json") for item in value]
+        else:
+            value = value.model_dump(mode="json")
+        return self.header + self.dumps(value)
+
+    def decode(self, data: bytes | None, schema: type[BaseModel], many: bool = False) -> Any | None:
+        """
+        Decodes a payload into the given schema.
+
+        Args:
+            data (bytes | None): The payload read from the cache.
+            schema (type[BaseModel]): The Pydantic model of the cached value.
+            many (bool): Whether the value is a list of ``schema``.
+
+        Returns:
+            Any | None: Instances of (a subclass of) ``schema``, or None if the payload
+            is missing, stale or malformed.
+        """
+        if not data or not data.startswith(self.header):
+            return None
+        trusted = _trusted_model(schema)
+        adapter = _adapter(list[trusted] if many else trusted)
+        try:
+            return adapter.validate_python(self.loads(data[len(self.header):]))
+        except (ValidationError, ValueError, TypeError):
+            return None
+
+
+class JsonCodec(Codec):
+    """
+    JSON codec, uses orjson when it is installed.
+    """
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """
+    MessagePack codec, requires the optional ``msgpack`` package.
+    """
+    name = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("The msgpack codec requires the 'msgpack' package")
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+_adapters: dict[Any, TypeAdapter] = {}
+_trusted: dict[type[BaseModel], type[BaseModel]] = {}
+
+
+def _adapter(tp) -> TypeAdapter:
+    adapter = _adapters.get(tp)
+    if adapter is None:
+        adapter = _adapters[tp] = TypeAdapter(tp)
+    return adapter
+
+
+def _trusted_model(schema: type[BaseModel]) -> type[BaseModel]:
+    """
+    Subclasses a schema with its ``EmailStr`` fields relaxed to ``str``.
+
+    Cached payloads were validated before they were written, and email validation
+    costs ~100x more than every other field together, so decoding skips it.
+    """
+    model = _trusted.get(schema)
+    if model is None:
+        fields = {name: (str, ...) for name, field in schema.model_fields.items() if field.annotation is EmailStr}
+        model = _trusted[schema] = create_model(f"Cached{schema.__name__}", __base__=schema, **fields)
+    return model
+
+
+def get_codec(name: str) -> Codec:
+    """
+    Creates a codec by name.
+
+    Args:
+        name (str): ``"json"`` or ``"msgpack"``.
+
+    Returns:
+        Codec: The codec instance.
+
+    Raises:
+        ValueError: If the codec is unknown.
+    """
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown cache codec: {name}")
@@ -1,26 +1,284 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from email.utils import formataddr
 from pathlib import Path
-from decouple import config
+from typing import TYPE_CHECKING, AsyncIterator
 from pydantic import EmailStr
 from fastapi import HTTPException
-from fastapi_mail.errors import ConnectionErrors
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
 
+from src.conf.config import Settings, get_settings
 from src.services.auth import auth_service
 from src.services.logger import logger
- 
-conf = ConnectionConfig(
-    MAIL_USERNAME=config("MAIL_USERNAME"),
-    MAIL_PASSWORD=config("MAIL_PASSWORD"),
-    MAIL_FROM=config("MAIL_FROM"),
-    MAIL_PORT=config("MAIL_PORT"),
-    MAIL_SERVER=config("MAIL_SERVER"),
-    MAIL_FROM_NAME=config("MAIL_FROM_NAME"),
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
+
+if TYPE_CHECKING:
+    from aiosmtplib import SMTP
+    from jinja2 import Environment, Template
+
+
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+
+
+class MailClient:
+    """
+    Sends the emails of the application over a pool of persistent SMTP connections.
+
+    Up to ``pool_size`` authenticated connections are kept open and reused, so a message
+    does not pay for a TCP connect, TLS handshake and login. Connections idle for longer
+    than ``mail_idle_timeout`` are replaced, as servers drop them on their side. Templates
+    are compiled once, in the application lifespan or on first use. aiosmtplib and jinja2
+    are imported on first use.
+
+    Attributes:
+        templates (tuple[str, ...]): The templates the application sends.
+        settings (Settings): The SMTP settings.
+        pool_size (int): Maximum number of open connections.
+        batch_size (int): Maximum number of messages ``send_many`` sends over one connection.
+        pending (int): Number of emails being sent.
+    """
+    templates = ("email_template.html", "password_reset_email.html")
+
+    def __init__(self, settings: Settings | None = None, pool_size: int | None = None,
+                 template_folder: Path = TEMPLATE_FOLDER):
+        self._settings = settings
+        self._pool_size = pool_size
+        self.template_folder = template_folder
+        self.pending = 0
+        self._slots: asyncio.Semaphore | None = None
+        # idle connections with the time they were last used, the most recent last
+        self._idle: list[tuple["SMTP", float]] = []
+        self._env: "Environment | None" = None
+        self._templates: dict[str, "Template"] = {}
+
+    def configure(self, settings: Settings):
+        """
+        Sends with the SMTP settings from now on, idle connections to the previous server are closed.
+
+        Args:
+            settings (Settings): The settings of the application.
+        """
+        self._settings = settings
+        self._slots = None
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            smtp.close()
+
+    @property
+    def settings(self) -> Settings:
+        """
+        The settings given to the constructor or ``configure``, ``get_settings()`` otherwise.
+        """
+        if self._settings is None:
+            self._settings = get_settings()
+        return self._settings
+
+    @property
+    def pool_size(self) -> int:
+        """
+        Maximum number of open connections, ``mail_pool_size`` unless given to the constructor.
+        """
+        return self._pool_size or self.settings.mail_pool_size
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Maximum number of messages ``send_many`` sends over one connection.
+        """
+        return self.settings.mail_batch_size
+
+    @property
+    def env(self) -> "Environment":
+        """
+        The Jinja environment of the templates, created on first use.
+        """
+        if self._env is None:
+            from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+            self._env = Environment(loader=FileSystemLoader(self.template_folder),
+                                    autoescape=select_autoescape(["html"]), auto_reload=False)
+        return self._env
+
+    def template(self, name: str) -> "Template":
+        """
+        Returns a compiled template, compiling it on first use.
+
+        Args:
+            name (str): The file name of the template.
+
+        Returns:
+            Template: The compiled template.
+        """
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def warm_up(self):
+        """
+        Compiles every template, so a broken template fails at startup.
+        """
+        for name in self.templates:
+            self.template(name)
+
+    def render(self, template_name: str, subject: str, recipient: str, body: dict) -> EmailMessage:
+        """
+        Builds an HTML email from a template.
+
+        Args:
+            template_name (str): The template of the body.
+            subject (str): The subject.
+            recipient (str): The recipient's email address.
+            body (dict): Variables of the template.
+
+        Returns:
+            EmailMessage: The message.
+        """
+        message = EmailMessage()
+        message["From"] = formataddr((self.settings.mail_from_name, self.settings.mail_from))
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(self.template(template_name).render(**body), subtype="html")
+        return message
+
+    async def _open(self) -> "SMTP":
+        """
+        Opens and authenticates a new connection.
+
+        Returns:
+            SMTP: The connected client.
+        """
+        from aiosmtplib import SMTP
+
+        smtp = SMTP(hostname=self.settings.mail_server, port=self.settings.mail_port,
+                    username=self.settings.mail_username or None, password=self.settings.mail_password or None,
+                    use_tls=self.settings.mail_ssl_tls, start_tls=self.settings.mail_starttls,
+                    validate_certs=self.settings.mail_validate_certs, timeout=self.settings.mail_timeout)
+        await smtp.connect()
+        return smtp
+
+    @staticmethod
+    async def _discard(smtp: "SMTP"):
+        """
+        Closes a connection, politely if it is still open.
+
+        Args:
+            smtp (SMTP): The connection.
+        """
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator["SMTP"]:
+        """
+        Borrows a connection from the pool, waiting while ``pool_size`` are in use.
+
+        The connection goes back to the pool when the block succeeds and is closed when
+        it raises, as it may be left in the middle of a transaction.
+
+        Yields:
+            SMTP: A connected and authenticated client.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            smtp = None
+            while self._idle:
+                idle, used = self._idle.pop()
+                if idle.is_connected and time.monotonic() - used < self.settings.mail_idle_timeout:
+                    smtp = idle
+                    break
+                await self._discard(idle)
+            if smtp is None:
+                smtp = await self._open()
+            try:
+                yield smtp
+            except BaseException:
+                await self._discard(smtp)
+                raise
+            self._idle.append((smtp, time.monotonic()))
+
+    async def send(self, message: EmailMessage):
+        """
+        Sends an email over a pooled connection.
+
+        A connection the server closed since its last use is replaced once.
+
+        Args:
+            message (EmailMessage): The message.
+        """
+        from aiosmtplib import SMTPServerDisconnected
+
+        self.pending += 1
+        try:
+            try:
+                async with self.connection() as smtp:
+                    await smtp.send_message(message)
+            except SMTPServerDisconnected:
+                async with self.connection() as smtp:
+                    await smtp.send_message(message)
+        finally:
+            self.pending -= 1
+
+    async def send_many(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        """
+        Sends emails in batches of ``batch_size``, each batch over one pooled connection.
+
+        Batches are sent concurrently, up to ``pool_size`` at a time. A message the server
+        refuses does not stop its batch, a lost connection fails the rest of the batch.
+
+        Args:
+            messages (list[EmailMessage]): The messages.
+
+        Returns:
+            list[Exception | None]: The error of every message, None if it was sent.
+        """
+        from aiosmtplib import SMTPResponseException, SMTPRecipientsRefused
+
+        results: list[Exception | None] = [None] * len(messages)
+
+        async def send_batch(start: int):
+            index = start
+            try:
+                async with self.connection() as smtp:
+                    for index in range(start, min(start + self.batch_size, len(messages))):
+                        try:
+                            await smtp.send_message(messages[index])
+                        except (SMTPResponseException, SMTPRecipientsRefused) as err:
+                            # aiosmtplib resets the envelope, the connection stays usable
+                            results[index] = err
+            except Exception as err:
+                logger.warning("Mail batch failed after %s of its messages: %s", index - start, err)
+                for failed in range(index, min(start + self.batch_size, len(messages))):
+                    results[failed] = err
+
+        self.pending += len(messages)
+        try:
+            await asyncio.gather(*(send_batch(start) for start in range(0, len(messages), self.batch_size)))
+        finally:
+            self.pending -= len(messages)
+        return results
+
+    async def close(self, timeout: float = 10.0):
+        """
+        Waits up to ``timeout`` seconds for the emails being sent, then closes the pool.
+
+        Args:
+            timeout (float): Maximum seconds to wait.
+        """
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.pending:
+            logger.warning("Shutting down with %s emails still being sent", self.pending)
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._discard(smtp) for smtp, _ in idle))
+
+
+mail_client = MailClient()
 
 
 async def send_email(email: EmailStr, username: str, host: str):
@@ -33,20 +291,17 @@ async def send_email(email: EmailStr, username: str, host: str):
         host (str): The host URL for the confirmation link.
 
     Raises:
-        ConnectionErrors: If there is an error in establishing a connection for sending the email.
+        SMTPException: If there is an error in establishing a connection for sending the email.
     """
+    from aiosmtplib import SMTPException
+
     try:
         token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
+        message = mail_client.render("email_template.html", "Confirm your email ", email,
+                                     {"host": host, "username": username, "token": token_verification})
+
+        await mail_client.send(message)
+    except (SMTPException, OSError) as err:
         print(err)
 
 
@@ -65,17 +320,14 @@ async def send_resets_password(email: EmailStr, username: str, host: str) -> dic
     Raises:
         HTTPException: If there is an error in sending the email, a 500 Internal Server Error with a detailed error message is raised.
     """
+    from aiosmtplib import SMTPException
+
     try:
         token_reset_password = auth_service.create_email_reset_password_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm reset password",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_reset_password},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="password_reset_email.html")
-    except ConnectionErrors as err:
+        message = mail_client.render("password_reset_email.html", "Confirm reset password", email,
+                                     {"host": host, "username": username, "token": token_reset_password})
+
+        await mail_client.send(message)
+    except (SMTPException, OSError) as err:
         raise HTTPException(status_code=500, detail=f"Failed to send an email: {str(err)}")
-    return {"message": "Email has been sent successfully!"}
\ No newline at end of file
+    return {"message": "Email has been sent successfully!"}
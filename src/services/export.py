@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+
+from src.database.models import Contact
+
+
+FIELDS = ("first_name", "last_name", "email", "phone", "birthday", "data")
+
+# flush the text buffer to the client once it grows past this many characters
+CHUNK_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "vcard": ("text/vcard", "vcf"),
+}
+
+
+def csv_line(values: list) -> str:
+    """Formats one CSV record with a CRLF line break."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def vcard_text(value: str | None) -> str:
+    """Escapes a vCard text value."""
+    value = value or ""
+    for char, escaped in (("\\", "\\\\"), (",", "\\,"), (";", "\\;"), ("\n", "\\n")):
+        value = value.replace(char, escaped)
+    return value
+
+
+def vcard(contact: Contact) -> str:
+    """
+    Formats a contact as a vCard 3.0 record.
+
+    Args:
+        contact (Contact): The contact.
+
+    Returns:
+        str: The vCard with CRLF line breaks.
+    """
+    first_name, last_name = vcard_text(contact.first_name), vcard_text(contact.last_name)
+    lines = ["BEGIN:VCARD", "VERSION:3.0",
+             f"N:{last_name};{first_name};;;",
+             f"FN:{first_name} {last_name}",
+             f"EMAIL:{vcard_text(contact.email)}",
+             f"TEL:{vcard_text(contact.phone)}"]
+    if contact.birthday:
+        lines.append(f"BDAY:{contact.birthday.isoformat()}")
+    if contact.data:
+        lines.append(f"NOTE:{vcard_text(contact.data)}")
+    lines.append("END:VCARD")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def record(contact: Contact, kind: str) -> str:
+    """Formats a contact as one record of the export format."""
+    if kind == "vcard":
+        return vcard(contact)
+    values = {name: getattr(contact, name) for name in FIELDS}
+    values["birthday"] = values["birthday"].isoformat() if values["birthday"] else None
+    if kind == "ndjson":
+        return json.dumps(values, ensure_ascii=False) + "\n"
+    return csv_line(list(values.values()))
+
+
+async def export_contacts(contacts: AsyncIterator[Contact], kind: str) -> AsyncIterator[bytes]:
+    """
+    Encodes a stream of contacts in an export format.
+
+    Records are grouped into chunks of about ``CHUNK_SIZE`` characters, so only one chunk
+    is held in memory at a time. CSV output starts with the header row accepted by the
+    bulk import.
+
+    Args:
+        contacts (AsyncIterator[Contact]): The contacts to export.
+        kind (str): ``"csv"``, ``"ndjson"`` or ``"vcard"``.
+
+    Yields:
+        bytes: UTF-8 encoded chunks.
+    """
+    parts, size = [], 0
+    if kind == "csv":
+        parts.append(csv_line(list(FIELDS)))
+    async for contact in contacts:
+        line = record(contact, kind)
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts).encode()
+
+
+def accepts_encoding(header: str | None, encoding: str) -> bool:
+    """
+    Tells whether an ``Accept-Encoding`` header allows a content coding.
+
+    Codings with ``q=0`` are refused, a coding that is not listed is allowed by a ``*``
+    with a non-zero quality.
+
+    Args:
+        header (str | None): The ``Accept-Encoding`` header of the request.
+        encoding (str): The content coding, e.g. ``gzip``.
+
+    Returns:
+        bool: True if the response may use the coding.
+    """
+    listed, wildcard = None, False
+    for item in (header or "").split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == encoding:
+            listed = quality > 0
+        elif name == "*":
+            wildcard = quality > 0
+    return wildcard if listed is None else listed
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """
+    Compresses a byte stream into the gzip format as it is produced.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The data to compress.
+        level (int): The compression level. Defaults to 6.
+
+    Yields:
+        bytes: Pieces of the gzip stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
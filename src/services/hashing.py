@@ -0,0 +1,200 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+
+from src.conf.config import Settings
+
+
+pwd_context = None
+# cost of new hashes in this process, set by PasswordHasher.configure and in every pool worker
+bcrypt_rounds = 12
+
+
+def get_pwd_context():
+    """
+    Returns ``pwd_context``, created on first use so importing the app does not import passlib.
+
+    Returns:
+        CryptContext: The bcrypt context.
+    """
+    global pwd_context
+    if pwd_context is None:
+        from passlib.context import CryptContext
+
+        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                                   bcrypt__rounds=bcrypt_rounds)
+    return pwd_context
+
+
+def set_bcrypt_rounds(rounds: int):
+    """Sets the cost of new hashes, ``pwd_context`` is created again on next use."""
+    global bcrypt_rounds, pwd_context
+    if rounds != bcrypt_rounds:
+        bcrypt_rounds, pwd_context = rounds, None
+
+
+# module level functions so they can be pickled into a process pool
+def hash_password(password: str) -> str:
+    """Hashes the password with ``get_pwd_context()``."""
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verifies the password against the hash with ``get_pwd_context()``."""
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def load_backend() -> str:
+    """Loads the bcrypt backend of ``get_pwd_context()`` in the calling worker."""
+    return get_pwd_context().handler("bcrypt").get_backend()
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verifies the password and returns a new hash if ``get_pwd_context()`` marks the old one as outdated."""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded worker pool.
+
+    bcrypt spends hundreds of milliseconds of CPU per call, so the work is moved off the
+    event loop. At most ``max_pending`` calls may be queued or running at once, beyond that
+    the caller gets a 503 instead of waiting behind the backlog.
+
+    Attributes:
+        kind (str): ``"thread"`` or ``"process"``.
+        workers (int): Number of pool workers.
+        max_pending (int): Maximum number of calls queued or running at once.
+        pending (int): Number of calls currently queued or running.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int | None = None, max_pending: int = 32):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing pool kind: {kind}")
+        self.kind = kind
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    def configure(self, settings: Settings):
+        """
+        Takes the pool and bcrypt cost settings, a running pool is shut down and created again on next use.
+
+        Args:
+            settings (Settings): The settings of the application.
+
+        Raises:
+            ValueError: If ``hash_pool_kind`` is neither ``thread`` nor ``process``.
+        """
+        if settings.hash_pool_kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing pool kind: {settings.hash_pool_kind}")
+        self.shutdown(wait=False)
+        self.kind = settings.hash_pool_kind
+        self.workers = settings.hash_pool_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = settings.hash_pool_max_pending
+        set_bcrypt_rounds(settings.bcrypt_rounds)
+
+    @property
+    def executor(self) -> Executor:
+        """
+        The worker pool, created on first use.
+
+        Returns:
+            Executor: The thread or process pool.
+        """
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=set_bcrypt_rounds,
+                                                     initargs=(bcrypt_rounds,))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hashing")
+        return self._executor
+
+    async def run(self, func, *args):
+        """
+        Runs a hashing function in the pool.
+
+        Args:
+            func: The module level function to run.
+            *args: Arguments of the function.
+
+        Returns:
+            Any: The result of the function.
+
+        Raises:
+            HTTPException: 503 if the pool already has ``max_pending`` calls in flight.
+        """
+        if self.pending >= self.max_pending:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is busy, try again later",
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes the password.
+
+        Args:
+            password (str): The plain text password.
+
+        Returns:
+            str: The hashed password.
+        """
+        return await self.run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verifies the password against the hash.
+
+        Args:
+            plain_password (str): The plain text password.
+            hashed_password (str): The stored hash.
+
+        Returns:
+            bool: True if the password matches.
+        """
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """
+        Verifies the password and rehashes it if the hash uses outdated cost parameters.
+
+        Args:
+            plain_password (str): The plain text password.
+            hashed_password (str): The stored hash.
+
+        Returns:
+            tuple[bool, str | None]: Whether the password matches and the new hash, or None if no rehash is needed.
+        """
+        return await self.run(verify_and_update_password, plain_password, hashed_password)
+
+    async def warm_up(self):
+        """
+        Starts every worker of the pool and loads the bcrypt backend in it.
+
+        Without it the first logins after a deploy also pay for spawning the workers
+        and importing bcrypt.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, load_backend) for _ in range(self.workers)))
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shuts the worker pool down.
+
+        Args:
+            wait (bool): Whether to wait for running calls to finish.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
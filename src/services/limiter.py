@@ -1,25 +1,150 @@
-from fastapi import FastAPI
-import redis.asyncio as redis
-from contextlib import asynccontextmanager
+from typing import Callable
+from fastapi import Request
+from jose import JWTError, jwt
+from limits.errors import ConfigurationError
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
 from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi import Limiter
 
+from src.conf.config import Settings, get_settings
+from src.services.auth import auth_service
+from src.services.logger import logger
+from src.services.token_cache import token_cache
 
-r = None
-limiter = Limiter(key_func=get_remote_address)
 
+def rate_limit_key(request: Request) -> str:
+    """
+    Builds the rate limit key of a request.
 
-@asynccontextmanager
-async def lifespan(server: FastAPI):
-    global r
-    global limiter
-    
-    server.state.limiter = limiter
-    server.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    Requests with a valid bearer token are limited per user, whichever worker or address
+    they come from, anonymous requests and invalid tokens per remote address. Tokens
+    already in the token cache are not decoded again.
 
-    r = await redis.Redis(host='localhost', port=6379, db=0, encoding="utf-8", decode_responses=True)
-    yield
-    r.close()
+    Args:
+        request (Request): The request to limit.
 
-server = FastAPI(lifespan=lifespan)
\ No newline at end of file
+    Returns:
+        str: ``user:<email>`` or ``ip:<address>``.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        user = token_cache.get(token)
+        if user is not None:
+            return f"user:{user.email.lower()}"
+        try:
+            subject = jwt.decode(token, auth_service.SECRET_KEY, algorithms=[auth_service.ALGORITHM]).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject.lower()}"
+    return f"ip:{get_remote_address(request)}"
+
+
+def storage_options(storage_uri: str, timeout: float) -> dict:
+    """
+    Builds the options of a rate limit storage.
+
+    Args:
+        storage_uri (str): A ``limits`` storage URI.
+        timeout (float): Connect and socket timeout of a Redis storage in seconds.
+
+    Returns:
+        dict: Keyword arguments for ``storage_from_string``.
+    """
+    if storage_uri.startswith(("redis://", "rediss://")):
+        return {"socket_timeout": timeout, "socket_connect_timeout": timeout}
+    return {}
+
+
+class AppLimiter(Limiter):
+    """
+    The slowapi limiter of the application, its storage, strategy and route limits come from the settings.
+
+    Routes are decorated when they are imported, before the settings are known, so they take
+    their limit from ``route_limit`` which reads it from the settings on every request.
+
+    Attributes:
+        settings (Settings | None): The settings given to ``configure``.
+    """
+
+    def __init__(self, storage_uri: str = "memory://", strategy: str = "sliding-window-counter",
+                 timeout: float = 0.1):
+        super().__init__(key_func=rate_limit_key, storage_uri=storage_uri,
+                         storage_options=storage_options(storage_uri, timeout), strategy=strategy,
+                         in_memory_fallback_enabled=True, key_prefix="rate-limit")
+        self.settings: Settings | None = None
+
+    def configure(self, settings: Settings):
+        """
+        Switches to the storage and strategy of the settings and takes the route limits from them.
+
+        The counters of the previous storage are not carried over.
+
+        Args:
+            settings (Settings): The settings of the application.
+
+        Raises:
+            ConfigurationError: If ``rate_limit_strategy`` is unknown.
+        """
+        if settings.rate_limit_strategy not in STRATEGIES:
+            raise ConfigurationError(f"Invalid rate limiting strategy {settings.rate_limit_strategy}")
+        self.settings = settings
+        self._storage_uri = settings.rate_limit_storage_uri
+        self._storage_options = storage_options(settings.rate_limit_storage_uri, settings.rate_limit_timeout)
+        self._strategy = settings.rate_limit_strategy
+        self._storage = storage_from_string(self._storage_uri, **self._storage_options)
+        self._limiter = STRATEGIES[self._strategy](self._storage)
+        self._fallback_limiter = STRATEGIES[self._strategy](self._fallback_storage)
+        self._storage_dead = False
+
+    def reset(self):
+        """
+        Clears the counters of the storage and of the in-memory fallback.
+
+        An unreachable storage is logged instead of raised, its counters expire on their own.
+        """
+        self._fallback_storage.reset()
+        try:
+            super().reset()
+        except Exception as err:
+            logger.warning("Rate limit storage %s could not be reset: %s", self._storage_uri, err)
+
+    def route_limit(self, name: str) -> Callable[[], str]:
+        """
+        Returns the limit of a group of routes for ``limit``, read from the settings on every request.
+
+        Args:
+            name (str): The group, ``users`` reads ``rate_limit_users``.
+
+        Returns:
+            Callable[[], str]: The limit of the group, from ``get_settings()`` if ``configure`` was not called.
+        """
+        field = f"rate_limit_{name}"
+        if field not in Settings.model_fields:
+            raise ValueError(f"Unknown rate limit: {name}")
+        return lambda: getattr(self.settings or get_settings(), field)
+
+
+def create_limiter(storage_uri: str = "memory://", strategy: str = "sliding-window-counter",
+                   timeout: float = 0.1) -> AppLimiter:
+    """
+    Creates the rate limiter of the application.
+
+    With a ``redis://`` storage the counters are shared by every worker and survive restarts,
+    each hit is one atomic Lua script on Redis. While Redis is unreachable the limits are
+    counted in process memory, per worker, until the storage answers again.
+
+    Args:
+        storage_uri (str): A ``limits`` storage URI, e.g. ``redis://localhost:6379/1``.
+        strategy (str): ``fixed-window``, ``moving-window`` or ``sliding-window-counter``.
+        timeout (float): Connect and socket timeout of the storage in seconds.
+
+    Returns:
+        AppLimiter: The limiter.
+    """
+    return AppLimiter(storage_uri=storage_uri, strategy=strategy, timeout=timeout)
+
+
+# memory storage until create_app configures it
+limiter = create_limiter()
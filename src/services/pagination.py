@@ -0,0 +1,58 @@
+import base64
+import json
+from fastapi import HTTPException, Request, Response, status
+
+
+def encode_cursor(order_by: str, key: list) -> str:
+    """
+    Builds an opaque keyset cursor.
+
+    Args:
+        order_by (str): The name of the ordering the cursor belongs to.
+        key (list): The sort key of the last row of the page.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    payload = json.dumps({"o": order_by, "k": key}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, size: int) -> list:
+    """
+    Reads the sort key from a cursor built by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor from the request.
+        order_by (str): The ordering requested by the client.
+        size (int): The number of columns in the sort key of the ordering.
+
+    Returns:
+        list: The sort key of the last row of the previous page.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or belongs to another ordering.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if payload["o"] == order_by and isinstance(payload["k"], list) and len(payload["k"]) == size:
+            return payload["k"]
+    except (ValueError, KeyError, TypeError):
+        pass
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def set_next_cursor(request: Request, response: Response, cursor: str | None):
+    """
+    Advertises the next page in the ``X-Next-Cursor`` and ``Link`` headers.
+
+    Args:
+        request (Request): The current request, used to build the next page URL.
+        response (Response): The response to add the headers to.
+        cursor (str | None): The cursor of the next page, or None on the last page.
+    """
+    if cursor is None:
+        return
+    url = request.url.remove_query_params("skip").include_query_params(cursor=cursor)
+    response.headers["X-Next-Cursor"] = cursor
+    response.headers["Link"] = f'<{url}>; rel="next"'
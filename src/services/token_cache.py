@@ -0,0 +1,127 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+
+from src.conf.config import Settings
+
+
+class TokenCache:
+    """
+    A bounded LRU cache of verified access tokens and the users they resolve to.
+
+    Entries are keyed by the SHA-256 of the token, so raw tokens are never kept in memory,
+    and expire after ``ttl`` seconds or at the token's ``exp``, whichever comes first.
+
+    The cache lives in the memory of one worker. ``invalidate`` only drops the entries of
+    the worker that handled the write, other workers serve the old user until their entries
+    expire, so staleness across workers is bounded by ``TOKEN_CACHE_TTL``.
+
+    Attributes:
+        maxsize (int): Maximum number of cached tokens.
+        ttl (float): Maximum lifetime of an entry in seconds.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str, Any]] = OrderedDict()
+        self._by_email: dict[str, set[str]] = {}
+
+    def configure(self, settings: Settings):
+        """
+        Takes the size and lifetime from the settings and drops the cached tokens.
+
+        Args:
+            settings (Settings): The settings of the application.
+        """
+        self.maxsize = settings.token_cache_size
+        self.ttl = settings.token_cache_ttl
+        self.clear()
+
+    @staticmethod
+    def key(token: str) -> str:
+        """
+        Builds the cache key of a token.
+
+        Args:
+            token (str): The access token.
+
+        Returns:
+            str: The hex SHA-256 digest of the token.
+        """
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Any | None:
+        """
+        Returns the cached user of a token.
+
+        Args:
+            token (str): The access token.
+
+        Returns:
+            Any | None: The cached user, or None if the token is unknown or expired.
+        """
+        key = self.key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, email, user = entry
+        if expires_at <= time.time():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return user
+
+    def set(self, token: str, email: str, user: Any, exp: float):
+        """
+        Caches the user of a verified token.
+
+        Args:
+            token (str): The access token.
+            email (str): The subject of the token, used for invalidation.
+            user (Any): The resolved user.
+            exp (float): The ``exp`` claim of the token as a unix timestamp.
+        """
+        if self.maxsize <= 0:
+            return
+        key = self.key(token)
+        self._discard(key)
+        email = email.lower()
+        self._entries[key] = (min(time.time() + self.ttl, exp), email, user)
+        self._by_email.setdefault(email, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+
+    def invalidate(self, email: str):
+        """
+        Drops every cached token of a user.
+
+        Args:
+            email (str): The email address of the user.
+        """
+        for key in self._by_email.pop(email.lower(), set()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drops all cached tokens.
+        """
+        self._entries.clear()
+        self._by_email.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_email.get(entry[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_email[entry[1]]
+
+
+token_cache = TokenCache()
@@ -1,9 +1,14 @@
+import os
 import pytest
-from unittest.mock import MagicMock 
+from unittest.mock import MagicMock, AsyncMock
 from src.database.models import User
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# the tests count rate limits in memory, whatever storage the environment configures
+os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
 
 from main import server
 from src.database.models import Base
@@ -11,12 +16,97 @@ from src.database.db import get_db
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+class FakeRedis:
+    """
+    An in-memory stand-in for the async Redis client used by ClientRedis.
+    """
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def incr(self, key):
+        value = int(self.store.get(key, 0)) + 1
+        self.store[key] = str(value).encode()
+        return value
+
+    async def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    async def expire(self, key, seconds):
+        return key in self.store
+
+    async def ping(self):
+        return True
+
+    async def aclose(self):
+        pass
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """
+    Buffers commands and runs them on the FakeRedis on ``execute``.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((getattr(self.redis, name), args, kwargs))
+            return self
+        return command
+
+    async def execute(self):
+        commands, self.commands = self.commands, []
+        return [await method(*args, **kwargs) for method, args, kwargs in commands]
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    from src.services.client_redis import client_redis
+    redis = FakeRedis()
+    monkeypatch.setattr(client_redis, "_client", redis)
+    return redis
+
+
+@pytest.fixture
+def reset_limiter():
+    # the routes allow a few requests a minute, give a test a fresh budget
+    from src.services.limiter import limiter
+    limiter.reset()
+    yield
+    limiter.reset()
+
 
 @pytest.fixture(scope="module")
 def session():
@@ -26,6 +116,12 @@ def session():
     Base.metadata.create_all(bind=engine)
 
     db = TestingSessionLocal()
+
+    # the app writes through its own async session, so always reload rows
+    @event.listens_for(db, "do_orm_execute")
+    def _populate_existing(orm_execute_state):
+        orm_execute_state.update_execution_options(populate_existing=True)
+
     try:
         yield db
     finally:
@@ -36,11 +132,9 @@ def session():
 def client(session):
     # Dependency override
 
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     server.dependency_overrides[get_db] = override_get_db
 
@@ -57,7 +151,7 @@ def user2():
 
 @pytest.fixture()
 def token(client, user, session, monkeypatch):
-    mock_redis = MagicMock(return_value=None)
+    mock_redis = AsyncMock(return_value=None)
     monkeypatch.setattr("src.services.client_redis.client_redis.redis_get", mock_redis)
     monkeypatch.setattr("src.services.client_redis.client_redis.redis_set", mock_redis)
     monkeypatch.setattr("src.services.client_redis.client_redis.redis_expire", mock_redis)
@@ -78,7 +172,7 @@ def token(client, user, session, monkeypatch):
 
 @pytest.fixture()
 def token2(client, user2, session, monkeypatch):
-    mock_redis = MagicMock(return_value=None)
+    mock_redis = AsyncMock(return_value=None)
     monkeypatch.setattr("src.services.client_redis.client_redis.redis_get", mock_redis)
     monkeypatch.setattr("src.services.client_redis.client_redis.redis_set", mock_redis)
     monkeypatch.setattr("src.services.client_redis.client_redis.redis_expire", mock_redis)
@@ -0,0 +1,38 @@
+import unittest
+from datetime import date
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database.models import Base
+from src.schemas.contact import ContactSchema
+
+
+def make_body(num: int, first_name: str = "max", birthday: date = date(2000, 1, 1)) -> ContactSchema:
+    return ContactSchema(first_name=f"{first_name}{num}",
+                         last_name="krivitskyh",
+                         email=f"max{num}.lol@ex.ua",
+                         phone=f"+38099123{num:04}",
+                         birthday=birthday,
+                         data="Work")
+
+
+class SQLiteTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Gives every test a fresh in-memory SQLite database with the tables of the models.
+
+    Attributes:
+        engine (AsyncEngine): The engine of the database.
+        sessions (async_sessionmaker): Opens sessions on the database.
+        db (AsyncSession): The session of the test.
+    """
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.sessions = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.db = self.sessions()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
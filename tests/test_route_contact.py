@@ -2,15 +2,16 @@ from datetime import datetime, timedelta
 from src.database.models import User, Contact
 
 
-async def mock_get_birstdays(user_id, skip, limit, db):
-    from sqlalchemy import func, and_
+async def mock_get_birstdays(user_id, skip, limit, db, cursor=None, days=7):
+    from sqlalchemy import select, func, and_
     from src.schemas.contact import ContactResponse
     #sqlite
     today = datetime.today()
     seven_days_later = today + timedelta(days=7)
-    contact_birthdays = db.query(Contact).filter(and_(Contact.user_id == user_id,
+    stmt = select(Contact).filter(and_(Contact.user_id == user_id,
         func.strftime('%m-%d', Contact.birthday) >= today.strftime('%m-%d'),
-        func.strftime('%m-%d', Contact.birthday) <= seven_days_later.strftime('%m-%d'))).offset(skip).limit(limit).all()
+        func.strftime('%m-%d', Contact.birthday) <= seven_days_later.strftime('%m-%d'))).offset(skip).limit(limit)
+    contact_birthdays = (await db.execute(stmt)).scalars().all()
     contact_list = []
     if not contact_birthdays:
         return contact_list
@@ -124,6 +125,35 @@ def test_search_contacts_birthday(client, token):
     data = response.json()
     assert len(data) == 1
 
+def test_search_contacts_ranked(client, token, reset_limiter):
+    params = {"first_name": "1", "last_name": "string12"}
+    response = client.get("/api/contacts/search", params=params, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    data = response.json()
+    assert len(data) == 11
+    assert data[0]["last_name"] == "string12"
+    assert [contact["id"] for contact in data[1:]] == sorted(contact["id"] for contact in data[1:])
+
+def test_search_contacts_match_all(client, token, reset_limiter):
+    params = {"first_name": "1", "phone": "5", "match": "all"}
+    response = client.get("/api/contacts/search", params=params, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    data = response.json()
+    assert [contact["first_name"] for contact in data] == ["string15"]
+
+def test_search_contacts_cursor(client, token, reset_limiter):
+    params = {"first_name": "1", "last_name": "string12", "limit": 4}
+    names = []
+    while True:
+        response = client.get("/api/contacts/search", params=params, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200, "OK"
+        names += [contact["first_name"] for contact in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert len(names) == len(set(names)) == 11
+    assert names[0] == "string12"
+
 def test_search_contacts_first_name_no_contacts(client, token2):
     params = {"first_name": "0"}
     response = client.get("/api/contacts/search", params=params, headers={"Authorization": f"Bearer {token2}"})
@@ -165,6 +195,46 @@ def test_get_contacts(client, token):
     assert response.status_code == 200, "OK"
     data = response.json()
     assert len(data) == 20
+    assert "X-Next-Cursor" not in response.headers
+
+def test_get_contacts_cursor(client, token):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 7} if cursor is None else {"limit": 7, "cursor": cursor}
+        response = client.get("/api/contacts/", params=params, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200, "OK"
+        ids += [contact["id"] for contact in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        assert f"cursor={cursor}" in response.headers["Link"]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 20
+
+def test_get_contacts_cursor_order_by_last_name(client, token):
+    response = client.get("/api/contacts/", params={"limit": 5, "order_by": "last_name"},
+                          headers={"Authorization": f"Bearer {token}"})
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/api/contacts/", params={"limit": 5, "order_by": "last_name", "cursor": cursor},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    assert [contact["last_name"] for contact in response.json()] == [
+        "string13", "string14", "string15", "string16", "string17"]
+    # a cursor of one ordering is rejected by another
+    response = client.get("/api/contacts/", params={"cursor": cursor}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, "Bad Request"
+
+def test_get_contacts_invalid_cursor(client, token):
+    response = client.get("/api/contacts/", params={"cursor": "not-a-cursor"},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, "Bad Request"
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_get_contacts_invalid_limit(client, token, reset_limiter):
+    headers = {"Authorization": f"Bearer {token}"}
+    for params in ({"limit": 0}, {"limit": 1001}, {"skip": -1}):
+        assert client.get("/api/contacts/", params=params, headers=headers).status_code == 422
+        assert client.get("/api/contacts/birstdays", params=params, headers=headers).status_code == 422
 
 def test_get_contacts_no_contacts(client, token2):
     response = client.get("/api/contacts/", headers={"Authorization": f"Bearer {token2}"})
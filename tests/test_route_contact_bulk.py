@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from src.services.bulk import MAX_LINE_LENGTH
+
+
+pytestmark = pytest.mark.usefixtures("reset_limiter")
+
+
+CSV = (
+    "first_name,last_name,email,phone,birthday,data\r\n"
+    "max,krivitskyh,max@ex.ua,+380991230001,2000-01-01,Work\r\n"
+    "\r\n"
+    "olena,krivitskyh,olena@ex.ua,+380991230002,2001-02-03,\"Family, close\"\r\n"
+    "artem,grid,not-an-email,+380991230003,2002-03-04,Work\r\n"
+    "max,copy,max@ex.ua,+380991230004,2000-01-01,Work\r\n"
+    "short,row\r\n"
+)
+
+
+def test_bulk_csv(client, token):
+    response = client.post("/api/contacts/bulk", content=CSV.encode(),
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.status_code == 200, "OK"
+    data = response.json()
+    assert data["created"] == 2
+    assert [error["row"] for error in data["errors"]] == [5, 6, 7]
+    assert data["errors"][0]["detail"].startswith("email:")
+    assert data["errors"][1]["detail"] == "Duplicate email of row 2"
+    assert data["errors"][2]["detail"] == "Expected 6 fields, got 2"
+
+    response = client.get("/api/contacts/", headers={"Authorization": f"Bearer {token}"})
+    assert [contact["data"] for contact in response.json()] == ["Work", "Family, close"]
+
+
+def test_bulk_ndjson_conflicts(client, token):
+    lines = [
+        {"first_name": "max", "last_name": "k", "email": "max@ex.ua", "phone": "+380991239999",
+         "birthday": "2000-01-01", "data": "Work"},
+        {"first_name": "ivan", "last_name": "k", "email": "ivan@ex.ua", "phone": "+380991230002",
+         "birthday": "2000-01-01", "data": "Work"},
+        {"first_name": "petro", "last_name": "k", "email": "petro@ex.ua", "phone": "+380991230010",
+         "birthday": "2000-01-01", "data": "Work"},
+        [1, 2],
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{broken"
+    response = client.post("/api/contacts/bulk", params={"format": "ndjson"}, content=body.encode(),
+                           headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    data = response.json()
+    assert data["created"] == 1
+    assert data["errors"] == [
+        {"row": 1, "detail": "Contact with email max@ex.ua already exists"},
+        {"row": 2, "detail": "Contact with phone +380991230002 already exists"},
+        {"row": 4, "detail": "Expected a JSON object"},
+        {"row": 5, "detail": "Invalid JSON"},
+    ]
+
+
+def test_bulk_unsupported_type(client, token):
+    response = client.post("/api/contacts/bulk", content=b"<xml/>",
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "application/xml"})
+    assert response.status_code == 415, "Unsupported Media Type"
+
+
+def test_bulk_invalid_utf8(client, token):
+    response = client.post("/api/contacts/bulk", content=b"first_name\n\xff\xfe\n",
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.status_code == 400, "Bad Request"
+
+
+def test_bulk_line_too_long(client, token):
+    response = client.post("/api/contacts/bulk", content=b"first_name\n" + b"x" * (MAX_LINE_LENGTH + 1),
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.status_code == 413, "Request Entity Too Large"
+
+
+def test_bulk_update_by_ids(client, token):
+    contacts = client.get("/api/contacts/", headers={"Authorization": f"Bearer {token}"}).json()
+    ids = [contact["id"] for contact in contacts[:2]]
+    response = client.patch("/api/contacts/bulk", params={"returning": True},
+                            json={"ids": ids, "values": {"data": "Archive", "birthday": "1999-12-31"}},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    data = response.json()
+    assert data["count"] == 2
+    assert sorted(contact["id"] for contact in data["contacts"]) == ids
+    assert {contact["data"] for contact in data["contacts"]} == {"Archive"}
+
+    contact = client.get(f"/api/contacts/{ids[0]}", headers={"Authorization": f"Bearer {token}"}).json()
+    assert contact["birthday"] == "1999-12-31"
+
+
+def test_bulk_update_by_filter(client, token):
+    response = client.patch("/api/contacts/bulk",
+                            json={"filter": {"last_name": "krivit"}, "values": {"last_name": "kryvytskyi"}},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    assert response.json() == {"count": 2}
+
+
+def test_bulk_selection_required(client, token):
+    response = client.patch("/api/contacts/bulk", json={"filter": {"match": "any"}, "values": {"data": "x"}},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422, "Unprocessable Entity"
+    response = client.patch("/api/contacts/bulk", json={"ids": [1], "values": {}},
+                            headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422, "Unprocessable Entity"
+
+
+def test_bulk_blank_filter(client, token):
+    for term in ("", "   "):
+        response = client.request("DELETE", "/api/contacts/bulk", json={"filter": {"first_name": term}},
+                                  headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 422, "Unprocessable Entity"
+        response = client.patch("/api/contacts/bulk", json={"filter": {"last_name": term}, "values": {"data": "x"}},
+                                headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 422, "Unprocessable Entity"
+    contacts = client.get("/api/contacts/", headers={"Authorization": f"Bearer {token}"}).json()
+    assert len(contacts) == 3
+    assert "x" not in {contact["data"] for contact in contacts}
+
+
+def test_bulk_remove_other_user(client, token, token2):
+    contacts = client.get("/api/contacts/", headers={"Authorization": f"Bearer {token}"}).json()
+    response = client.request("DELETE", "/api/contacts/bulk", json={"ids": [contact["id"] for contact in contacts]},
+                              headers={"Authorization": f"Bearer {token2}"})
+    assert response.status_code == 200, "OK"
+    assert response.json() == {"count": 0}
+
+
+def test_bulk_remove(client, token):
+    response = client.request("DELETE", "/api/contacts/bulk", params={"returning": True},
+                              json={"filter": {"last_name": "kryvytskyi"}},
+                              headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    data = response.json()
+    assert data["count"] == 2
+    assert {contact["first_name"] for contact in data["contacts"]} == {"max", "olena"}
+
+    contacts = client.get("/api/contacts/", headers={"Authorization": f"Bearer {token}"}).json()
+    assert [contact["first_name"] for contact in contacts] == ["petro"]
+
+
+def test_bulk_same_contact_for_two_users(client, token, token2):
+    body = "first_name,last_name,email,phone,birthday,data\npetro,k,petro@ex.ua,+380991230010,2000-01-01,Work\n"
+    response = client.post("/api/contacts/bulk", content=body.encode(),
+                           headers={"Authorization": f"Bearer {token2}", "Content-Type": "text/csv"})
+    assert response.json() == {"created": 1, "errors": []}
+    response = client.post("/api/contacts/bulk", content=body.encode(),
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.json()["errors"] == [{"row": 2, "detail": "Contact with email petro@ex.ua already exists"}]
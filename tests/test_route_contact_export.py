@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+import httpx
+import pytest
+
+from main import server
+from src.services import export
+
+
+pytestmark = pytest.mark.usefixtures("reset_limiter")
+
+
+CSV = (
+    "first_name,last_name,email,phone,birthday,data\r\n"
+    "max,krivitskyh,max@ex.ua,+380991230001,2000-01-01,Work\r\n"
+    "olena,krivitskyh,olena@ex.ua,+380991230002,2001-02-03,\"Family; close, friend\"\r\n"
+)
+
+
+def test_export_csv_round_trip(client, token):
+    response = client.post("/api/contacts/bulk", content=CSV.encode(),
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.json()["created"] == 2
+
+    response = client.get("/api/contacts/export", headers={"Authorization": f"Bearer {token}",
+                                                           "Accept-Encoding": "identity"})
+    assert response.status_code == 200, "OK"
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "contacts.csv" in response.headers["content-disposition"]
+    assert "content-encoding" not in response.headers
+    assert response.text == CSV
+
+
+def test_export_ndjson(client, token):
+    response = client.get("/api/contacts/export", params={"format": "ndjson"},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["email"] for row in rows] == ["max@ex.ua", "olena@ex.ua"]
+    assert rows[1]["birthday"] == "2001-02-03"
+
+
+def test_export_vcard(client, token):
+    response = client.get("/api/contacts/export", params={"format": "vcard"},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    assert response.text.count("BEGIN:VCARD") == 2
+    assert "N:krivitskyh;olena;;;\r\n" in response.text
+    assert "NOTE:Family\\; close\\, friend\r\n" in response.text
+
+
+async def _raw_export(token: str) -> httpx.Response:
+    # TestClient transparently inflates gzip, read the raw body through the ASGI transport instead
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server), base_url="http://test") as client:
+        request = client.build_request("GET", "/api/contacts/export", headers={
+            "Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"})
+        response = await client.send(request, stream=True)
+        response.raw_body = b"".join([chunk async for chunk in response.aiter_raw()])
+        return response
+
+
+def test_export_gzip(client, token):
+    response = asyncio.run(_raw_export(token))
+    assert response.headers["content-encoding"] == "gzip"
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.raw_body).decode())))
+    assert rows[0][0] == "first_name"
+    assert len(rows) == 3
+
+
+def test_export_gzip_refused(client, token):
+    response = client.get("/api/contacts/export", headers={"Authorization": f"Bearer {token}",
+                                                           "Accept-Encoding": "gzip;q=0, identity"})
+    assert response.status_code == 200, "OK"
+    assert "content-encoding" not in response.headers
+    assert response.text.startswith("first_name")
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("deflate, GZIP;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000, *", False),
+    ("*;q=0", False),
+    ("br, identity", False),
+    ("gzip;q=oops", False),
+    (None, False),
+])
+def test_accepts_encoding(header, expected):
+    assert export.accepts_encoding(header, "gzip") is expected
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.models import Base, Contact, User
+from src.database.replicas import ReplicaSet, RecentWrites
+
+
+pytestmark = pytest.mark.usefixtures("reset_limiter")
+
+
+@pytest.fixture()
+def replica(tmp_path, session, user, token, monkeypatch, fake_redis):
+    # a second SQLite database stands in for a replica that holds one contact the primary does not have
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(sync_engine)
+    current_user = session.query(User).filter(User.email == user["email"]).first()
+    with sync_engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(id=current_user.id, username=current_user.username,
+                                                    email=current_user.email, password=current_user.password,
+                                                    avatar=current_user.avatar, confirmed=True))
+        conn.execute(Contact.__table__.insert().values(first_name="replica", last_name="only", email="replica@ex.ua",
+                                                       phone="+380990000000", birthday=date(2000, 1, 1), data="Work",
+                                                       user_id=current_user.id))
+    sync_engine.dispose()
+
+    replicas = ReplicaSet([create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))])
+    monkeypatch.setattr("src.database.db.replicas", replicas)
+    # signup and login just wrote the user, start outside of the read-your-writes window
+    monkeypatch.setattr("src.database.db.recent_writes", RecentWrites(window=60))
+    fake_redis.store.pop(RecentWrites.key(user["email"]), None)
+    yield replicas
+    asyncio.run(replicas.dispose())
+
+
+def test_reads_go_to_replica(client, token, replica):
+    response = client.get("/api/contacts", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    assert [contact["first_name"] for contact in response.json()] == ["replica"]
+
+    response = client.get("/api/contacts/search", params={"first_name": "repl"},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert [contact["email"] for contact in response.json()] == ["replica@ex.ua"]
+
+
+def test_own_writes_read_from_primary(client, token, replica):
+    response = client.post("/api/contacts", json={
+        "first_name": "primary", "last_name": "only", "email": "primary@ex.ua",
+        "phone": "+380991111111", "birthday": "2000-01-01", "data": "Work"},
+        headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 201, response.text
+
+    response = client.get("/api/contacts", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    names = [contact["first_name"] for contact in response.json()]
+    assert "primary" in names and "replica" not in names
+
+
+def test_down_replica_falls_back_to_primary(client, token, replica):
+    replica.mark(0, False)
+    response = client.get("/api/contacts", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, "OK"
+    assert "replica" not in [contact["first_name"] for contact in response.json()]
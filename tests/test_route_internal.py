@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from main import server
+from src.conf.config import Settings, app_settings
+from src.database.db import engine_metrics
+from src.database.pool import InstrumentedQueuePool, WaitHistogram
+
+
+@pytest.fixture()
+def internal_key():
+    settings = Settings(internal_api_key="s3cret")
+    server.dependency_overrides[app_settings] = lambda: settings
+    yield settings.internal_api_key
+    server.dependency_overrides.pop(app_settings)
+
+
+def test_pool_stats(client, internal_key):
+    response = client.get("/internal/pool", headers={"X-Internal-Key": internal_key})
+    assert response.status_code == 200, "OK"
+    data = response.json()
+    assert "checked_out" in data
+    assert "overflow" in data
+    assert data["wait"]["buckets"]["+Inf"] == data["wait"]["count"]
+
+
+def test_pool_stats_requires_key(client, internal_key):
+    assert client.get("/internal/pool").status_code == 401
+    assert client.get("/internal/pool", headers={"X-Internal-Key": "wrong"}).status_code == 401
+
+
+def test_pool_stats_non_ascii_key(client, internal_key):
+    response = client.get("/internal/pool", headers={"X-Internal-Key": "s3crét".encode()})
+    assert response.status_code == 401
+
+
+def test_pool_stats_non_ascii_configured_key(client):
+    settings = Settings(internal_api_key="s3crét")
+    server.dependency_overrides[app_settings] = lambda: settings
+    try:
+        assert client.get("/internal/pool", headers={"X-Internal-Key": "s3crét".encode()}).status_code == 200
+        assert client.get("/internal/pool", headers={"X-Internal-Key": "s3cret"}).status_code == 401
+    finally:
+        server.dependency_overrides.pop(app_settings)
+
+
+def test_pool_stats_disabled_by_default(client):
+    assert client.get("/internal/pool", headers={"X-Internal-Key": ""}).status_code == 404
+
+
+def test_wait_histogram():
+    histogram = WaitHistogram()
+    for wait_ms in (0.5, 3, 3, 700, 20000):
+        histogram.observe(wait_ms)
+    data = histogram.snapshot()
+    assert data["count"] == 5
+    assert data["buckets"]["1"] == 1
+    assert data["buckets"]["5"] == 3
+    assert data["buckets"]["1000"] == 4
+    assert data["buckets"]["+Inf"] == 5
+    assert data["max_ms"] == 20000
+
+
+async def _checkout(engine):
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+def test_instrumented_pool_records_checkouts():
+    engines = [create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=InstrumentedQueuePool)
+               for _ in range(2)]
+    asyncio.run(_checkout(engines[0]))
+    metrics = engine_metrics(engines[0])
+    assert (metrics.connects, metrics.checkouts, metrics.wait.total) == (1, 1, 1)
+    # another engine counts into its own metrics
+    assert engine_metrics(engines[1]).wait.total == 0
+    # the pool is replaced on dispose, its counters are kept
+    asyncio.run(engines[0].dispose())
+    asyncio.run(_checkout(engines[0]))
+    assert engine_metrics(engines[0]) is metrics
+    assert (metrics.connects, metrics.checkouts, metrics.wait.total) == (2, 2, 2)
+    for engine in engines:
+        asyncio.run(engine.dispose())
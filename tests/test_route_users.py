@@ -1,4 +1,8 @@
-from unittest.mock import MagicMock 
+from unittest.mock import AsyncMock
+
+from src.repository.users import user_key
+from src.services.client_redis import client_redis
+from src.services.limiter import limiter
 
 
 
@@ -17,7 +21,7 @@ def test_read_users_me(client, token):
 
 def test_update_avatar_user(client, token, monkeypatch):
     file = "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcR7Scg1gkR27z1fV6jZphvIpKlRTU408Wz8uYS7dWxn8g&s"
-    mock_cloud_inary = MagicMock(return_value=file)
+    mock_cloud_inary = AsyncMock(return_value=file)
     monkeypatch.setattr("src.services.auth.auth_service.cloud_inary", mock_cloud_inary)
     response = client.patch(
                 "/api/users/avatar",
@@ -27,5 +31,22 @@ def test_update_avatar_user(client, token, monkeypatch):
     data = response.json()
     assert data["avatar"] == file
 
-    
 
+def test_update_avatar_drops_cached_user(client, token, monkeypatch, fake_redis, reset_limiter):
+    # use the in-memory Redis instead of the mocks of the token fixture
+    monkeypatch.delattr(client_redis, "redis_get")
+    monkeypatch.delattr(client_redis, "redis_set")
+    file = "https://example.com/new-avatar.png"
+    monkeypatch.setattr("src.services.auth.auth_service.cloud_inary", AsyncMock(return_value=file))
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+    assert user_key("deadpool@example.com") in fake_redis.store
+
+    response = client.patch("/api/users/avatar", files={"file": file}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert user_key("deadpool@example.com") not in fake_redis.store
+
+    limiter.reset()
+    response = client.get("/api/users/me", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["avatar"] == file
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastapi import Request
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from fastapi.testclient import TestClient
+
+import main
+from src.conf.config import Settings, get_settings
+from src.database import db
+from src.database.db import engine_metrics
+from src.database.pool import InstrumentedQueuePool
+from src.repository import contacts as repository_contact
+from src.services import hashing
+from src.services.auth import auth_service
+from src.services.client_redis import client_redis
+from src.services.email import mail_client
+from src.services.hashing import password_hasher
+from src.services.limiter import limiter
+from src.services.token_cache import token_cache
+
+
+class TestLifespan(unittest.TestCase):
+    """
+    Warms the shared resources up before serving and drains them on shutdown.
+    """
+
+    def setUp(self):
+        limiter.reset()
+
+    def tearDown(self):
+        limiter.reset()
+
+    def test_warm_up_and_drain(self):
+        app = main.create_app(Settings(birthdays_digest_job=False))
+        with TestClient(app):
+            self.assertGreaterEqual(db.pool_metrics.connects, 1)
+            self.assertIsNotNone(client_redis._client)
+            self.assertEqual(set(mail_client._templates), set(mail_client.templates))
+            self.assertIsNotNone(password_hasher._executor)
+        self.assertIsNone(client_redis._client)
+        self.assertEqual(mail_client._idle, [])
+        self.assertIsNone(password_hasher._executor)
+
+    def test_rate_limit_handler(self):
+        app = main.create_app()
+
+        @app.get("/limited")
+        @limiter.limit("1/minute")
+        async def limited(request: Request):
+            return {}
+
+        client = TestClient(app)
+        self.assertEqual(client.get("/limited").status_code, 200)
+        response = client.get("/limited")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Rate limit exceeded", response.json()["error"])
+
+
+class TestCreateApp(unittest.TestCase):
+    """
+    Builds the shared resources from the settings given to ``create_app``.
+    """
+
+    def tearDown(self):
+        main.configure(get_settings())
+
+    def test_injected_settings(self):
+        settings = Settings(sqlalchemy_database_url="sqlite:///./other.db", secret_key="other", algorithm="HS512",
+                            redis_host="cache.local", token_cache_size=7, bcrypt_rounds=5, mail_server="smtp.local",
+                            rate_limit_users="3/minute", birthdays_window_days=3, birthdays_digest_job=False)
+        app = main.create_app(settings)
+        self.assertIs(app.state.settings, settings)
+        self.assertEqual(db.get_engine().url.database, "./other.db")
+        self.assertEqual(client_redis.host, "cache.local")
+        self.assertEqual(token_cache.maxsize, 7)
+        self.assertEqual(hashing.bcrypt_rounds, 5)
+        self.assertEqual(mail_client.settings.mail_server, "smtp.local")
+        self.assertEqual(limiter.route_limit("users")(), "3/minute")
+        self.assertEqual((auth_service.SECRET_KEY, auth_service.ALGORITHM), ("other", "HS512"))
+        self.assertEqual(repository_contact.BIRTHDAYS_WINDOW_DAYS, 3)
+
+
+class TestWarmUp(unittest.IsolatedAsyncioTestCase):
+    """
+    Opens up to the pool size of connections and fails fast when one cannot be opened.
+    """
+
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.dir.name, 'warm.db')}",
+                                          poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=5)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.dir.cleanup()
+
+    async def test_clamped_to_pool_size(self):
+        with patch.object(db, "engine", self.engine):
+            await db.warm_up(10)
+        self.assertEqual(engine_metrics(self.engine).connects, 2)
+
+    async def test_disabled(self):
+        with patch.object(db, "engine", self.engine):
+            await db.warm_up(0)
+        self.assertEqual(engine_metrics(self.engine).connects, 0)
+
+    async def test_failure_does_not_hang(self):
+        broken = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.dir.name, 'missing', 'x.db')}",
+                                     poolclass=InstrumentedQueuePool, pool_size=3)
+        with patch.object(db, "engine", broken), self.assertRaises(OperationalError):
+            await asyncio.wait_for(db.warm_up(3), timeout=5)
+        await broken.dispose()
+
+    async def test_partial_failure_does_not_hang(self):
+        # the second connection fails while the first one already waits for the others
+        engine, calls = self.engine, []
+
+        class FlakyEngine:
+            sync_engine = engine.sync_engine
+
+            def connect(self):
+                calls.append(1)
+                if len(calls) == 2:
+                    raise ConnectionRefusedError("database is down")
+                return engine.connect()
+
+        with patch.object(db, "engine", FlakyEngine()), self.assertRaises(ConnectionRefusedError):
+            await asyncio.wait_for(db.warm_up(2), timeout=5)
+        self.assertEqual(engine.sync_engine.pool.checkedout(), 0)
+
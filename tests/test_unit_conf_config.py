@@ -0,0 +1,108 @@
+import io
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from sqlalchemy.engine import make_url
+
+import main
+from src.conf.config import Settings, get_settings
+from src.database.db import engine_options, sync_url
+from src.services.token_cache import token_cache
+from src.services import auth
+
+
+class TestSettings(unittest.TestCase):
+    """
+    Reads the settings once from the environment and hands them to the modules.
+    """
+
+    def test_read_from_environment(self):
+        with patch.dict(os.environ, {"DB_POOL_SIZE": "20", "RATE_LIMIT_LOGIN": "5/second",
+                                     "CORS_ORIGINS": '["https://a.example", "https://b.example"]'}):
+            settings = Settings()
+        self.assertEqual(settings.db_pool_size, 20)
+        self.assertEqual(settings.rate_limit_login, "5/second")
+        self.assertEqual(settings.cors_origins, ["https://a.example", "https://b.example"])
+
+    def test_replica_urls(self):
+        self.assertEqual(Settings(sqlalchemy_replica_urls="").replica_urls, [])
+        self.assertEqual(Settings(sqlalchemy_replica_urls="sqlite:///a.db, sqlite:///b.db,").replica_urls,
+                         ["sqlite:///a.db", "sqlite:///b.db"])
+
+    def test_cached(self):
+        self.assertIs(get_settings(), get_settings())
+
+    def test_cache_clear(self):
+        try:
+            with patch.dict(os.environ, {"TOKEN_CACHE_SIZE": "3", "RATE_LIMIT_USERS": "4/minute"}):
+                get_settings.cache_clear()
+                app = main.create_app()
+            self.assertEqual(app.state.settings.rate_limit_users, "4/minute")
+            self.assertEqual(main.limiter.route_limit("users")(), "4/minute")
+            self.assertEqual(token_cache.maxsize, 3)
+        finally:
+            get_settings.cache_clear()
+            main.configure(get_settings())
+
+    def test_sync_url(self):
+        self.assertEqual(sync_url("postgresql+asyncpg://u:p@localhost/db").drivername, "postgresql+psycopg2")
+        self.assertEqual(sync_url("sqlite+aiosqlite:///./a.db").drivername, "sqlite")
+        self.assertEqual(sync_url("postgresql+psycopg2://u:p@localhost/db").drivername, "postgresql+psycopg2")
+
+    def test_engine_options(self):
+        settings = Settings(db_pool_size=7, db_max_overflow=0, db_statement_timeout=500)
+        options = engine_options(make_url("postgresql+asyncpg://u:p@localhost/db"), settings)
+        self.assertEqual((options["pool_size"], options["max_overflow"]), (7, 0))
+        self.assertEqual(options["connect_args"], {"server_settings": {"statement_timeout": "500"}})
+
+
+class TestCloudinaryClient(unittest.TestCase):
+    """
+    Configures cloudinary on the first upload only.
+    """
+
+    def setUp(self):
+        auth.cloudinary_client.cache_clear()
+
+    def tearDown(self):
+        auth.cloudinary_client.cache_clear()
+
+    def test_configured_once(self):
+        import cloudinary.uploader  # configures itself from the environment on import
+        with patch("cloudinary.config") as config:
+            self.assertIs(auth.cloudinary_client(), auth.cloudinary_client())
+        config.assert_called_once()
+        self.assertTrue(config.call_args.kwargs["secure"])
+
+
+class TestCloudinaryUpload(unittest.IsolatedAsyncioTestCase):
+    """
+    Uploads avatars off the event loop.
+    """
+
+    def setUp(self):
+        # the cloudinary account of the environment may be empty, as in the ``env`` template
+        settings = auth.auth_service.settings.model_copy(update={
+            "cloudinary_name": "demo", "cloudinary_api_key": "key", "cloudinary_api_secret": "secret"})
+        self.settings = patch.object(auth.auth_service, "_settings", settings)
+        self.settings.start()
+        auth.cloudinary_client.cache_clear()
+
+    def tearDown(self):
+        self.settings.stop()
+        auth.cloudinary_client.cache_clear()
+
+    async def test_upload_in_threadpool(self):
+        import cloudinary.uploader
+        threads = []
+
+        def upload(file, **kwargs):
+            threads.append(threading.current_thread())
+            return {"version": 7}
+
+        user = MagicMock(username="max")
+        with patch.object(cloudinary.uploader, "upload", upload):
+            url = await auth.auth_service.cloud_inary(MagicMock(file=io.BytesIO(b"png")), user)
+        self.assertIsNot(threads[0], threading.main_thread())
+        self.assertIn("demo/image/upload/c_fill,h_250,w_250/v7/NotesApp/max", url)
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database import db as database
+from src.database.models import Base, Contact, User
+from src.database.replicas import ReplicaSet, RecentWrites
+
+
+class TestReplicaSet(unittest.IsolatedAsyncioTestCase):
+    """
+    Routes reads between two SQLite databases standing in for replicas.
+    """
+
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engines = []
+        for name in ("replica0", "replica1"):
+            engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.dir.name, name)}.db")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(User.__table__.insert().values(id=1, username=name, email=f"{name}@ex.ua",
+                                                                  password="-"))
+            self.engines.append(engine)
+        self.replicas = ReplicaSet(self.engines)
+
+    async def asyncTearDown(self):
+        await self.replicas.dispose()
+        self.dir.cleanup()
+
+    async def served_by(self) -> str:
+        async with self.replicas.pick()() as db:
+            return (await db.execute(select(User.username))).scalar_one()
+
+    async def test_round_robin(self):
+        self.assertEqual([await self.served_by() for _ in range(4)], ["replica0", "replica1", "replica0", "replica1"])
+
+    async def test_health_check_skips_down_replica(self):
+        broken = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.dir.name, 'missing', 'x.db')}")
+        replicas = ReplicaSet([broken, self.engines[1]])
+        self.assertEqual(await replicas.check(), [False, True])
+        self.assertEqual([replicas.pick() for _ in range(3)], [replicas.sessions[1]] * 3)
+        replicas.mark(1, False)
+        self.assertIsNone(replicas.pick())
+        self.assertEqual(await replicas.check(), [False, True])
+        await broken.dispose()
+
+    async def test_read_session_respects_recent_writes(self):
+        recent = RecentWrites(window=60)
+        with patch.object(database, "replicas", self.replicas), patch.object(database, "recent_writes", recent):
+            replica = await database.read_session("max@ex.ua")
+            self.assertIsNotNone(replica)
+            await replica.close()
+            recent.mark("Max@ex.ua")
+            self.assertIsNone(await database.read_session("max@ex.ua"))
+            self.assertIsNotNone(replica := await database.read_session("olena@ex.ua"))
+            await replica.close()
+
+    async def test_read_session_without_replicas(self):
+        with patch.object(database, "replicas", ReplicaSet([])):
+            self.assertIsNone(await database.read_session("max@ex.ua"))
+
+
+class TestRecentWrites(unittest.IsolatedAsyncioTestCase):
+    """
+    Opens the read-your-writes window on committed writes.
+    """
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.recent = RecentWrites(window=60)
+        self.patch = patch.object(database, "recent_writes", self.recent)
+        self.patch.start()
+        self.db = async_sessionmaker(bind=self.engine, expire_on_commit=False)()
+
+    async def asyncTearDown(self):
+        self.patch.stop()
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def test_user_writes(self):
+        self.db.add(User(id=1, username="Max", email="Max@ex.ua", password="-"))
+        await self.db.commit()
+        self.assertTrue(await self.recent.recent("max@ex.ua"))
+
+    async def test_subject_writes(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(User.__table__.insert().values(id=1, username="Max", email="max@ex.ua", password="-"))
+        self.db.info["subject"] = "max@ex.ua"
+        await self.db.execute(select(Contact))
+        await self.db.commit()
+        self.assertFalse(await self.recent.recent("max@ex.ua"))
+        self.db.add(Contact(first_name="max", last_name="k", email="m@ex.ua", phone="+380991230000", user_id=1))
+        await self.db.commit()
+        self.assertTrue(await self.recent.recent("max@ex.ua"))
+
+    async def test_window_is_shared_through_redis(self):
+        self.recent.mark("max@ex.ua")
+        await self.recent._publish("max@ex.ua")
+        other_worker = RecentWrites(window=60)
+        self.assertTrue(await other_worker.recent("max@ex.ua"))
+        self.assertFalse(await other_worker.recent("olena@ex.ua"))
+
+    async def test_rolled_back_writes(self):
+        self.db.info["subject"] = "max@ex.ua"
+        self.db.add(User(id=1, username="Max", email="max@ex.ua", password="-"))
+        await self.db.flush()
+        await self.db.rollback()
+        self.assertFalse(await self.recent.recent("max@ex.ua"))
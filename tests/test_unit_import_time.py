@@ -0,0 +1,72 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+
+# integrations that are only imported by the lifespan or on first use
+LAZY_MODULES = ("aiosmtplib", "jinja2", "cloudinary", "passlib")
+# settings without a default, importing the app must not need them
+REQUIRED_SETTINGS = ("SQLALCHEMY_DATABASE_URL", "SECRET_KEY", "ALGORITHM")
+# generous budget for ``import main`` in microseconds, it took about 1.5s on a cold CI worker
+IMPORT_BUDGET = 5_000_000
+
+
+def run_import(module: str, env: dict[str, str] | None = None) -> subprocess.CompletedProcess:
+    """
+    Imports a module in a fresh interpreter with ``-X importtime``.
+
+    Args:
+        module (str): The module to import.
+        env (dict[str, str], optional): The environment. Defaults to the current one.
+
+    Returns:
+        subprocess.CompletedProcess: The finished interpreter, the import times are on stderr.
+    """
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=os.environ.copy() if env is None else env,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), timeout=60)
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Imports a module in a fresh interpreter and parses its ``-X importtime`` report.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        dict[str, int]: Cumulative import time in microseconds by module name.
+    """
+    result = run_import(module)
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)$", line.strip())
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    """
+    Keeps ``import main`` free of heavy integrations and within its time budget.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.times = import_times("main")
+
+    def test_lazy_integrations(self):
+        imported = [name for name in self.times if name.split(".")[0] in LAZY_MODULES]
+        self.assertEqual(imported, [])
+
+    def test_budget(self):
+        self.assertLess(self.times["main"], IMPORT_BUDGET)
+
+    def test_no_settings_read(self):
+        env = {name: value for name, value in os.environ.items() if name not in REQUIRED_SETTINGS}
+        for module in ("main", "src.conf.config"):
+            result = run_import(module, env)
+            self.assertEqual(result.returncode, 0, result.stderr[-2000:])
@@ -0,0 +1,106 @@
+import re
+from datetime import date
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from src.database.models import User
+from src.schemas.contact import (ContactUpdate, ContactDataUpdate, ContactSelection, ContactFilter,
+                                 ContactBulkUpdate, ContactBulkValues)
+from src.repository import contacts as repository_contact
+from src.repository import users as repository_users
+from tests.helpers import SQLiteTestCase, make_body
+
+
+# a full scan of a table, as opposed to SEARCH ... USING INDEX or the FTS virtual table
+FULL_SCAN = re.compile(r"\bSCAN (contacts|users)\b")
+# contacts are hash partitioned by user_id on Postgres, a query is pruned to one partition
+# only if it compares user_id to a single value
+CONTACTS = re.compile(r"\b(FROM|UPDATE) contacts\b")
+PRUNED = re.compile(r"\bcontacts\.user_id = \?")
+
+
+class TestQueryPlans(SQLiteTestCase):
+    """
+    Runs the hot queries of the repositories and fails if SQLite plans any of them
+    as a full table scan, i.e. if a query stops matching the indexes on the model,
+    or if a query on contacts could not be pruned to the partition of its user.
+    """
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.db.add(User(id=1, username="Max", email="Max@ex.ua", password="-"))
+        await self.db.commit()
+        for num in range(3):
+            await repository_contact.create_contact(1, make_body(num, birthday=date(2000, 1, 1 + num)), self.db)
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self.capture)
+
+    def capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters))
+
+    async def assert_indexed(self, call):
+        self.statements.clear()
+        await call
+        self.assertTrue(self.statements)
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self.capture)
+        try:
+            async with self.engine.connect() as conn:
+                for statement, parameters in self.statements:
+                    plan = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+                    details = [row[-1] for row in plan]
+                    if CONTACTS.search(statement):
+                        self.assertRegex(statement, PRUNED, "not pruned to one partition")
+                    self.assertFalse([line for line in details if FULL_SCAN.search(line)],
+                                     f"full scan in {statement}: {details}")
+        finally:
+            event.listen(self.engine.sync_engine, "before_cursor_execute", self.capture)
+
+    async def test_contacts_pages(self):
+        await self.assert_indexed(repository_contact.get_contacts(1, 0, 10, self.db))
+        await self.assert_indexed(repository_contact.get_contacts(1, 0, 10, self.db, order_by="last_name"))
+        cursor = repository_contact.next_cursor(await repository_contact.get_contacts(1, 0, 2, self.db), 1)
+        await self.assert_indexed(repository_contact.get_contacts(1, 0, 1, self.db, cursor))
+
+    async def test_contact_by_id(self):
+        repository_contact.CACHE_ENABLED, enabled = False, repository_contact.CACHE_ENABLED
+        try:
+            await self.assert_indexed(repository_contact.get_contact(1, 2, self.db))
+        finally:
+            repository_contact.CACHE_ENABLED = enabled
+
+    async def test_birthdays(self):
+        await self.assert_indexed(repository_contact.get_birstdays(1, 0, 10, self.db, days=30))
+
+    async def test_search(self):
+        await self.assert_indexed(repository_contact.search_contacts(1, "max", None, "ex.ua", None, None, self.db))
+
+    async def test_mutations(self):
+        body = ContactUpdate(first_name="max", last_name="krivitskyh", email="max@ex.ua",
+                             phone="+380991230000", birthday=date(2000, 2, 1), data="Home")
+        await self.assert_indexed(repository_contact.update_contact(1, 1, body, self.db))
+        await self.assert_indexed(repository_contact.update_data_contact(1, 2, ContactDataUpdate(data="Home"), self.db))
+        await self.assert_indexed(repository_contact.remove_contact(1, 3, self.db))
+
+    async def test_bulk_mutations(self):
+        values = ContactBulkValues(data="Friends")
+        await self.assert_indexed(repository_contact.bulk_update_contacts(
+            1, ContactBulkUpdate(ids=[1, 2], values=values), self.db))
+        await self.assert_indexed(repository_contact.bulk_update_contacts(
+            1, ContactBulkUpdate(filter=ContactFilter(last_name="krivitskyh"), values=values), self.db))
+        await self.assert_indexed(repository_contact.bulk_remove_contacts(1, ContactSelection(ids=[2]), self.db))
+
+    async def test_export(self):
+        async def export():
+            return [contact async for contact in repository_contact.stream_contacts(1, self.db)]
+        await self.assert_indexed(export())
+
+    async def test_login_lookups(self):
+        await self.assert_indexed(repository_users.get_user_by_email("max@EX.ua", self.db))
+        await self.assert_indexed(repository_users.get_user_by_username("Max", self.db))
+        self.assertEqual((await repository_users.get_user_by_email("mAx@ex.UA", self.db)).id, 1)
+
+    async def test_email_unique_ignoring_case(self):
+        self.db.add(User(id=2, username="Olena", email="max@EX.ua", password="-"))
+        with self.assertRaises(IntegrityError):
+            await self.db.commit()
@@ -1,10 +1,10 @@
 import unittest
 import fastapi
 from datetime import datetime
-from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from unittest.mock import MagicMock, AsyncMock
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.models import Contact, User
-from src.schemas.contact import ContactUpdate, ContactDataUpdate, ContactSchema
+from src.schemas.contact import ContactUpdate, ContactDataUpdate, ContactSchema, ContactSelection, ContactFilter
 from src.services.client_redis import client_redis 
 from src.repository.contacts import (
                                     create_contact, 
@@ -14,19 +14,26 @@ from src.repository.contacts import (
                                     get_contact,
                                     get_contacts,
                                     search_contacts,
-                                    get_birstdays
+                                    get_birstdays,
+                                    bulk_remove_contacts
                                     )
 
 class TestContact(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.user = User(id=1)
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.execute.return_value = MagicMock()
         self.body = ContactSchema(first_name="max",
                                 last_name="krivitskyh",
                                 email="max.lol@ex.ua",
                                 phone="+380991235634",
                                 birthday=datetime(2000, 1, 1),
                                 data="Work")
+        self.contact = Contact(id=1, user_id=self.user.id, **self.body.model_dump())
+
+    def tearDown(self):
+        for name in ("redis_get", "redis_set", "redis_expire", "redis_generation"):
+            client_redis.__dict__.pop(name, None)
     
     async def test_create_contact(self):
         result = await create_contact(user_id=self.user.id, body=self.body, db=self.session)
@@ -38,33 +45,34 @@ class TestContact(unittest.IsolatedAsyncioTestCase):
     async def test_get_contacts(self):
         user_id=1
         contacts = [Contact(), Contact(), Contact(), Contact(), Contact()]
-        contact = [Contact()]
+        contact = [self.contact]
         contact_none = []
-        client_redis.redis_get = MagicMock(return_value=contacts)
-        client_redis.redis_set = MagicMock(return_value=True)
-        client_redis.redis_expire = MagicMock(return_value=True)
-        self.session.query().filter().offset().limit().all.return_value = None
+        client_redis.redis_generation = AsyncMock(return_value=1)
+        client_redis.redis_get = AsyncMock(return_value=contacts)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        client_redis.redis_expire = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.all.return_value = None
         result = await get_contacts(user_id=user_id, skip=0, limit=100, db=self.session)
         self.assertEqual(result, contacts)
 
-        client_redis.redis_get = MagicMock(return_value=contact)
-        client_redis.redis_set = MagicMock(return_value=True)
-        client_redis.redis_expire = MagicMock(return_value=True)
-        self.session.query().filter().offset().limit().all.return_value = None
+        client_redis.redis_get = AsyncMock(return_value=contact)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        client_redis.redis_expire = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.all.return_value = None
         result = await get_contacts(user_id=user_id, skip=0, limit=100, db=self.session)
         self.assertEqual(result, contact)
 
-        client_redis.redis_get = MagicMock(return_value=None)
-        client_redis.redis_set = MagicMock(return_value=True)
-        client_redis.redis_expire = MagicMock(return_value=True)
-        self.session.query().filter().offset().limit().all.return_value = contact
+        client_redis.redis_get = AsyncMock(return_value=None)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        client_redis.redis_expire = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.all.return_value = contact
         result = await get_contacts(user_id=user_id, skip=0, limit=100, db=self.session)
         self.assertEqual(result, contact)
 
-        client_redis.redis_get = MagicMock(return_value=None)
-        client_redis.redis_set = MagicMock(return_value=True)
-        client_redis.redis_expire = MagicMock(return_value=True)
-        self.session.query().filter().offset().limit().all.return_value = contact_none
+        client_redis.redis_get = AsyncMock(return_value=None)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        client_redis.redis_expire = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.all.return_value = contact_none
         result = await get_contacts(user_id=user_id, skip=0, limit=100, db=self.session)
         self.assertEqual(result, contact_none)
 
@@ -72,32 +80,31 @@ class TestContact(unittest.IsolatedAsyncioTestCase):
         user_id=1
         contact_id=1
         contact = Contact()
-        client_redis.redis_get = MagicMock(return_value=contact)
-        client_redis.redis_set = MagicMock(return_value=True)
-        client_redis.redis_expire = MagicMock(return_value=True)
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        client_redis.redis_get = AsyncMock(return_value=contact)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        client_redis.redis_expire = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         result = await get_contact(user_id=user_id, contact_id=contact_id, db=self.session)
         self.assertEqual(result, contact)  
 
-        contact = Contact()
-        client_redis.redis_get = MagicMock(return_value=None)
-        client_redis.redis_set = MagicMock(return_value=True)
-        client_redis.redis_expire = MagicMock(return_value=True)
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        contact = self.contact
+        client_redis.redis_get = AsyncMock(return_value=None)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        client_redis.redis_expire = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.first.return_value = contact
         result = await get_contact(user_id=self.user.id, contact_id=1, db=self.session)
         self.assertEqual(result, contact)   
 
-        client_redis.redis_get = MagicMock(return_value=None)
-        client_redis.redis_set = MagicMock(return_value=True)
-        client_redis.redis_expire = MagicMock(return_value=True)
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        client_redis.redis_get = AsyncMock(return_value=None)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        client_redis.redis_expire = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         result = await get_contact(user_id=self.user.id, contact_id=1, db=self.session)
         self.assertIsNone(result)   
  
     async def test_update_contact(self):
         contact_id=1
         user_id=1
-        contact = Contact(id=contact_id)
        
         body = ContactUpdate(first_name="max",
                              last_name="krivitskyh",
@@ -105,7 +112,8 @@ class TestContact(unittest.IsolatedAsyncioTestCase):
                              phone="+380991235634",
                              birthday=datetime(1990, 1, 31),
                              data="work")
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        contact = Contact(id=contact_id, user_id=user_id, **body.model_dump())
+        self.session.execute.return_value.scalars.return_value.first.return_value = contact
         result = await update_contact(user_id=user_id, contact_id=contact_id, body=body, db=self.session)
         self.assertEqual(result.first_name, body.first_name)
         self.assertEqual(result.last_name, body.last_name)
@@ -113,49 +121,49 @@ class TestContact(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.phone, body.phone)
         self.assertEqual(result.birthday, body.birthday)
         self.assertEqual(result.data, body.data)
+        self.session.execute.assert_called_once()
         self.session.commit.assert_called()
 
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         result = await update_contact(user_id=user_id, contact_id=contact_id, body=body, db=self.session)
         self.assertIsNone(result)
-        self.assertIsNone(self.session.commit.assert_called())
 
     async def test_remove_contact(self):
         user_id=1
         contact_id=1
         contact = Contact(id=contact_id)
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        self.session.execute.return_value.scalars.return_value.first.return_value = contact
         result = await remove_contact(user_id=user_id, contact_id=contact_id, db=self.session)
-        self.session.delete.assert_called()
+        self.session.execute.assert_called_once()
+        self.session.delete.assert_not_called()
         self.session.commit.assert_called()
         self.assertEqual(result, contact)
 
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        self.session.execute.return_value.scalars.return_value.first.return_value = None
         result = await remove_contact(user_id=user_id, contact_id=contact_id, db=self.session)
-        self.assertIsNone(self.session.delete.assert_called())
-        self.assertIsNone(self.session.commit.assert_called())
         self.assertIsNone(result)
 
     async def test_update_data_contact(self):
         user_id=1
         contact_id=1
         body = ContactDataUpdate(data="Test_update_data_contact")
-        contact = Contact(id=contact_id)
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        contact = self.contact
+        contact.data = body.data
+        self.session.execute.return_value.scalars.return_value.first.return_value = contact
         result = await update_data_contact(user_id=user_id, contact_id=contact_id, body=body, db=self.session)   
+        self.session.execute.assert_called_once()
         self.session.commit.assert_called()
         self.assertEqual(result.data, body.data)
 
-        self.session.query.return_value.filter.return_value.first.return_value = None
+        # nothing updated and no such contact
+        self.session.execute.return_value.scalars.return_value.first.side_effect = [None, None]
         result = await update_data_contact(user_id=user_id, contact_id=contact_id, body=body, db=self.session)   
-        self.assertIsNone(self.session.commit.assert_called())
         self.assertIsNone(result)
 
-        contact = Contact(id=contact_id, data="Test_update_data_contact")
-        self.session.query.return_value.filter.return_value.first.return_value = contact
+        # nothing updated but the contact exists, so the data was the same
+        self.session.execute.return_value.scalars.return_value.first.side_effect = [None, contact_id]
         with self.assertRaises(fastapi.exceptions.HTTPException):
             result = await update_data_contact(user_id=user_id, contact_id=contact_id, body=body, db=self.session)   
-        self.assertIsNone(self.session.commit.assert_called())
         self.assertIsNone(result)
 
     async def test_get_birstdays(self):
@@ -187,11 +195,13 @@ class TestContact(unittest.IsolatedAsyncioTestCase):
                 birthday=datetime(2001, 1, 1), 
                 data="Work2",  
                 user_id = 1)]
-        self.session.query.return_value.filter.return_value.offset.return_value.limit.return_value.all.return_value = contacts
+        client_redis.redis_get = AsyncMock(return_value=None)
+        client_redis.redis_set = AsyncMock(return_value=True)
+        self.session.execute.return_value.scalars.return_value.all.return_value = contacts
         result = await get_birstdays(user_id=user_id, skip=0, limit=100, db=self.session)
         self.assertNotEqual(result, contacts)
 
-        self.session.query.return_value.filter.return_value.offset.return_value.limit.return_value.all.return_value = None
+        self.session.execute.return_value.scalars.return_value.all.return_value = None
         result = await get_birstdays(user_id=user_id, skip=0, limit=100, db=self.session)
         self.assertEqual(result, [])
 
@@ -229,17 +239,21 @@ class TestContact(unittest.IsolatedAsyncioTestCase):
                 data="Family",  
                 user_id = 1)]
         birthday=datetime(1999, 4, 18)
-        self.session.query.return_value.filter.return_value = None
+        self.session.execute.return_value.scalars.return_value.all.return_value = []
         result = await search_contacts(user_id=user_id, first_name=first_name, last_name=last_name, email=email, phone=phone, birthday=birthday, db=self.session)   
         self.assertListEqual(result, [])
 
-        query_mock = MagicMock()
-        query_mock.filter.return_value = query_mock
-        query_mock.ilike.return_value = query_mock
-        query_mock.all.return_value = contacts
-        self.session.query.return_value = query_mock
+        self.session.execute.return_value.scalars.return_value.all.return_value = contacts
         result = await search_contacts(user_id=user_id, first_name=first_name, last_name=last_name, email=email, phone=phone, birthday=birthday, db=self.session)   
         self.assertEqual(len(result), len(contacts))
 
+    async def test_bulk_remove_contacts_without_criteria(self):
+        # a selection that skipped validation must not reach every contact of the user
+        selection = ContactSelection.model_construct(ids=None, filter=ContactFilter.model_construct(first_name=""))
+        with self.assertRaises(fastapi.HTTPException) as err:
+            await bulk_remove_contacts(user_id=self.user.id, selection=selection, db=self.session)
+        self.assertEqual(err.exception.status_code, 422)
+        self.session.execute.assert_not_called()
+
 # if __name__ == '__main__':
 #     unittest.main()
\ No newline at end of file
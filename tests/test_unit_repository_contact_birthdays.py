@@ -0,0 +1,214 @@
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import select, text
+
+from src.database.models import Contact, User
+from src.schemas.contact import ContactUpdate, ContactDataUpdate, ContactResponse
+from src.services.birthdays import job_key, materialize_once, seconds_until_tomorrow
+from src.services.client_redis import client_redis
+from src.repository.contacts import (
+                                    birthday_window,
+                                    birthdays_generation_key,
+                                    create_contact,
+                                    digest_key,
+                                    get_birstdays,
+                                    materialize_birthdays,
+                                    next_cursor,
+                                    remove_contact,
+                                    update_contact,
+                                    update_data_contact,
+                                    )
+from tests.helpers import SQLiteTestCase, make_body
+
+
+class TestBirthdays(SQLiteTestCase):
+    """
+    Runs the upcoming birthdays query against SQLite.
+    """
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        for num, birthday in enumerate([date(1990, 12, 30), date(1985, 1, 2), date(2000, 2, 29),
+                                        date(1999, 3, 1), date(1970, 6, 15)]):
+            await create_contact(1, make_body(num, birthday=birthday), self.db)
+
+    async def upcoming(self, today: date, days: int) -> list[str]:
+        stmt = select(Contact.first_name).filter(birthday_window(today, days)).order_by(Contact.id)
+        return list((await self.db.execute(stmt)).scalars().all())
+
+    async def test_window(self):
+        self.assertEqual(await self.upcoming(date(2026, 6, 10), 7), ["max4"])
+        self.assertEqual(await self.upcoming(date(2026, 6, 16), 7), [])
+
+    async def test_year_wrap(self):
+        self.assertEqual(await self.upcoming(date(2026, 12, 28), 7), ["max0", "max1"])
+        self.assertEqual(await self.upcoming(date(2027, 1, 1), 7), ["max1"])
+
+    async def test_leap_day(self):
+        self.assertEqual(await self.upcoming(date(2027, 2, 27), 2), ["max2", "max3"])
+
+    async def test_whole_year(self):
+        self.assertEqual(len(await self.upcoming(date(2026, 6, 10), 366)), 5)
+
+    async def test_mmdd_follows_updates(self):
+        body = ContactUpdate(**make_body(4, birthday=date(1970, 10, 18)).model_dump())
+        await update_contact(1, 5, body, self.db)
+        self.assertEqual(await self.upcoming(date(2026, 10, 17), 1), ["max4"])
+        with patch("src.repository.contacts.date") as fake_date:
+            fake_date.today.return_value = date(2026, 10, 17)
+            contacts = await get_birstdays(1, 0, 10, self.db, days=1)
+        self.assertEqual([contact.first_name for contact in contacts], ["max4"])
+
+    async def test_query_uses_index(self):
+        plan = (await self.db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM contacts WHERE user_id = 1 AND birthday_mmdd BETWEEN 1010 AND 1017"
+        ))).all()
+        self.assertIn("ix_contacts_user_id_birthday_mmdd", " ".join(row[-1] for row in plan))
+        # materialize_birthdays reads the contacts of a batch of users
+        plan = (await self.db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM contacts WHERE user_id IN (1, 2) AND birthday_mmdd BETWEEN 1010 AND 1017"
+        ))).all()
+        self.assertIn("ix_contacts_user_id_birthday_mmdd", " ".join(row[-1] for row in plan))
+
+
+class TestBirthdayDigest(SQLiteTestCase):
+    """
+    Checks that the daily digest is materialized, rebuilt after writes to upcoming birthdays
+    and served without the database.
+    """
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.db.add_all([User(id=1, username="max", email="max@ex.ua", password="-"),
+                         User(id=2, username="olena", email="olena@ex.ua", password="-")])
+        await self.db.commit()
+        self.today = date.today()
+        self.soon = self.today.replace(year=2000)
+        self.later = (self.today + timedelta(days=60)).replace(year=2000)
+
+    async def digest(self, user_id: int = 1) -> list[str] | None:
+        generation = await client_redis.redis_generation(birthdays_generation_key(user_id))
+        digest = await client_redis.redis_get(digest_key(user_id, generation, self.today), ContactResponse, many=True)
+        return None if digest is None else [contact.first_name for contact in digest]
+
+    async def upcoming(self) -> list[str]:
+        return [contact.first_name for contact in await get_birstdays(1, 0, 10, self.db)]
+
+    async def test_materialize(self):
+        await create_contact(1, make_body(1, birthday=self.soon), self.db)
+        await create_contact(1, make_body(2, birthday=self.later), self.db)
+        self.assertEqual(await materialize_birthdays(self.db), 2)
+        self.assertEqual(await self.digest(1), ["max1"])
+        self.assertEqual(await self.digest(2), [])
+
+    async def test_writes_rebuild_digest(self):
+        await materialize_birthdays(self.db)
+        contact = await create_contact(1, make_body(1, birthday=self.soon), self.db)
+        await create_contact(1, make_body(2, birthday=self.later), self.db)
+        self.assertIsNone(await self.digest())
+        self.assertEqual(await self.upcoming(), ["max1"])
+        self.assertEqual(await self.digest(), ["max1"])
+
+        await update_data_contact(1, contact.id, ContactDataUpdate(data="Family"), self.db)
+        self.assertEqual((await get_birstdays(1, 0, 10, self.db))[0].data, "Family")
+
+        await update_contact(1, contact.id, ContactUpdate(**make_body(1, birthday=self.later).model_dump()), self.db)
+        self.assertEqual(await self.upcoming(), [])
+
+        await update_contact(1, contact.id, ContactUpdate(**make_body(1, birthday=self.soon).model_dump()), self.db)
+        self.assertEqual(await self.upcoming(), ["max1"])
+
+        await remove_contact(1, contact.id, self.db)
+        self.assertEqual(await self.upcoming(), [])
+
+    async def test_writes_outside_window_keep_digest(self):
+        contact = await create_contact(1, make_body(1, birthday=self.later), self.db)
+        await create_contact(1, make_body(2, birthday=self.soon), self.db)
+        await materialize_birthdays(self.db)
+        await create_contact(1, make_body(3, birthday=self.later), self.db)
+        await update_data_contact(1, contact.id, ContactDataUpdate(data="Family"), self.db)
+        later = (self.today + timedelta(days=90)).replace(year=2000)
+        await update_contact(1, contact.id, ContactUpdate(**make_body(1, birthday=later).model_dump()), self.db)
+        self.assertEqual(await self.digest(), ["max2"])
+        await remove_contact(1, contact.id, self.db)
+        self.assertEqual(await self.digest(), ["max2"])
+
+    async def test_update_out_of_window_drops_digest(self):
+        contact = await create_contact(1, make_body(1, birthday=self.soon), self.db)
+        await materialize_birthdays(self.db)
+        # the previous birthday is only known from the digest
+        await update_contact(1, contact.id, ContactUpdate(**make_body(1, birthday=self.later).model_dump()), self.db)
+        self.assertIsNone(await self.digest())
+        self.assertEqual(await self.upcoming(), [])
+
+    async def test_materialize_in_batches(self):
+        await create_contact(1, make_body(1, birthday=self.soon), self.db)
+        await create_contact(2, make_body(2, birthday=self.soon), self.db)
+        with patch.object(client_redis, "redis_set_many", wraps=client_redis.redis_set_many) as set_many:
+            self.assertEqual(await materialize_birthdays(self.db, batch_size=1), 2)
+        self.assertEqual(set_many.call_count, 2)
+        self.assertEqual(await self.digest(1), ["max1"])
+        self.assertEqual(await self.digest(2), ["max2"])
+
+    async def test_late_materialization_is_not_served(self):
+        await create_contact(1, make_body(1, birthday=self.soon), self.db)
+        # the job read the generation and the contacts before this write, and writes its digest after it
+        generation = await client_redis.redis_generation(birthdays_generation_key(1))
+        stale = await get_birstdays(1, 0, 10, self.db)
+        await create_contact(1, make_body(2, birthday=self.soon), self.db)
+        await client_redis.redis_set(digest_key(1, generation, self.today), stale)
+        self.assertEqual(await self.upcoming(), ["max1", "max2"])
+
+    async def test_served_from_digest(self):
+        await create_contact(1, make_body(1, birthday=self.soon), self.db)
+        self.assertEqual([c.first_name for c in await get_birstdays(1, 0, 10, self.db)], ["max1"])
+        # a row written behind the repository's back is not seen until the next materialization
+        await self.db.execute(text("UPDATE contacts SET birthday_mmdd = 0"))
+        self.assertEqual([c.first_name for c in await get_birstdays(1, 0, 10, self.db)], ["max1"])
+        self.assertEqual(await get_birstdays(1, 0, 10, self.db, days=8), [])
+        await materialize_birthdays(self.db)
+        self.assertEqual(await get_birstdays(1, 0, 10, self.db), [])
+
+    async def test_digest_pages(self):
+        for num in range(5):
+            await create_contact(1, make_body(num, birthday=self.soon), self.db)
+        first = await get_birstdays(1, 0, 3, self.db)
+        cursor = next_cursor(first, 2)
+        self.assertIsNone(next_cursor(first, 0))
+        self.assertIsNone(next_cursor([], 0))
+        self.assertEqual([c.first_name for c in await get_birstdays(1, 0, 3, self.db, cursor)], ["max2", "max3", "max4"])
+        self.assertEqual([c.first_name for c in await get_birstdays(1, 4, 3, self.db)], ["max4"])
+
+    def test_seconds_until_tomorrow(self):
+        self.assertEqual(seconds_until_tomorrow(datetime(2026, 12, 31, 23, 59, 0)), 61)
+
+
+class TestBirthdayDigestJob(SQLiteTestCase):
+    """
+    Checks that one worker at a time materializes the digests of a day.
+    """
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.db.add(User(id=1, username="max", email="max@ex.ua", password="-"))
+        await self.db.commit()
+        self.session_factory = patch("src.services.birthdays.session_factory", return_value=self.sessions)
+        self.session_factory.start()
+        self.today = date.today()
+
+    async def asyncTearDown(self):
+        self.session_factory.stop()
+        await super().asyncTearDown()
+
+    async def test_single_run_per_day(self):
+        self.assertEqual(await materialize_once(self.today), 1)
+        self.assertIsNone(await materialize_once(self.today))
+        self.assertEqual(await materialize_once(self.today + timedelta(days=1)), 1)
+
+    async def test_failed_run_releases_lock(self):
+        with patch("src.services.birthdays.repository_contact.materialize_birthdays",
+                   AsyncMock(side_effect=RuntimeError("db down"))):
+            with self.assertRaises(RuntimeError):
+                await materialize_once(self.today)
+        self.assertIsNone(await client_redis.r.get(job_key(self.today)))
+        self.assertEqual(await materialize_once(self.today), 1)
@@ -0,0 +1,83 @@
+from fastapi import HTTPException
+
+from src.schemas.contact import ContactUpdate, ContactDataUpdate, ContactResponse
+from src.services.client_redis import client_redis
+from src.repository.contacts import (
+                                    contact_key,
+                                    create_contact,
+                                    generation_key,
+                                    get_contact,
+                                    get_contacts,
+                                    remove_contact,
+                                    update_contact,
+                                    update_data_contact,
+                                    )
+from tests.helpers import SQLiteTestCase, make_body
+
+
+class TestContactCache(SQLiteTestCase):
+    """
+    Runs the repository against SQLite and the in-memory Redis from conftest,
+    and checks that every read after a write sees the write.
+    """
+
+    async def test_list_is_invalidated_on_create_and_remove(self):
+        first = await create_contact(1, make_body(1), self.db)
+        self.assertEqual([c.id for c in await get_contacts(1, 0, 10, self.db)], [first.id])
+        # served from the cache now
+        self.assertEqual([c.id for c in await get_contacts(1, 0, 10, self.db)], [first.id])
+
+        second = await create_contact(1, make_body(2), self.db)
+        self.assertEqual([c.id for c in await get_contacts(1, 0, 10, self.db)], [first.id, second.id])
+
+        await remove_contact(1, first.id, self.db)
+        self.assertEqual([c.id for c in await get_contacts(1, 0, 10, self.db)], [second.id])
+
+    async def test_pages_and_users_do_not_collide(self):
+        for num in range(3):
+            await create_contact(1, make_body(num), self.db)
+        await create_contact(2, make_body(10), self.db)
+        page1 = await get_contacts(1, 0, 2, self.db)
+        page2 = await get_contacts(1, 2, 2, self.db)
+        other = await get_contacts(2, 0, 2, self.db)
+        self.assertEqual(len(page1), 2)
+        self.assertEqual(len(page2), 1)
+        self.assertEqual([c.user_id for c in other], [2])
+        self.assertEqual((await get_contact(1, page2[0].id, self.db)).id, page2[0].id)
+        self.assertIsNone(await get_contact(2, page2[0].id, self.db))
+
+    async def test_single_contact_follows_updates(self):
+        contact = await create_contact(1, make_body(1), self.db)
+        self.assertEqual((await get_contact(1, contact.id, self.db)).data, "Work")
+
+        await update_data_contact(1, contact.id, ContactDataUpdate(data="Family"), self.db)
+        self.assertEqual((await get_contact(1, contact.id, self.db)).data, "Family")
+        self.assertEqual((await get_contacts(1, 0, 10, self.db))[0].data, "Family")
+
+        body = ContactUpdate(**make_body(5).model_dump())
+        await update_contact(1, contact.id, body, self.db)
+        self.assertEqual((await get_contact(1, contact.id, self.db)).first_name, "max5")
+        self.assertEqual((await get_contacts(1, 0, 10, self.db))[0].first_name, "max5")
+
+        await remove_contact(1, contact.id, self.db)
+        self.assertIsNone(await get_contact(1, contact.id, self.db))
+        self.assertEqual(await get_contacts(1, 0, 10, self.db), [])
+
+    async def test_late_read_does_not_overwrite_a_write(self):
+        contact = await create_contact(1, make_body(1), self.db)
+        # a reader loads the contact before an update and caches it after the update committed
+        generation = await client_redis.redis_generation(generation_key(1))
+        stale = ContactResponse.model_validate(contact)
+        await update_data_contact(1, contact.id, ContactDataUpdate(data="Family"), self.db)
+        await client_redis.redis_set(contact_key(1, generation, contact.id), stale)
+        self.assertEqual((await get_contact(1, contact.id, self.db)).data, "Family")
+
+    async def test_update_data_conflict_and_missing(self):
+        contact = await create_contact(1, make_body(1), self.db)
+        with self.assertRaises(HTTPException) as err:
+            await update_data_contact(1, contact.id, ContactDataUpdate(data="Work"), self.db)
+        self.assertEqual(err.exception.status_code, 409)
+        self.assertIsNone(await update_data_contact(2, contact.id, ContactDataUpdate(data="Family"), self.db))
+        self.assertIsNone(await update_contact(1, contact.id + 1, ContactUpdate(**make_body(2).model_dump()), self.db))
+        self.assertIsNone(await remove_contact(2, contact.id, self.db))
+        self.assertEqual((await remove_contact(1, contact.id, self.db)).id, contact.id)
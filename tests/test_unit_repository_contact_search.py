@@ -0,0 +1,51 @@
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from src.schemas.contact import ContactUpdate
+from src.repository.contacts import (
+                                    create_contact,
+                                    remove_contact,
+                                    search_contacts,
+                                    search_filters,
+                                    update_contact,
+                                    )
+from tests.helpers import SQLiteTestCase, make_body
+
+
+class TestContactSearchIndex(SQLiteTestCase):
+    """
+    Runs the search against SQLite, where it goes through the contacts_fts trigram table.
+    """
+
+    async def search(self, **criteria) -> list[str]:
+        criteria = {"first_name": None, "last_name": None, "email": None, "phone": None, "birthday": None, **criteria}
+        return [contact.first_name for contact in await search_contacts(1, db=self.db, **criteria)]
+
+    async def test_index_follows_writes(self):
+        first = await create_contact(1, make_body(1, "Olena"), self.db)
+        await create_contact(1, make_body(2), self.db)
+        self.assertEqual(await self.search(first_name="LEN"), ["Olena1"])
+
+        await update_contact(1, first.id, ContactUpdate(**make_body(1, "Artem").model_dump()), self.db)
+        self.assertEqual(await self.search(first_name="len"), [])
+        self.assertEqual(await self.search(first_name="rte"), ["Artem1"])
+
+        await remove_contact(1, first.id, self.db)
+        self.assertEqual(await self.search(first_name="rte"), [])
+        self.assertEqual(await self.search(last_name="krivit"), ["max2"])
+
+    async def test_short_terms_still_match(self):
+        await create_contact(1, make_body(1), self.db)
+        await create_contact(1, make_body(2), self.db)
+        self.assertEqual(await self.search(phone="2"), ["max1", "max2"])
+        self.assertEqual(await self.search(email="x2"), ["max2"])
+
+    async def test_query_uses_fts(self):
+        query = search_filters("olena", None, None, None, None, "sqlite")[0]
+        compiled = str(query.compile(compile_kwargs={"literal_binds": True}))
+        plan = (await self.db.execute(text(f"EXPLAIN QUERY PLAN SELECT id FROM contacts WHERE {compiled}"))).all()
+        self.assertIn("VIRTUAL TABLE INDEX", " ".join(row[-1] for row in plan))
+
+    def test_postgres_uses_ilike(self):
+        query = search_filters("olena", None, None, None, None, "postgresql")[0]
+        self.assertIn("ILIKE", str(query.compile(dialect=postgresql.dialect())))
@@ -1,13 +1,15 @@
 import unittest
-from unittest.mock import MagicMock 
-from sqlalchemy.orm import Session
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.schemas.user import UserDb, UserSchema 
 from src.repository.users import (
+                                  user_key,
                                   create_user, 
                                   remove_user,
                                   update_token,
+                                  update_password,
                                   update_avatar,  
                                   confirmed_email, 
                                   get_user_by_email, 
@@ -19,8 +21,8 @@ from src.repository.users import (
 class TestUser(unittest.IsolatedAsyncioTestCase):
     
     def setUp(self):
-        self.session = MagicMock(spec=Session)
-        self.user = User(id=1)
+        self.session = MagicMock(spec=AsyncSession)
+        self.user = User(id=1, email="max.lol@ex.ua")
         self.user_db = UserDb(
             id=1, 
             username="max", 
@@ -69,6 +71,12 @@ class TestUser(unittest.IsolatedAsyncioTestCase):
         self.session.commit.assert_called()
         self.assertEqual(result.refresh_token, new_token)
 
+    async def test_update_password(self):
+        new_password = "new_password_hash"
+        result = await update_password(user=self.user, password=new_password, db=self.session)
+        self.session.commit.assert_called()
+        self.assertEqual(result.password, new_password)
+
     async def test_get_user_by_email(self):
         mocked_metod = MagicMock()
         mocked_metod.scalar_one_or_none.return_value = self.user_db
@@ -90,5 +98,24 @@ class TestUser(unittest.IsolatedAsyncioTestCase):
         result = await remove_user(email="max.lol@ex.ua", db=self.session)
         self.assertEqual(result.email, self.user_db.email)
 
+    async def test_writes_drop_cached_user(self):
+        mocked_metod = MagicMock()
+        mocked_metod.scalar_one_or_none.return_value = self.user_db
+        self.session.execute.return_value = mocked_metod
+        writes = [update_avatar(email="max.lol@ex.ua", url="http://www.example.com/1.jpg", db=self.session),
+                  confirmed_email(email="max.lol@ex.ua", db=self.session),
+                  update_token(user=self.user, token=None, db=self.session),
+                  update_password(user=self.user, password="hash", db=self.session),
+                  remove_user(email="max.lol@ex.ua", db=self.session)]
+        for write in writes:
+            with patch("src.repository.users.client_redis.redis_delete", AsyncMock()) as redis_delete, \
+                    patch("src.repository.users.token_cache.invalidate") as invalidate:
+                await write
+            redis_delete.assert_awaited_once_with(user_key("max.lol@ex.ua"))
+            invalidate.assert_called_once_with("max.lol@ex.ua")
+
+    def test_user_key(self):
+        self.assertEqual(user_key("Max.Lol@ex.ua"), "users:max.lol@ex.ua")
+
 # if __name__ == '__main__':
 #     unittest.main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import unittest
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+from src.database.models import Contact
+from src.repository.contacts import bulk_create_contacts
+from src.services.bulk import detect_format, iter_lines, parse_rows
+from tests.helpers import SQLiteTestCase
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+def csv_rows(count: int) -> bytes:
+    lines = ["first_name,last_name,email,phone,birthday,data"]
+    lines += [f"max{num},k,max{num}@ex.ua,+38099{num:07},2000-01-01,Work" for num in range(count)]
+    return "\n".join(lines).encode()
+
+
+class TestBulkParser(unittest.IsolatedAsyncioTestCase):
+
+    async def test_lines_across_chunks(self):
+        text = "Олена,\r\nМакс\nlast".encode()
+        chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+        self.assertEqual(await collect(iter_lines(stream(*chunks))), [(1, "Олена,"), (2, "Макс"), (3, "last")])
+
+    async def test_line_length(self):
+        self.assertEqual(await collect(iter_lines(stream(b"abcd\r\n", b"ef"), max_length=4)), [(1, "abcd"), (2, "ef")])
+        for chunks in ([b"ab\nabcde\n"], [b"ab\nabc", b"de"], [b"ab\n", b"abc"] + [b"d"] * 100):
+            with self.assertRaises(HTTPException) as err:
+                await collect(iter_lines(stream(*chunks), max_length=4))
+            self.assertEqual(err.exception.status_code, 413)
+            self.assertIn("Line 2", err.exception.detail)
+
+    async def test_bom_is_dropped(self):
+        rows = await collect(parse_rows(stream(b"\xef\xbb\xbf" + csv_rows(1)), "csv"))
+        self.assertEqual(rows[0][1].first_name, "max0")
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format("text/csv; charset=utf-8"), "csv")
+        self.assertEqual(detect_format("application/x-ndjson"), "ndjson")
+
+
+class TestBulkInsert(SQLiteTestCase):
+
+    async def test_batches(self):
+        result = await bulk_create_contacts(1, parse_rows(stream(csv_rows(7)), "csv"), self.db, batch_size=3)
+        self.assertEqual(result.created, 7)
+        self.assertEqual(result.errors, [])
+        count = (await self.db.execute(select(func.count()).select_from(Contact))).scalar()
+        self.assertEqual(count, 7)
+        birthday = (await self.db.execute(select(Contact.birthday_mmdd))).scalars().first()
+        self.assertEqual(birthday, 101)
+
+    async def test_conflict_does_not_abort_batch(self):
+        await bulk_create_contacts(1, parse_rows(stream(csv_rows(2)), "csv"), self.db)
+        result = await bulk_create_contacts(1, parse_rows(stream(csv_rows(5)), "csv"), self.db, batch_size=10)
+        self.assertEqual(result.created, 3)
+        self.assertEqual([error.row for error in result.errors], [2, 3])
@@ -0,0 +1,102 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.database.models import Contact, User
+from src.schemas.contact import ContactResponse
+from src.schemas.user import UserDb
+from src.services import codec as codec_module
+from src.services.client_redis import ClientRedis
+from src.services.codec import Codec, JsonCodec, MsgpackCodec, get_codec
+
+
+def dump(value):
+    if isinstance(value, list):
+        return [item.model_dump() for item in value]
+    return value.model_dump()
+
+
+def make_contacts(count):
+    return [ContactResponse.model_validate(Contact(
+        id=num,
+        first_name=f"max{num}",
+        last_name="krivitskyh",
+        email=f"max{num}.lol@ex.ua",
+        phone=f"+38099123{num:04}",
+        birthday=date(2000, 1, 1),
+        data="Work",
+        user_id=1)) for num in range(count)]
+
+
+class TestCodec(unittest.TestCase):
+    def setUp(self):
+        self.contacts = make_contacts(3)
+        self.user = UserDb.model_validate(User(
+            id=1, username="max", email="max.lol@ex.ua",
+            avatar="http://www.example.com/example.jpg",
+            created_at=datetime(2024, 4, 14, 12), confirmed=True))
+
+    def test_json_roundtrip(self):
+        codec = JsonCodec()
+        data = codec.encode(self.contacts)
+        self.assertTrue(data.startswith(b"json:1:"))
+        self.assertEqual(dump(codec.decode(data, ContactResponse, many=True)), dump(self.contacts))
+        self.assertEqual(dump(codec.decode(codec.encode(self.user), UserDb)), dump(self.user))
+        self.assertIsInstance(codec.decode(codec.encode(self.user), UserDb), UserDb)
+
+    def test_msgpack_roundtrip(self):
+        pytest.importorskip("msgpack")
+        codec = MsgpackCodec()
+        data = codec.encode(self.contacts)
+        self.assertEqual(dump(codec.decode(data, ContactResponse, many=True)), dump(self.contacts))
+
+    def test_rejects_stale_entries(self):
+        codec = JsonCodec()
+        data = codec.encode(self.contacts)
+        self.assertIsNone(codec.decode(None, ContactResponse, many=True))
+        self.assertIsNone(codec.decode(b"\x80\x04legacy pickle", ContactResponse, many=True))
+        self.assertIsNone(codec.decode(data, ContactResponse))
+        self.assertIsNone(codec.decode(data, UserDb, many=True))
+        codec_module.SCHEMA_VERSION += 1
+        try:
+            self.assertIsNone(codec.decode(data, ContactResponse, many=True))
+        finally:
+            codec_module.SCHEMA_VERSION -= 1
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_codec("pickle")
+
+    def test_codec_is_abstract(self):
+        class Incomplete(Codec):
+            name = "incomplete"
+
+            def dumps(self, value):
+                return b""
+
+        with self.assertRaises(TypeError):
+            Codec()
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+class TestClientRedis(unittest.IsolatedAsyncioTestCase):
+    async def test_set_get(self):
+        client = ClientRedis()
+        store = {}
+        client._client = AsyncMock()
+        client._client.set.side_effect = lambda key, value, ex: store.__setitem__(key, value)
+        client._client.get.side_effect = store.get
+        contacts = make_contacts(2)
+        await client.redis_set(1, contacts)
+        self.assertEqual(dump(await client.redis_get(1, ContactResponse, many=True)), dump(contacts))
+        self.assertIsNone(await client.redis_get(2, ContactResponse, many=True))
+
+    async def test_unavailable_redis_is_a_miss(self):
+        client = ClientRedis(port=1, socket_timeout=0.1, connect_timeout=0.1)
+        self.assertIsNone(await client.redis_get(1, ContactResponse, many=True))
+        await client.redis_set(1, make_contacts(1))
+        await client.close()
+        self.assertIsNone(client.pool)
@@ -0,0 +1,118 @@
+import asyncio
+import socket
+import unittest
+
+import pytest
+
+aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+
+from src.conf.config import Settings
+from src.services.email import MailClient
+
+
+class Handler:
+    """
+    Records every delivered message with the connection it came over, refuses ``bounce@ex.ua``.
+    """
+
+    def __init__(self):
+        self.messages: list[tuple[int, list[str], bytes]] = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == "bounce@ex.ua":
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((id(session), list(envelope.rcpt_tos), envelope.content))
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestMailClient(unittest.IsolatedAsyncioTestCase):
+    """
+    Sends through a local aiosmtpd server standing in for the SMTP provider.
+    """
+
+    def setUp(self):
+        self.handler = Handler()
+        self.controller = aiosmtpd.Controller(self.handler, hostname="127.0.0.1", port=free_port())
+        self.controller.start()
+        self.settings = Settings(mail_server="127.0.0.1", mail_port=self.controller.port, mail_ssl_tls=False,
+                                 mail_starttls=False, mail_username="", mail_password="", mail_from="noreply@ex.ua",
+                                 mail_from_name="Contacts", mail_pool_size=2, mail_batch_size=3)
+        self.client = MailClient(self.settings)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def tearDown(self):
+        self.controller.stop()
+
+    def message(self, recipient: str):
+        return self.client.render("email_template.html", "Confirm your email", recipient,
+                                  {"host": "http://test/", "username": "max", "token": "abc"})
+
+    def test_render(self):
+        message = self.message("max@ex.ua")
+        self.assertEqual(message["From"], "Contacts <noreply@ex.ua>")
+        self.assertIn("api/auth/confirmed_email/abc", message.get_content())
+        self.assertIs(self.client.template("email_template.html"), self.client.template("email_template.html"))
+
+    async def test_connection_is_reused(self):
+        for recipient in ("max@ex.ua", "olena@ex.ua", "ivan@ex.ua"):
+            await self.client.send(self.message(recipient))
+        self.assertEqual(self.handler.connections, 1)
+        self.assertEqual([rcpt for _, rcpt, _ in self.handler.messages], [["max@ex.ua"], ["olena@ex.ua"], ["ivan@ex.ua"]])
+        self.assertEqual(len(self.client._idle), 1)
+
+    async def test_pool_size(self):
+        await asyncio.gather(*(self.client.send(self.message(f"user{n}@ex.ua")) for n in range(6)))
+        self.assertEqual(len(self.handler.messages), 6)
+        self.assertLessEqual(self.handler.connections, 2)
+
+    async def test_replaces_closed_and_idle_connections(self):
+        await self.client.send(self.message("max@ex.ua"))
+        smtp, _ = self.client._idle[0]
+        smtp.close()
+        await self.client.send(self.message("olena@ex.ua"))
+        smtp, _ = self.client._idle[0]
+        self.client._idle[0] = (smtp, 0.0)
+        await self.client.send(self.message("ivan@ex.ua"))
+        self.assertEqual(len(self.handler.messages), 3)
+        self.assertEqual(self.handler.connections, 3)
+        self.assertFalse(smtp.is_connected)
+
+    async def test_send_many(self):
+        recipients = ["a@ex.ua", "b@ex.ua", "bounce@ex.ua", "c@ex.ua", "d@ex.ua"]
+        results = await self.client.send_many([self.message(recipient) for recipient in recipients])
+        self.assertEqual([result is None for result in results], [True, True, False, True, True])
+        self.assertEqual(len(self.handler.messages), 4)
+        # two batches of at most three messages, one connection each
+        self.assertEqual(len({session for session, _, _ in self.handler.messages}), 2)
+        self.assertEqual(self.client.pending, 0)
+
+    async def test_send_many_server_down(self):
+        client = MailClient(self.settings.model_copy(update={"mail_port": free_port()}))
+        results = await client.send_many([self.message("a@ex.ua"), self.message("b@ex.ua")])
+        self.assertTrue(all(isinstance(result, OSError) for result in results))
+        self.assertEqual(client._idle, [])
+
+    async def test_close(self):
+        await self.client.send(self.message("max@ex.ua"))
+        smtp, _ = self.client._idle[0]
+        await self.client.close()
+        self.assertEqual(self.client._idle, [])
+        self.assertFalse(smtp.is_connected)
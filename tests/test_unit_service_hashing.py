@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+
+import fastapi
+from passlib.context import CryptContext
+
+from src.services import hashing
+from src.services.hashing import PasswordHasher
+
+
+def slow_identity(value):
+    import time
+    time.sleep(0.2)
+    return value
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.context = hashing.pwd_context
+        hashing.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4)
+        self.hasher = PasswordHasher(workers=2, max_pending=2)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+        hashing.pwd_context = self.context
+
+    async def test_hash_and_verify(self):
+        hashed = await self.hasher.hash("qwerty")
+        self.assertNotEqual(hashed, "qwerty")
+        self.assertTrue(await self.hasher.verify("qwerty", hashed))
+        self.assertFalse(await self.hasher.verify("password", hashed))
+
+    async def test_rehash_when_cost_changes(self):
+        hashed = await self.hasher.hash("qwerty")
+        verified, new_hash = await self.hasher.verify_and_update("qwerty", hashed)
+        self.assertTrue(verified)
+        self.assertIsNone(new_hash)
+
+        hashing.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5)
+        verified, new_hash = await self.hasher.verify_and_update("qwerty", hashed)
+        self.assertTrue(verified)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+
+    async def test_backpressure(self):
+        busy = [asyncio.create_task(self.hasher.run(slow_identity, n)) for n in range(2)]
+        await asyncio.sleep(0)
+        with self.assertRaises(fastapi.exceptions.HTTPException) as error:
+            await self.hasher.run(slow_identity, 3)
+        self.assertEqual(error.exception.status_code, 503)
+        self.assertEqual(await asyncio.gather(*busy), [0, 1])
+        self.assertEqual(self.hasher.pending, 0)
@@ -0,0 +1,78 @@
+import unittest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from slowapi.errors import RateLimitExceeded
+from slowapi import _rate_limit_exceeded_handler
+from starlette.requests import Request as StarletteRequest
+
+from src.services.auth import auth_service
+from src.services.limiter import create_limiter, rate_limit_key
+from src.services.token_cache import token_cache
+
+
+def make_request(authorization: str | None = None, client: str = "10.0.0.1") -> StarletteRequest:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return StarletteRequest({"type": "http", "method": "GET", "path": "/", "headers": headers,
+                             "client": (client, 1234), "query_string": b""})
+
+
+def make_app(limiter) -> FastAPI:
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    @app.get("/limited")
+    @limiter.limit("2/minute")
+    async def limited(request: Request):
+        return {}
+
+    return app
+
+
+class TestRateLimitKey(unittest.IsolatedAsyncioTestCase):
+    """
+    Keys requests by the subject of their access token, or by address.
+    """
+
+    def tearDown(self):
+        token_cache.clear()
+
+    async def test_user_key(self):
+        token = await auth_service.create_access_token(data={"sub": "Max@ex.ua"})
+        self.assertEqual(rate_limit_key(make_request(f"Bearer {token}", "10.0.0.1")), "user:max@ex.ua")
+        self.assertEqual(rate_limit_key(make_request(f"Bearer {token}", "10.0.0.2")), "user:max@ex.ua")
+
+    def test_anonymous_key(self):
+        self.assertEqual(rate_limit_key(make_request()), "ip:10.0.0.1")
+        self.assertEqual(rate_limit_key(make_request("Basic abc")), "ip:10.0.0.1")
+
+    def test_forged_token_is_keyed_by_address(self):
+        self.assertEqual(rate_limit_key(make_request("Bearer not.a.token", "10.0.0.3")), "ip:10.0.0.3")
+
+
+class TestLimiter(unittest.IsolatedAsyncioTestCase):
+    """
+    Limits requests through the in-memory storage and the fallback of an unreachable Redis.
+    """
+
+    async def test_limit_per_user(self):
+        client = TestClient(make_app(create_limiter("memory://")))
+        max_token = await auth_service.create_access_token(data={"sub": "max@ex.ua"})
+        olena_token = await auth_service.create_access_token(data={"sub": "olena@ex.ua"})
+        max_headers, olena_headers = {"Authorization": f"Bearer {max_token}"}, {"Authorization": f"Bearer {olena_token}"}
+        self.assertEqual([client.get("/limited", headers=max_headers).status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(client.get("/limited", headers=olena_headers).status_code, 200)
+        self.assertEqual(client.get("/limited").status_code, 200)
+
+    def test_fallback_when_redis_is_unreachable(self):
+        limiter = create_limiter("redis://127.0.0.1:1/0", timeout=0.05)
+        client = TestClient(make_app(limiter))
+        self.assertEqual([client.get("/limited").status_code for _ in range(3)], [200, 200, 429])
+        self.assertTrue(limiter._storage_dead)
+
+    def test_reset_when_redis_is_unreachable(self):
+        limiter = create_limiter("redis://127.0.0.1:1/0", timeout=0.05)
+        client = TestClient(make_app(limiter))
+        self.assertEqual([client.get("/limited").status_code for _ in range(3)], [200, 200, 429])
+        limiter.reset()
+        self.assertEqual(client.get("/limited").status_code, 200)
@@ -0,0 +1,63 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User
+from src.repository.users import update_avatar, update_token
+from src.services.token_cache import TokenCache, token_cache
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = TokenCache(maxsize=2, ttl=60)
+        self.exp = time.time() + 3600
+
+    def test_get_set(self):
+        user = User(id=1, email="max.lol@ex.ua")
+        self.assertIsNone(self.cache.get("token"))
+        self.cache.set("token", user.email, user, self.exp)
+        self.assertIs(self.cache.get("token"), user)
+        self.assertNotIn("token", self.cache._entries)
+
+    def test_expires_with_token(self):
+        self.cache.set("token", "max.lol@ex.ua", User(id=1), time.time() - 1)
+        self.assertIsNone(self.cache.get("token"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        self.cache.set("token1", "a@ex.ua", User(id=1), self.exp)
+        self.cache.set("token2", "b@ex.ua", User(id=2), self.exp)
+        self.cache.get("token1")
+        self.cache.set("token3", "c@ex.ua", User(id=3), self.exp)
+        self.assertIsNotNone(self.cache.get("token1"))
+        self.assertIsNone(self.cache.get("token2"))
+        self.assertIsNotNone(self.cache.get("token3"))
+
+    def test_invalidate(self):
+        self.cache.set("token1", "a@ex.ua", User(id=1), self.exp)
+        self.cache.set("token2", "b@ex.ua", User(id=2), self.exp)
+        self.cache.invalidate("a@ex.ua")
+        self.assertIsNone(self.cache.get("token1"))
+        self.assertIsNotNone(self.cache.get("token2"))
+
+
+class TestTokenCacheInvalidation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.session = MagicMock(spec=AsyncSession)
+        self.user = User(id=1, email="max.lol@ex.ua")
+        token_cache.set("token", self.user.email, self.user, time.time() + 3600)
+
+    def tearDown(self):
+        token_cache.clear()
+
+    async def test_update_token_invalidates(self):
+        await update_token(user=self.user, token="new_refresh_token", db=self.session)
+        self.assertIsNone(token_cache.get("token"))
+
+    async def test_update_avatar_invalidates(self):
+        mocked_metod = MagicMock()
+        mocked_metod.scalar_one_or_none.return_value = self.user
+        self.session.execute.return_value = mocked_metod
+        await update_avatar(email=self.user.email, url="http://www.example.com/example1.jpg", db=self.session)
+        self.assertIsNone(token_cache.get("token"))